@@ -0,0 +1,151 @@
+import argparse
+import csv
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from backend import corridor
+from backend.connect_to_api import TRIP_CACHE_PATH, TRIP_CACHE_TTL, ResRobot
+from backend.disk_cache import DiskCache
+from backend.trips import TripPlanner
+from utils.log import configure_logging
+
+
+def read_queries(file_path):
+    """Read trip queries from a CSV file.
+
+    The file needs a header with `origin_id` and `destination_id` columns and
+    may have `date` (YYYY-MM-DD), `time` (HH:MM) and `searchForArrival`
+    columns. Empty values fall back to the ResRobot defaults (today / now).
+    """
+    with open(file_path, newline="", encoding="utf-8") as file:
+        for row in csv.DictReader(file):
+            yield {
+                "origin_id": row["origin_id"].strip(),
+                "destination_id": row["destination_id"].strip(),
+                "date": (row.get("date") or "").strip() or None,
+                "time": (row.get("time") or "").strip() or None,
+                "searchForArrival": int(row.get("searchForArrival") or 0),
+            }
+
+
+def run_query(resrobot, query, geometry=True):
+    """Run one query through ResRobot.trips and, optionally, the map geometry.
+
+    Returns a report dict with the query, the outcome and per-stage latencies
+    in seconds.
+    """
+    report = dict(query)
+    start = time.perf_counter()
+    try:
+        planner = TripPlanner(
+            query["origin_id"],
+            query["destination_id"],
+            resrobot=resrobot,
+            date=query["date"],
+            time=query["time"],
+            searchForArrival=query["searchForArrival"],
+        )
+        report["trips_seconds"] = time.perf_counter() - start
+        trips = (planner.trip_data or {}).get("Trip", [])
+        report["trips"] = len(trips)
+        if geometry and trips:
+            geometry_start = time.perf_counter()
+            planner.extract_route_with_transfers()
+            planner.plot_trip()
+            report["legs"] = len(planner.route_legs)
+            report["geometry_seconds"] = time.perf_counter() - geometry_start
+        report["status"] = "ok" if trips else "no_trips"
+    except Exception as err:
+        report["status"] = "error"
+        report["error"] = f"{type(err).__name__}: {err}"
+    report["total_seconds"] = time.perf_counter() - start
+    return report
+
+
+def run_batch(queries, report_path, concurrency=4, geometry=True, resrobot=None):
+    """Run `queries` with at most `concurrency` in flight and write a JSONL report.
+
+    Returns the list of report dicts.
+    """
+    resrobot = resrobot or ResRobot.headless()
+    reports = []
+    lock = threading.Lock()
+    with open(report_path, "w", encoding="utf-8") as report_file:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = [
+                pool.submit(run_query, resrobot, query, geometry) for query in queries
+            ]
+            for future in as_completed(futures):
+                report = future.result()
+                with lock:
+                    reports.append(report)
+                    report_file.write(json.dumps(report, ensure_ascii=False) + "\n")
+                    report_file.flush()
+                print(
+                    f"{report['status']:>8} {report['origin_id']} → {report['destination_id']} "
+                    f"{report['total_seconds']:.2f}s"
+                )
+    return reports
+
+
+def summarize(reports):
+    """Count per status and latency percentiles of the whole run."""
+    latencies = sorted(report["total_seconds"] for report in reports)
+    summary = {"queries": len(reports)}
+    for report in reports:
+        summary[report["status"]] = summary.get(report["status"], 0) + 1
+    for pct in (50, 95, 99):
+        if latencies:
+            index = min(len(latencies) - 1, int(len(latencies) * pct / 100))
+            summary[f"p{pct}_seconds"] = round(latencies[index], 3)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run trip queries headless to warm caches or load test.",
+        epilog="API keys and stub servers are configured through the environment: "
+        "TRAVEL_PLANNER_API_KEY, TRAVEL_PLANNER_OSRM_BASE_URL and "
+        "TRAVEL_PLANNER_OVERPASS_URL.",
+    )
+    parser.add_argument(
+        "queries", help="CSV with origin_id,destination_id[,date,time] columns"
+    )
+    parser.add_argument("--report", default="batch_report.jsonl")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--no-geometry",
+        action="store_true",
+        help="only query ResRobot, skip the OSM/OSRM route geometry",
+    )
+    parser.add_argument(
+        "--base-url", help="ResRobot API root, e.g. a local stub server"
+    )
+    parser.add_argument(
+        "--trip-cache",
+        nargs="?",
+        const=str(TRIP_CACHE_PATH),
+        help=f"keep trip results in this SQLite file for {TRIP_CACHE_TTL // 3600} h, so later "
+        f"batch runs reuse them (default file: {TRIP_CACHE_PATH})",
+    )
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    if args.trip_cache:
+        ResRobot.trip_cache = DiskCache(args.trip_cache, ttl=TRIP_CACHE_TTL)
+    reports = run_batch(
+        read_queries(args.queries),
+        args.report,
+        concurrency=args.concurrency,
+        geometry=not args.no_geometry,
+        resrobot=ResRobot.headless(base_url=args.base_url),
+    )
+    print(json.dumps(summarize(reports), indent=2))
+    print(json.dumps(ResRobot.coalescing_stats()))
+    print(json.dumps(corridor.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,131 @@
+import logging
 from datetime import datetime
 
 import requests
-import streamlit as st
-from dotenv import load_dotenv
 
-load_dotenv()
+from backend.disk_cache import DiskCache
+from backend.rate_limit import RateLimiter
+from backend.single_flight import SingleFlight
+from backend.swr_cache import StaleWhileRevalidateCache
+from utils import config, tracing
+from utils.constants import CACHE_PATH
+
+RESROBOT_BASE_URL = "https://api.resrobot.se/v2.1"
+# Seconds a trip search result is reused from a persistent trip cache.
+TRIP_CACHE_TTL = 6 * 3600
+TRIP_CACHE_PATH = CACHE_PATH / "trips.sqlite"
+
+logger = logging.getLogger(__name__)
+
+
+class _ApiKey:
+    """Class attribute that resolves an API key on first access instead of at import."""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, owner=None):
+        if obj is not None and self.name in obj.api_keys:
+            return obj.api_keys[self.name]
+        sources = obj.key_sources if obj is not None else config.SOURCES
+        return config.get_api_key(self.name, sources)
 
 
 class ResRobot:
-    API_KEY = st.secrets["api"]["API_KEY"]  # ResRobot2.1
-    API_KEY2 = st.secrets["api"]["API_KEY2"]  # Traffikverket öppet API
-    API_KEY3 = st.secrets["api"]["API_KEY3"]  # GTFS Sverige2
-    API_KEY4 = st.secrets["api"]["API_KEY4"]  # GTFS Regional Static data
-    API_KEY5 = st.secrets["api"]["API_KEY5"]  # GTFS3
-    API_KEY6 = st.secrets["api"]["API_KEY6"]  # GoogleMaps
+    API_KEY = _ApiKey()  # ResRobot2.1
+    API_KEY2 = _ApiKey()  # Traffikverket öppet API
+    API_KEY3 = _ApiKey()  # GTFS Sverige2
+    API_KEY4 = _ApiKey()  # GTFS Regional Static data
+    API_KEY5 = _ApiKey()  # GTFS3
+    API_KEY6 = _ApiKey()  # GoogleMaps
+
+    # Shared by every instance so concurrent Streamlit sessions asking for the
+    # same trip share one upstream request.
+    _trip_flights = SingleFlight()
+
+    # Client-side rate limiting and quota accounting, shared by all instances.
+    # Replace with e.g. RateLimiter(store_path="ratelimit.sqlite") to share the
+    # buckets and the quota ledger between processes.
+    rate_limiter = RateLimiter()
+
+    # Last departure board per stop, served stale-while-revalidate.
+    departure_boards = StaleWhileRevalidateCache(refresh_after=30, max_staleness=300)
+
+    # Optional DiskCache of trip search results across processes and restarts,
+    # for batch jobs (see backend/batch.py --trip-cache). Off by default, so
+    # the dashboard always shows fresh realtime data.
+    trip_cache = None
+
+    def __init__(
+        self,
+        block_on_rate_limit=None,
+        api_keys=None,
+        key_sources=config.SOURCES,
+        base_url=None,
+    ):
+        """
+        Parameters:
+          block_on_rate_limit: True to wait for a free token, False to raise
+              RateLimitExceeded at once. None uses the limiter's default.
+          api_keys:    Optional {"API_KEY": ...} overriding resolved keys.
+          key_sources: Where missing keys are looked up, see config.get_api_key.
+          base_url:    API root, e.g. a local stub server. Defaults to the
+              RESROBOT_BASE_URL setting or the public ResRobot 2.1 API.
+        """
+        self.block_on_rate_limit = block_on_rate_limit
+        self.api_keys = dict(api_keys or {})
+        self.key_sources = tuple(key_sources)
+        self.base_url = (
+            base_url or config.get_setting("RESROBOT_BASE_URL", RESROBOT_BASE_URL)
+        ).rstrip("/")
+
+    @classmethod
+    def headless(
+        cls, api_key=None, block_on_rate_limit=True, base_url=None, **api_keys
+    ):
+        """Client for batch jobs and workers that never touches Streamlit.
+
+        Keys come from the arguments or from the environment / .env file
+        (TRAVEL_PLANNER_API_KEY or API_KEY); config.ConfigError is raised on
+        first use if none is found.
+        """
+        if api_key is not None:
+            api_keys["API_KEY"] = api_key
+        return cls(
+            block_on_rate_limit=block_on_rate_limit,
+            api_keys=api_keys,
+            key_sources=config.HEADLESS_SOURCES,
+            base_url=base_url,
+        )
 
+    def _get(self, endpoint, url, params=None, key_name="API_KEY"):
+        """Rate-limited GET against ResRobot; every call is recorded in the quota ledger."""
+        with tracing.span("resrobot.rate_limit", endpoint=endpoint):
+            self.rate_limiter.acquire(
+                key_name, endpoint, block=self.block_on_rate_limit
+            )
+        try:
+            with tracing.span("resrobot.request", endpoint=endpoint) as span:
+                response = requests.get(url, params=params)
+                span.set(status=response.status_code)
+        except requests.exceptions.RequestException:
+            self.rate_limiter.record(key_name, endpoint, None)
+            raise
+        retry_after = response.headers.get("Retry-After", "")
+        self.rate_limiter.record(
+            key_name,
+            endpoint,
+            response.status_code,
+            retry_after=float(retry_after) if retry_after.isdigit() else None,
+        )
+        return response
+
+    @classmethod
+    def quota_usage(cls, window=60):
+        """Calls per (key name, endpoint) during the last `window` seconds."""
+        return cls.rate_limiter.ledger.summary(window)
+
+    @tracing.traced("resrobot.trips")
     def trips(
         self,
         origin_id=740000001,
@@ -31,14 +142,53 @@ class ResRobot:
           date:        Date in YYYY-MM-DD format (defaults to today).
           time:        Time in HH:MM format (defaults to now).
           searchForArrival: 0 to search for departures, 1 for arrivals.
+
+        Identical queries that are in flight at the same time share a single
+        upstream request and the same parsed result. Successful results are
+        kept in `trip_cache`, if one is set. Raises RateLimitExceeded
+        when the client is in fast-fail mode and no request token is free.
         """
         if date is None:
             date = datetime.today().strftime("%Y-%m-%d")
         if time is None:
             time = datetime.now().strftime("%H:%M")
 
+        key = self.trip_query_key(
+            origin_id, destination_id, date, time, searchForArrival
+        )
+        # Clients of different API roots (e.g. a stub next to production) share
+        # the class-wide flights, so the root is part of the key.
+        flight_key = (self.base_url, *key)
+        if self.trip_cache is None:
+            return self._trip_flights.do(flight_key, self._fetch_trips, *key)
+
+        cache_key = DiskCache.make_key("trip", *flight_key)
+        cached = self.trip_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        result = self._trip_flights.do(flight_key, self._fetch_trips, *key)
+        if result is not None and "Trip" in result:
+            self.trip_cache.set(cache_key, result)
+        return result
+
+    @staticmethod
+    def trip_query_key(origin_id, destination_id, date, time, searchForArrival=0):
+        """Normalize trip query parameters so equivalent queries compare equal.
+
+        Times become zero-padded "HH:MM", so "8:00" and "08:00:00" are one query.
+        """
+        hours, minutes = str(time).strip().split(":")[:2]
+        return (
+            str(origin_id).strip(),
+            str(destination_id).strip(),
+            str(date).strip(),
+            f"{int(hours):02d}:{int(minutes):02d}",
+            int(searchForArrival),
+        )
+
+    def _fetch_trips(self, origin_id, destination_id, date, time, searchForArrival):
         url = (
-            f"https://api.resrobot.se/v2.1/trip?format=json"
+            f"{self.base_url}/trip?format=json"
             f"&originId={origin_id}&destId={destination_id}"
             f"&passlist=true&showPassingPoints=true"
             f"&date={date}&time={time}"
@@ -47,21 +197,25 @@ class ResRobot:
         )
 
         try:
-            response = requests.get(url)
+            response = self._get("trip", url)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as err:
-            print(f"Network or HTTP error: {err}")
+            logger.warning("Network or HTTP error: %s", err)
             return None
 
+    @classmethod
+    def coalescing_stats(cls):
+        """Counters for `trips`: calls made, upstream requests sent and calls coalesced."""
+        return cls._trip_flights.stats()
+
     def access_id_from_location(self, location):
         """Look up stop IDs based on a location name."""
-        url = f"https://api.resrobot.se/v2.1/location.name?input={location}&format=json&accessId={self.API_KEY}"
-        response = requests.get(url)
+        url = f"{self.base_url}/location.name?input={location}&format=json&accessId={self.API_KEY}"
+        response = self._get("location.name", url)
         result = response.json()
 
-        print(f"{'Name':<40} {'extId':<12} {'Latitude':<12} {'Longitude'}")
-        print("-" * 80)
+        logger.info("%-40s %-12s %-12s %s", "Name", "extId", "Latitude", "Longitude")
 
         for stop in result.get("stopLocationOrCoordLocation", []):
             stop_data = next(iter(stop.values()))
@@ -70,19 +224,34 @@ class ResRobot:
             lat = stop_data.get("lat", "N/A")
             lon = stop_data.get("lon", "N/A")
 
-            print(f"{stop_name:<40} {stop_id:<12} {lat:<12} {lon}")
+            logger.info("%-40s %-12s %-12s %s", stop_name, stop_id, lat, lon)
 
     def timetable_departure(self, location_id=740015565):
         """Get the departure board for a given location."""
-        url = f"https://api.resrobot.se/v2.1/departureBoard?id={location_id}&format=json&accessId={self.API_KEY}&passlist=1"  # noqa: E501
+        url = f"{self.base_url}/departureBoard?id={location_id}&format=json&accessId={self.API_KEY}&passlist=1"  # noqa: E501
 
-        response = requests.get(url)
+        response = self._get("departureBoard", url)
         return response.json()
 
+    def cached_timetable_departure(self, location_id=740015565, max_staleness=None):
+        """Get the departure board for a location, served stale-while-revalidate.
+
+        Returns `(board, age_seconds)`. A cached board younger than
+        `max_staleness` seconds is returned at once; if it is older than
+        `departure_boards.refresh_after` a background refresh is started so the
+        next call sees fresh data. Without a usable cached board the call
+        blocks on `timetable_departure`.
+        """
+        return self.departure_boards.get(
+            str(location_id),
+            max_staleness=max_staleness,
+            fetch=self.timetable_departure,
+        )
+
     def timetable_arrival(self, location_id=740015565):
         """Get the arrival board for a given location."""
-        url = f"https://api.resrobot.se/v2.1/arrivalBoard?id={location_id}&format=json&accessId={self.API_KEY}"
-        response = requests.get(url)
+        url = f"{self.base_url}/arrivalBoard?id={location_id}&format=json&accessId={self.API_KEY}"
+        response = self._get("arrivalBoard", url)
         return response.json()
 
     def nearby_stops(self, latitude, longitude, max_results=10):
@@ -94,7 +263,7 @@ class ResRobot:
         :param max_results: int - Maximum number of stops to return (default: 10)
         :return: List of nearby stops in JSON format
         """
-        url = "https://api.resrobot.se/v2.1/location.nearbystops"
+        url = f"{self.base_url}/location.nearbystops"
         params = {
             "originCoordLat": latitude,
             "originCoordLong": longitude,
@@ -104,20 +273,25 @@ class ResRobot:
         }
 
         try:
-            response = requests.get(url, params=params)
+            response = self._get("location.nearbystops", url, params=params)
             response.raise_for_status()
             data = response.json()
 
             stops = data.get("stopLocationOrCoordLocation", [])
 
             if not stops:
-                print("No nearby stops found.")
+                logger.debug("No nearby stops found.")
                 return []
 
-            print(
-                f"{'Stop Name':<40} {'Stop ID':<10} {'Latitude':<12} {'Longitude':<12} {'Distance':<10} {'Transport Types'}"  # noqa: E501
+            logger.debug(
+                "%-40s %-10s %-12s %-12s %-10s %s",
+                "Stop Name",
+                "Stop ID",
+                "Latitude",
+                "Longitude",
+                "Distance",
+                "Transport Types",
             )
-            print("-" * 110)
 
             results = []
             for stop in stops:
@@ -145,14 +319,20 @@ class ResRobot:
                     }
                 )
 
-                print(
-                    f"{stop_name:<40} {stop_id:<10} {lat:<12} {lon:<12} {distance:<10} {transport_types}"
+                logger.debug(
+                    "%-40s %-10s %-12s %-12s %-10s %s",
+                    stop_name,
+                    stop_id,
+                    lat,
+                    lon,
+                    distance,
+                    transport_types,
                 )
 
             return results
 
         except requests.exceptions.RequestException as err:
-            print(f"Error fetching nearby stops: {err}")
+            logger.warning("Error fetching nearby stops: %s", err)
             return []
 
     def name_from_access_id(self, ext_id):
@@ -169,10 +349,10 @@ class ResRobot:
         str
             The name of the location, or None if not found.
         """
-        url = f"https://api.resrobot.se/v2.1/location.name?input={ext_id}&format=json&accessId={self.API_KEY}"
+        url = f"{self.base_url}/location.name?input={ext_id}&format=json&accessId={self.API_KEY}"
 
         try:
-            response = requests.get(url)
+            response = self._get("location.name", url)
             response.raise_for_status()
 
             data = response.json()
@@ -182,7 +362,7 @@ class ResRobot:
                     return stop_data.get("name")
             return None  # Return None if no matching extId is found
         except requests.exceptions.RequestException as err:
-            print(f"Error fetching name for extId {ext_id}: {err}")
+            logger.warning("Error fetching name for extId %s: %s", ext_id, err)
             return None
 
     def nearby_stops2(self, latitude, longitude, max_results=10):
@@ -194,7 +374,7 @@ class ResRobot:
         :param max_results: int - Maximum number of stops to return (default: 10)
         :return: List of nearby stops in JSON format
         """
-        url = "https://api.resrobot.se/v2.1/location.nearbystops"
+        url = f"{self.base_url}/location.nearbystops"
         params = {
             "originCoordLat": latitude,
             "originCoordLong": longitude,
@@ -204,20 +384,25 @@ class ResRobot:
         }
 
         try:
-            response = requests.get(url, params=params)
+            response = self._get("location.nearbystops", url, params=params)
             response.raise_for_status()
             data = response.json()
 
             stops = data.get("stopLocationOrCoordLocation", [])
 
             if not stops:
-                print("No nearby stops found.")
+                logger.debug("No nearby stops found.")
                 return []
 
-            print(
-                f"{'Stop Name':<40} {'Stop ID':<10} {'Latitude':<12} {'Longitude':<12} {'Distance':<10} {'Transport Types'}"  # noqa: E501
+            logger.debug(
+                "%-40s %-10s %-12s %-12s %-10s %s",
+                "Stop Name",
+                "Stop ID",
+                "Latitude",
+                "Longitude",
+                "Distance",
+                "Transport Types",
             )
-            print("-" * 110)
 
             results = []
             for stop in stops:
@@ -245,14 +430,20 @@ class ResRobot:
                     }
                 )
 
-                print(
-                    f"{stop_name:<40} {stop_id:<10} {lat:<12} {lon:<12} {distance:<10} {transport_types}"
+                logger.debug(
+                    "%-40s %-10s %-12s %-12s %-10s %s",
+                    stop_name,
+                    stop_id,
+                    lat,
+                    lon,
+                    distance,
+                    transport_types,
                 )
 
             return results
 
         except requests.exceptions.RequestException as err:
-            print(f"Error fetching nearby stops: {err}")
+            logger.warning("Error fetching nearby stops: %s", err)
             return []
 
 
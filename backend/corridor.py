@@ -0,0 +1,241 @@
+import logging
+import threading
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from utils import tracing
+from utils.lazy_import import LazyModule
+from utils.projection import from_sweref99tm, to_sweref99tm
+
+logger = logging.getLogger(__name__)
+
+shapely = LazyModule("shapely")
+pd = LazyModule("pandas")
+
+# Metres per degree of latitude, for the coarse prefilter of nearby stops.
+METRES_PER_DEGREE = 111_000
+
+# Initial corridor half-width is base_m + per_km_m per km of straight-line hop,
+# capped at max_m. A fetch is accepted once both stations lie within snap_m of
+# the fetched network; otherwise the corridor grows by GROWTH, at most
+# `steps` times, and only the new ring around the previous corridor is queried.
+ModePolicy = namedtuple(
+    "ModePolicy", ["base_m", "per_km_m", "max_m", "snap_m", "steps"]
+)
+POLICIES = {
+    "rail": ModePolicy(base_m=300, per_km_m=40, max_m=15000, snap_m=500, steps=3),
+    "subway": ModePolicy(base_m=150, per_km_m=100, max_m=2500, snap_m=300, steps=3),
+    "tram": ModePolicy(base_m=100, per_km_m=80, max_m=2000, snap_m=200, steps=3),
+    "walk": ModePolicy(base_m=80, per_km_m=150, max_m=800, snap_m=150, steps=2),
+}
+GROWTH = 2.0
+# Stops within DENSITY_RADIUS_M of the hop's midpoint at which corridors keep
+# their nominal width; sparser areas get wider ones (up to 2x), denser areas
+# narrower ones (down to 0.5x).
+DENSITY_RADIUS_M = 2000
+REFERENCE_STOPS = 40
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+@lru_cache(maxsize=1)
+def _stop_table():
+    """The stop table, checked and memory-mapped once per process."""
+    from utils.stop_table import StopTable
+
+    return StopTable.cached()
+
+
+def stop_density_factor(midpoint):
+    """Width factor from the number of stops around `midpoint` (lat, lon)."""
+    table = _stop_table()
+    # A box in degrees that surely holds the circle, so only the stops in it
+    # are projected.
+    dlat = 1.5 * DENSITY_RADIUS_M / METRES_PER_DEGREE
+    dlon = dlat / np.cos(np.radians(midpoint[0]))
+    near = (np.abs(table.lats - midpoint[0]) <= dlat) & (
+        np.abs(table.lons - midpoint[1]) <= dlon
+    )
+    x, y = to_sweref99tm(table.lats[near], table.lons[near])
+    mx, my = to_sweref99tm([midpoint[0]], [midpoint[1]])
+    distances = np.hypot(x - mx[0], y - my[0])
+    nearby = int(np.count_nonzero(distances <= DENSITY_RADIUS_M))
+    return float(np.clip(np.sqrt(REFERENCE_STOPS / max(nearby, 1)), 0.5, 2.0))
+
+
+class Corridor:
+    """Query area around a straight hop from `start` to `end` (lat, lon), in metres."""
+
+    def __init__(self, mode, start, end, density_factor=1.0):
+        self.mode = mode
+        self.policy = POLICIES[mode]
+        x, y = to_sweref99tm([start[0], end[0]], [start[1], end[1]])
+        self.chord = shapely.LineString(np.column_stack([x, y]))
+        width = self.policy.base_m + self.policy.per_km_m * self.chord.length / 1000
+        self.half_width = min(width, self.policy.max_m) * density_factor
+
+    def polygon(self, half_width):
+        """Corridor of `half_width` metres as a lon/lat polygon."""
+        area = self.chord.buffer(half_width)
+        return shapely.transform(area, self._to_lonlat)
+
+    def ring(self, inner, outer):
+        """Area between the `inner` and `outer` corridors as a lon/lat MultiPolygon.
+
+        Cut in two along the hop's axis, since Overpass polygons cannot have holes.
+        """
+        area = self.chord.buffer(outer).difference(self.chord.buffer(inner))
+        (sx, sy), (ex, ey) = self.chord.coords
+        length = self.chord.length
+        dx, dy = ((ex - sx) / length, (ey - sy) / length) if length else (1.0, 0.0)
+        reach = 2 * outer
+        axis = shapely.LineString(
+            [(sx - dx * reach, sy - dy * reach), (ex + dx * reach, ey + dy * reach)]
+        )
+        # A 1 m gap keeps the halves apart, so the MultiPolygon stays valid.
+        return shapely.transform(area.difference(axis.buffer(0.5)), self._to_lonlat)
+
+    def _to_lonlat(self, xy):
+        lats, lons = from_sweref99tm(xy[:, 0], xy[:, 1])
+        return np.column_stack([lons, lats])
+
+    def area_km2(self, half_width):
+        return self.chord.buffer(half_width).area / 1e6
+
+    def snap_distances(self, features):
+        """Distance in metres from each end of the hop to the nearest fetched vertex."""
+        coords = shapely.get_coordinates(features.geometry.values)
+        if len(coords) == 0:
+            return np.inf, np.inf
+        x, y = to_sweref99tm(coords[:, 1], coords[:, 0])
+        (sx, sy), (ex, ey) = self.chord.coords
+        return (
+            float(np.sqrt(np.min((x - sx) ** 2 + (y - sy) ** 2))),
+            float(np.sqrt(np.min((x - ex) ** 2 + (y - ey) ** 2))),
+        )
+
+    def deviation_m(self, path):
+        """Largest distance in metres of a (lat, lon) path from the straight hop."""
+        path = np.asarray(path, dtype=float)
+        x, y = to_sweref99tm(path[:, 0], path[:, 1])
+        return float(shapely.distance(self.chord, shapely.points(x, y)).max())
+
+
+class CorridorQuery:
+    """Result of `fetch`: the features plus what was fetched to get them."""
+
+    def __init__(self, corridor, features, half_width, fetches, fetched_km2):
+        self.corridor = corridor
+        self.features = features
+        self.half_width = half_width
+        self.fetches = fetches
+        self.fetched_km2 = fetched_km2
+
+    def record(self, path=None):
+        """Add this query to the stats; `path` is the (lat, lon) route drawn from it.
+
+        The used area is the corridor just wide enough to hold the path (ways
+        crossing the corridor edge can take it further out; that is capped).
+        """
+        used_km2 = 0.0
+        if path is not None and len(path) > 1:
+            used_km2 = min(
+                self.corridor.area_km2(self.corridor.deviation_m(path) + 1),
+                self.fetched_km2,
+            )
+        with _stats_lock:
+            stats = _stats.setdefault(
+                self.corridor.mode,
+                {
+                    "queries": 0,
+                    "fetches": 0,
+                    "misses": 0,
+                    "fetched_km2": 0.0,
+                    "used_km2": 0.0,
+                },
+            )
+            stats["queries"] += 1
+            stats["fetches"] += self.fetches
+            stats["misses"] += path is None
+            stats["fetched_km2"] += self.fetched_km2
+            stats["used_km2"] += used_km2
+
+
+def fetch(mode, start, end, tags, features_from_polygon):
+    """Fetch OSM features for a hop through a corridor sized for `mode`.
+
+    `features_from_polygon(polygon, tags=...)` does the query (osmnx's, in
+    practice). Returns a CorridorQuery; call its `record(path)` once the route
+    has been drawn so fetched vs. used area can be tuned from `stats()`.
+    """
+    midpoint = ((start[0] + end[0]) / 2, (start[1] + end[1]) / 2)
+    corridor = Corridor(mode, start, end, stop_density_factor(midpoint))
+    half_width = corridor.half_width
+    previous = None
+    found = []
+    fetched_km2 = 0.0
+    for step in range(corridor.policy.steps + 1):
+        # After the first step only the new ring around the last corridor is queried.
+        if previous is None:
+            query_area = corridor.polygon(half_width)
+        else:
+            query_area = corridor.ring(previous, half_width)
+        with tracing.span(
+            "osm.fetch", mode=mode, step=step, half_width_m=round(half_width)
+        ):
+            part = _query(features_from_polygon, query_area, tags)
+        fetched_km2 += corridor.area_km2(half_width) - (
+            0 if previous is None else corridor.area_km2(previous)
+        )
+        if part is not None and len(part):
+            found.append(part)
+        features = _combine(found)
+        if features is not None and max(corridor.snap_distances(features)) <= (
+            corridor.policy.snap_m
+        ):
+            break
+        if step < corridor.policy.steps:
+            logger.debug("🔍 %s corridor %.0f m too narrow, growing", mode, half_width)
+            previous = half_width
+            half_width *= GROWTH
+    return CorridorQuery(corridor, features, half_width, step + 1, fetched_km2)
+
+
+def _query(features_from_polygon, polygon, tags):
+    try:
+        return features_from_polygon(polygon, tags=tags)
+    except Exception as err:
+        # osmnx raises instead of returning an empty frame.
+        if type(err).__name__ == "InsufficientResponseError":
+            return None
+        raise
+
+
+def _combine(parts):
+    if not parts:
+        return None
+    if len(parts) == 1:
+        return parts[0]
+    combined = pd.concat(parts)
+    return combined[~combined.index.duplicated()]
+
+
+def stats():
+    """Per mode: queries, fetches, misses, fetched and used km² and their ratio."""
+    with _stats_lock:
+        report = {mode: dict(values) for mode, values in _stats.items()}
+    for values in report.values():
+        values["used_ratio"] = (
+            round(values["used_km2"] / values["fetched_km2"], 4)
+            if values["fetched_km2"]
+            else None
+        )
+    return report
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
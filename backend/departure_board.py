@@ -0,0 +1,66 @@
+from collections import namedtuple
+
+from utils.time_utils import now64, parse_datetimes
+
+# Fields whose change means a departure row has to be redrawn.
+ROW_FIELDS = (
+    "time",
+    "date",
+    "rtTime",
+    "rtDate",
+    "track",
+    "rtTrack",
+    "direction",
+    "cancelled",
+)
+
+BoardDiff = namedtuple("BoardDiff", ["added", "changed", "removed"])
+
+
+def journey_id(dep):
+    """Stable id of a departure across polls: its JourneyDetailRef."""
+    ref = dep.get("JourneyDetailRef", {}).get("ref")
+    if ref:
+        return ref
+    return f"{dep.get('name')}|{dep.get('date')}|{dep.get('time')}"
+
+
+def departure_times(departures):
+    """Expected departures as a datetime64 array, using the real-time fields if present."""
+    return parse_datetimes(
+        [dep.get("rtDate") or dep.get("date") for dep in departures],
+        [dep.get("rtTime") or dep.get("time") for dep in departures],
+    )
+
+
+def index_board(board, now=None):
+    """Map journey id -> departure for a /departureBoard response.
+
+    Departures that have already left at `now` are dropped.
+    """
+    departures = board.get("Departure", []) if isinstance(board, dict) else []
+    gone = departure_times(departures) < now64(now)  # NaT compares False
+    return {
+        journey_id(dep): dep for dep, left in zip(departures, gone.tolist()) if not left
+    }
+
+
+def row_signature(dep):
+    return tuple(dep.get(field) for field in ROW_FIELDS)
+
+
+def diff_boards(old, new):
+    """Compare two indexed boards (see `index_board`).
+
+    Returns a BoardDiff of journey id lists: `added` are new departures,
+    `changed` have a new time, track, direction or cancellation and `removed`
+    have left or dropped off the board.
+    """
+    added = [key for key in new if key not in old]
+    removed = [key for key in old if key not in new]
+    changed = [
+        key
+        for key in new
+        if key in old and row_signature(old[key]) != row_signature(new[key])
+    ]
+    return BoardDiff(added, changed, removed)
@@ -0,0 +1,63 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+class DiskCache:
+    """Small persistent key/value cache for JSON-serializable values.
+
+    Entries live in a SQLite file so that the dashboard, batch jobs and
+    several worker processes can share them. Entries older than `ttl`
+    seconds are treated as missing.
+    """
+
+    def __init__(self, path, ttl=6 * 3600):
+        self.path = Path(path)
+        self.ttl = ttl
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(key TEXT PRIMARY KEY, value TEXT, stored REAL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(*parts):
+        return json.dumps(parts, default=str)
+
+    def get(self, key, default=None):
+        """Return the cached value for `key`, or `default` if missing or expired."""
+        row = (
+            self._connection()
+            .execute("SELECT value, stored FROM cache WHERE key = ?", (key,))
+            .fetchone()
+        )
+        if row is None or time.time() - row[1] > self.ttl:
+            return default
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time()),
+            )
+
+    def purge_expired(self):
+        """Delete expired entries and return how many were removed."""
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM cache WHERE stored < ?", (time.time() - self.ttl,)
+            )
+        return cursor.rowcount
@@ -0,0 +1,148 @@
+import csv
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+
+from utils.lazy_import import LazyModule
+
+pd = LazyModule("pandas")
+
+STOP_TIMES_CHUNK = 1_000_000
+WEEKDAYS = (
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "saturday",
+    "sunday",
+)
+
+
+def rows(path):
+    """Rows of a GTFS (or any UTF-8 CSV) file as dicts of str."""
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        yield from csv.DictReader(file)
+
+
+def read_stations(feed):
+    """stop_id -> (station id, lat, lon); platforms resolve to their parent station."""
+    by_id = {row["stop_id"]: row for row in rows(Path(feed) / "stops.txt")}
+    stations = {}
+    for stop_id, row in by_id.items():
+        station = by_id.get(row.get("parent_station") or stop_id, row)
+        stations[stop_id] = (
+            station["stop_id"],
+            float(station["stop_lat"]),
+            float(station["stop_lon"]),
+        )
+    return stations
+
+
+def read_trip_patterns(feed, route_ids):
+    """One trip id per (route, shape) of `route_ids`: trip_id -> (route_id, shape_id).
+
+    shape_id is None for trips without a shape.
+    """
+    patterns = {}
+    for row in rows(Path(feed) / "trips.txt"):
+        if row["route_id"] in route_ids:
+            key = (row["route_id"], row.get("shape_id") or None)
+            patterns.setdefault(key, row["trip_id"])
+    return {trip_id: key for key, trip_id in patterns.items()}
+
+
+def read_stop_sequences(feed, trip_ids):
+    """trip_id -> stop ids in stop_sequence order, for `trip_ids` only."""
+    sequences = {}
+    for row in rows(Path(feed) / "stop_times.txt"):
+        if row["trip_id"] in trip_ids:
+            sequences.setdefault(row["trip_id"], []).append(
+                (int(row["stop_sequence"]), row["stop_id"])
+            )
+    return {
+        trip_id: [stop for _, stop in sorted(seq)] for trip_id, seq in sequences.items()
+    }
+
+
+def read_shapes(feed, shape_ids):
+    """shape_id -> (n, 2) array of (lat, lon) in shape_pt_sequence order."""
+    points = {}
+    path = Path(feed) / "shapes.txt"
+    if not path.exists():
+        return {}
+    for row in rows(path):
+        if row["shape_id"] in shape_ids:
+            points.setdefault(row["shape_id"], []).append(
+                (
+                    int(row["shape_pt_sequence"]),
+                    float(row["shape_pt_lat"]),
+                    float(row["shape_pt_lon"]),
+                )
+            )
+    return {
+        shape_id: np.array([(lat, lon) for _, lat, lon in sorted(pts)])
+        for shape_id, pts in points.items()
+    }
+
+
+def day_key(day):
+    """`day` (date or "YYYY-MM-DD"/"YYYYMMDD") as GTFS "YYYYMMDD"."""
+    if isinstance(day, (date, datetime)):
+        return day.strftime("%Y%m%d")
+    return str(day).replace("-", "")
+
+
+def active_services(feed, day):
+    """service_ids of a GTFS feed running on `day`, from calendar(_dates).txt."""
+    feed = Path(feed)
+    key = day_key(day)
+    weekday = WEEKDAYS[datetime.strptime(key, "%Y%m%d").weekday()]
+    services = set()
+    if (feed / "calendar.txt").exists():
+        calendar = pd.read_csv(feed / "calendar.txt", dtype=str)
+        running = (
+            (calendar["start_date"] <= key)
+            & (calendar["end_date"] >= key)
+            & (calendar[weekday] == "1")
+        )
+        services.update(calendar.loc[running, "service_id"])
+    if (feed / "calendar_dates.txt").exists():
+        dates = pd.read_csv(feed / "calendar_dates.txt", dtype=str)
+        dates = dates[dates["date"] == key]
+        services.update(dates.loc[dates["exception_type"] == "1", "service_id"])
+        services.difference_update(
+            dates.loc[dates["exception_type"] == "2", "service_id"]
+        )
+    return services
+
+
+def seconds(times):
+    """GTFS "H:MM:SS" strings (hours may pass 24) to seconds after midnight."""
+    parts = times.str.split(":", expand=True).astype(np.int32)
+    return (parts[0] * 3600 + parts[1] * 60 + parts[2]).to_numpy(np.int32)
+
+
+def read_stop_times(feed, trip_ids):
+    """stop_times.txt rows of `trip_ids`, sorted by trip and stop_sequence."""
+    chunks = pd.read_csv(
+        Path(feed) / "stop_times.txt",
+        usecols=[
+            "trip_id",
+            "arrival_time",
+            "departure_time",
+            "stop_id",
+            "stop_sequence",
+        ],
+        dtype={
+            "trip_id": str,
+            "arrival_time": str,
+            "departure_time": str,
+            "stop_id": str,
+        },
+        chunksize=STOP_TIMES_CHUNK,
+    )
+    stop_times = pd.concat(chunk[chunk["trip_id"].isin(trip_ids)] for chunk in chunks)
+    stop_times = stop_times.dropna(subset=["arrival_time", "departure_time"])
+    return stop_times.sort_values(["trip_id", "stop_sequence"], kind="stable")
@@ -0,0 +1,134 @@
+from collections import namedtuple
+
+import numpy as np
+
+from utils import tracing
+from utils.lazy_import import LazyModule
+
+folium = LazyModule("folium")
+plugins = LazyModule("folium.plugins")
+
+# Rounds of RAPTOR: round k reaches what needs k vehicles, so 5 allows 4 changes.
+MAX_ROUNDS = 5
+# Time to change vehicles at a station.
+CHANGE_SECONDS = 60
+NEVER = np.iinfo(np.int64).max // 2
+
+# Stations reached, as arrays: arrival in seconds after midnight and the number
+# of vehicles taken (0 for the origin and the walks from it).
+Reachability = namedtuple(
+    "Reachability", ["stop_ids", "lats", "lons", "arrivals", "vehicles"]
+)
+
+
+def earliest_arrivals(timetable, origin, departure, max_seconds, max_rounds=MAX_ROUNDS):
+    """One-to-all earliest arrivals from station index `origin` (RAPTOR).
+
+    `departure` is in seconds after midnight. Returns (arrivals, vehicles) per
+    station; arrivals later than departure + max_seconds are NEVER.
+    """
+    limit = departure + max_seconds
+    best = np.full(len(timetable), NEVER, dtype=np.int64)
+    vehicles = np.full(len(timetable), -1, dtype=np.int64)
+    best[origin] = departure
+    vehicles[origin] = 0
+    marked = np.union1d([origin], _walk(timetable, best, vehicles, [origin], limit, 0))
+
+    for round_ in range(1, max_rounds + 1):
+        ready = best + (CHANGE_SECONDS if round_ > 1 else 0)
+        reached = np.zeros(len(timetable), dtype=bool)
+        for p in _patterns_serving(timetable, marked):
+            stops, arrivals, departures = timetable.pattern(p)
+            trips = len(departures)
+            # Index of the first catchable trip at each stop; columns are sorted
+            # and unreached stops (NEVER) count every trip, i.e. none is caught.
+            catch = np.count_nonzero(departures < ready[stops], axis=0)
+            # A trip caught upstream is still on board, so the best trip at a
+            # stop is the earliest caught at any stop before it.
+            boarded = np.minimum.accumulate(np.concatenate([[trips], catch[:-1]]))
+            riding = np.flatnonzero(boarded < trips)
+            if not len(riding):
+                continue
+            times = arrivals[boarded[riding], riding].astype(np.int64)
+            targets = stops[riding]
+            better = (times < best[targets]) & (times <= limit)
+            np.minimum.at(best, targets[better], times[better])
+            reached[targets[better]] = True
+        marked = np.flatnonzero(reached)
+        vehicles[marked] = round_
+        walked = _walk(timetable, best, vehicles, marked, limit, round_)
+        marked = np.union1d(marked, walked)
+        if not len(marked):
+            break
+    best[best > limit] = NEVER
+    return best, vehicles
+
+
+def _patterns_serving(timetable, stops):
+    offsets = timetable.stop_pattern_offsets
+    if not len(stops):
+        return np.empty(0, dtype=np.int64)
+    index = np.concatenate([np.arange(offsets[s], offsets[s + 1]) for s in stops])
+    return np.unique(timetable.stop_patterns[index])
+
+
+def _walk(timetable, best, vehicles, stops, limit, round_):
+    """Relax footpaths out of `stops`; returns the stations they improved."""
+    offsets = timetable.transfer_offsets
+    stops = np.asarray(stops, dtype=np.int64)
+    counts = offsets[stops + 1] - offsets[stops]
+    if not counts.sum():
+        return np.empty(0, dtype=np.int64)
+    index = np.concatenate([np.arange(offsets[s], offsets[s + 1]) for s in stops])
+    targets = timetable.transfer_stops[index]
+    times = np.repeat(best[stops], counts) + timetable.transfer_seconds[index]
+    better = (times < best[targets]) & (times <= limit)
+    np.minimum.at(best, targets[better], times[better])
+    improved = np.unique(targets[better])
+    vehicles[improved] = round_
+    return improved
+
+
+def reachable(timetable, stop_id, departure, max_minutes=30):
+    """Stations reachable from `stop_id` within `max_minutes` of `departure`.
+
+    `departure` is a datetime on the timetable's service day. Raises KeyError
+    if the stop has no service in the timetable.
+    """
+    seconds = departure.hour * 3600 + departure.minute * 60 + departure.second
+    with tracing.span("isochrone.raptor", minutes=max_minutes) as span:
+        arrivals, vehicles = earliest_arrivals(
+            timetable, timetable.find_stop(stop_id), seconds, max_minutes * 60
+        )
+        found = np.flatnonzero(arrivals < NEVER)
+        span.set(stations=len(found))
+    return Reachability(
+        np.asarray(timetable.stop_ids)[found],
+        np.asarray(timetable.lats)[found],
+        np.asarray(timetable.lons)[found],
+        arrivals[found],
+        vehicles[found],
+    )
+
+
+def heat_layer(reach, departure_seconds, max_minutes):
+    """One folium HeatMap of `reach`, hottest where the arrival is earliest."""
+    remaining = 1 - (reach.arrivals - departure_seconds) / (max_minutes * 60)
+    points = np.column_stack([reach.lats, reach.lons, np.clip(remaining, 0.05, 1)])
+    return plugins.HeatMap(
+        points.tolist(),
+        name=f"Inom {max_minutes} min",
+        min_opacity=0.3,
+        radius=18,
+        blur=14,
+    )
+
+
+def isochrone_map(reach, origin, departure, max_minutes):
+    """folium Map centred on `origin` (lat, lon) with the heat layer of `reach`."""
+    seconds = departure.hour * 3600 + departure.minute * 60 + departure.second
+    map_obj = folium.Map(location=list(origin), zoom_start=12)
+    heat_layer(reach, seconds, max_minutes).add_to(map_obj)
+    marker = folium.Marker(list(origin), popup="Start", icon=folium.Icon(color="green"))
+    marker.add_to(map_obj)
+    return map_obj
@@ -0,0 +1,94 @@
+import numpy as np
+
+from utils.lazy_import import LazyModule
+from utils.projection import nearest, to_sweref99tm
+
+shapely = LazyModule("shapely")
+
+# Vertices that round to the same 1e-7 degrees (about a centimetre) are one node.
+QUANTIZE_DECIMALS = 7
+
+_LINE_TYPES = (1, 2)  # shapely type ids of LineString and LinearRing
+_POLYGON = 3
+
+
+def line_parts(geometries):
+    """Flatten geometries into single lines.
+
+    Multi-part geometries and collections are split, polygons (areas such as
+    pedestrian squares) contribute their rings and points are dropped.
+    """
+    parts = shapely.get_parts(np.asarray(geometries, dtype=object))
+    types = shapely.get_type_id(parts)
+    rings = shapely.get_parts(shapely.boundary(parts[types == _POLYGON]))
+    return np.concatenate([parts[np.isin(types, _LINE_TYPES)], rings])
+
+
+class FeatureGraph:
+    """Undirected graph of the ways in an OSM GeoDataFrame, as flat arrays.
+
+    Nodes are numbered 0..n-1 with their `lats`/`lons` in degrees and `x`/`y`
+    in SWEREF99 TM metres. Each undirected edge appears once in `src`, `dst`
+    (src < dst) with its length in metres in `weight`, so the arrays can go
+    straight into a sparse matrix or a CSR graph.
+    """
+
+    def __init__(self, lats, lons, src, dst):
+        self.lats = lats
+        self.lons = lons
+        self.x, self.y = to_sweref99tm(lats, lons)
+        self.src = src
+        self.dst = dst
+        self.weight = np.hypot(self.x[src] - self.x[dst], self.y[src] - self.y[dst])
+
+    @classmethod
+    def from_features(cls, features, decimals=QUANTIZE_DECIMALS):
+        """Build from the (Multi)LineStrings and polygons of `features`."""
+        lines = line_parts(features.geometry.values)
+        coords, part = shapely.get_coordinates(lines, return_index=True)
+        return cls.from_coords(coords, part, decimals)
+
+    @classmethod
+    def from_segments(cls, lats1, lons1, lats2, lons2, decimals=QUANTIZE_DECIMALS):
+        """Build from separate segments, e.g. edges saved by another graph."""
+        coords = np.empty((2 * len(lats1), 2))
+        coords[0::2, 0], coords[0::2, 1] = lons1, lats1
+        coords[1::2, 0], coords[1::2, 1] = lons2, lats2
+        return cls.from_coords(coords, np.arange(len(coords)) // 2, decimals)
+
+    @classmethod
+    def from_coords(cls, coords, part, decimals=QUANTIZE_DECIMALS):
+        """Build from (lon, lat) vertices where `part` numbers the line of each."""
+        scale = 10**decimals
+        # Pack quantized (lat, lon) into one int64 key: |lat| < 2**30 and
+        # |lon| < 2**31 in units of 1e-7 degrees.
+        qlat = np.round(coords[:, 1] * scale).astype(np.int64)
+        qlon = np.round(coords[:, 0] * scale).astype(np.int64)
+        keys = (qlat << 32) + (qlon + 2**31)
+        _, first, node = np.unique(keys, return_index=True, return_inverse=True)
+        node = node.ravel()
+
+        same_line = part[1:] == part[:-1]
+        a, b = node[:-1][same_line], node[1:][same_line]
+        keep = a != b
+        src, dst = np.minimum(a, b)[keep], np.maximum(a, b)[keep]
+        # Ways drawn over each other (double tracks merged by quantizing, ways
+        # sharing a segment) give the same edge more than once.
+        _, unique_edges = np.unique(src * len(first) + dst, return_index=True)
+        return cls(
+            coords[first, 1], coords[first, 0], src[unique_edges], dst[unique_edges]
+        )
+
+    def __len__(self):
+        return len(self.lats)
+
+    def nearest(self, lat, lon, candidates=None):
+        """Index of the node closest to (lat, lon), among `candidates` if given."""
+        px, py = to_sweref99tm(lat, lon)
+        if candidates is None:
+            return nearest(self.x, self.y, px, py)
+        return int(candidates[nearest(self.x[candidates], self.y[candidates], px, py)])
+
+    def path_coords(self, path):
+        """[(lat, lon), ...] of a sequence of node indices."""
+        return list(zip(self.lats[path].tolist(), self.lons[path].tolist()))
@@ -0,0 +1,187 @@
+import heapq
+
+import numpy as np
+
+from utils import config
+from utils.lazy_import import LazyModule
+
+csgraph = LazyModule("scipy.sparse.csgraph")
+sparse = LazyModule("scipy.sparse")
+nx = LazyModule("networkx")
+
+# Backend for the map plotters, overridable with the PATH_ENGINE setting.
+# "astar" expands far fewer nodes but runs its loop in Python, which on the
+# benchmark corridors is no faster than csgraph's compiled Dijkstra.
+# "networkx" is the slower reference implementation.
+DEFAULT_ENGINE = "csr"
+
+
+class PathEngine:
+    """Shortest paths over the node indices of a FeatureGraph."""
+
+    name = None
+
+    def __init__(self, graph):
+        self.graph = graph
+        # Nodes settled by the last shortest_path call, for regression tracking.
+        self.expanded = 0
+
+    def components(self):
+        """Connected component label of every node."""
+        raise NotImplementedError
+
+    def shortest_path(self, sources, targets):
+        """Node indices of the shortest path from any of `sources` to any of
+        `targets` (single indices or sequences), or None if none is reachable.
+        """
+        raise NotImplementedError
+
+    def largest_component(self):
+        """Indices of the nodes in the largest connected component."""
+        labels = self.components()
+        if not len(labels):
+            return labels
+        return np.flatnonzero(labels == np.bincount(labels).argmax())
+
+
+class CsrEngine(PathEngine):
+    """scipy.sparse.csgraph on the graph's edge arrays; no per-node Python objects."""
+
+    name = "csr"
+
+    def __init__(self, graph):
+        super().__init__(graph)
+        n = len(graph)
+        self.matrix = sparse.csr_array(
+            (graph.weight, (graph.src, graph.dst)), shape=(n, n)
+        )
+
+    def components(self):
+        _, labels = csgraph.connected_components(self.matrix, directed=False)
+        return labels
+
+    def shortest_path(self, sources, targets):
+        sources = np.atleast_1d(sources)
+        targets = np.atleast_1d(targets)
+        dist, predecessors, _ = csgraph.dijkstra(
+            self.matrix,
+            directed=False,
+            indices=sources,
+            min_only=True,
+            return_predecessors=True,
+        )
+        self.expanded = int(np.count_nonzero(np.isfinite(dist)))
+        reached = dist[targets]
+        if not np.isfinite(reached).any():
+            return None
+        node = int(targets[np.argmin(reached)])
+        path = [node]
+        while predecessors[node] >= 0:
+            node = int(predecessors[node])
+            path.append(node)
+        return path[::-1]
+
+
+class NetworkxEngine(PathEngine):
+    """networkx on a Graph keyed by node index."""
+
+    name = "networkx"
+
+    def __init__(self, graph):
+        super().__init__(graph)
+        self.G = nx.Graph()
+        self.G.add_nodes_from(range(len(graph)))
+        self.G.add_weighted_edges_from(
+            zip(graph.src.tolist(), graph.dst.tolist(), graph.weight.tolist())
+        )
+
+    def components(self):
+        labels = np.empty(len(self.graph), dtype=np.int64)
+        for label, nodes in enumerate(nx.connected_components(self.G)):
+            labels[list(nodes)] = label
+        return labels
+
+    def shortest_path(self, sources, targets):
+        dist, paths = nx.multi_source_dijkstra(
+            self.G, set(np.atleast_1d(sources).tolist()), weight="weight"
+        )
+        self.expanded = len(dist)
+        reached = [t for t in np.atleast_1d(targets).tolist() if t in dist]
+        if not reached:
+            return None
+        return paths[min(reached, key=dist.get)]
+
+
+class AstarEngine(CsrEngine):
+    """A* towards the targets, stopping as soon as one is settled.
+
+    Edge weights are straight-line metres in SWEREF99 TM, so the straight-line
+    distance to the nearest target in the same projection never overestimates
+    and each node is expanded at most once. Dijkstra settles every reachable
+    node instead; on a long hop A* only expands a band around the track.
+    """
+
+    name = "astar"
+
+    def __init__(self, graph):
+        super().__init__(graph)
+        self.adjacency = (self.matrix + self.matrix.T).tocsr()
+
+    def shortest_path(self, sources, targets):
+        targets = np.atleast_1d(targets)
+        x, y = self.graph.x, self.graph.y
+        heuristic = np.hypot(x - x[targets[0]], y - y[targets[0]])
+        for target in targets[1:]:
+            np.minimum(heuristic, np.hypot(x - x[target], y - y[target]), heuristic)
+        goals = set(targets.tolist())
+        indptr = self.adjacency.indptr
+        indices = self.adjacency.indices
+        weights = self.adjacency.data
+
+        cost = {}
+        parent = {}
+        heap = []
+        for source in np.atleast_1d(sources).tolist():
+            cost[source] = 0.0
+            parent[source] = -1
+            heap.append((float(heuristic[source]), source))
+        heapq.heapify(heap)
+        settled = set()
+        node = None
+        while heap:
+            _, current = heapq.heappop(heap)
+            if current in settled:
+                continue
+            settled.add(current)
+            if current in goals:
+                node = current
+                break
+            base = cost[current]
+            lo, hi = indptr[current], indptr[current + 1]
+            for neighbour, weight in zip(
+                indices[lo:hi].tolist(), weights[lo:hi].tolist()
+            ):
+                candidate = base + weight
+                if candidate < cost.get(neighbour, np.inf):
+                    cost[neighbour] = candidate
+                    parent[neighbour] = current
+                    heapq.heappush(heap, (candidate + heuristic[neighbour], neighbour))
+        self.expanded = len(settled)
+        if node is None:
+            return None
+        path = [node]
+        while parent[node] >= 0:
+            node = parent[node]
+            path.append(node)
+        return path[::-1]
+
+
+ENGINES = {engine.name: engine for engine in (CsrEngine, AstarEngine, NetworkxEngine)}
+
+
+def create(graph, name=None):
+    """Path engine for `graph`: `name`, else the PATH_ENGINE setting, else csr."""
+    name = name or config.get_setting("PATH_ENGINE", DEFAULT_ENGINE)
+    if name not in ENGINES:
+        raise ValueError(f"Unknown path engine {name!r}, use one of {sorted(ENGINES)}")
+    return ENGINES[name](graph)
@@ -0,0 +1,213 @@
+import argparse
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+from polyline import decode, encode
+
+from backend import gtfs, path_engine
+from backend.osm_graph import FeatureGraph
+from utils.constants import DATA_PATH, RAIL_SHAPES_PATH
+from utils.lazy_import import LazyModule
+from utils.log import configure_logging
+from utils.projection import nearest, to_sweref99tm
+
+logger = logging.getLogger(__name__)
+
+spatial = LazyModule("scipy.spatial")
+
+# GTFS route_type values drawn as rail: 2 and the extended railway types 100-117.
+RAIL_ROUTE_TYPES = {2, *range(100, 118)}
+
+
+class RailShapeStore:
+    """Precomputed rail polylines between consecutive stations, in SQLite.
+
+    Keys are station ids as used by ResRobot (extId). A segment stored for
+    (a, b) is also returned, reversed, for (b, a). A missing file simply has
+    no segments, so the map falls back to querying OSM.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._local = threading.local()
+
+    def _connection(self, create=False):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if not create and not self.path.exists():
+                return None
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS segments (from_id TEXT, to_id TEXT, "
+                "route_id TEXT, polyline TEXT, PRIMARY KEY (from_id, to_id))"
+            )
+            self._local.conn = conn
+        return conn
+
+    def get(self, from_id, to_id):
+        """[(lat, lon), ...] from station `from_id` to `to_id`, or None."""
+        conn = self._connection()
+        if conn is None:
+            return None
+        row = conn.execute(
+            "SELECT polyline, from_id = ? FROM segments WHERE "
+            "(from_id = ? AND to_id = ?) OR (from_id = ? AND to_id = ?) "
+            "ORDER BY 2 DESC LIMIT 1",
+            (str(from_id), str(from_id), str(to_id), str(to_id), str(from_id)),
+        ).fetchone()
+        if row is None:
+            return None
+        coords = decode(row[0])
+        return coords if row[1] else coords[::-1]
+
+    def put_many(self, segments):
+        """Store `(from_id, to_id, route_id, coords)` rows; existing pairs are kept."""
+        conn = self._connection(create=True)
+        with conn:
+            cursor = conn.executemany(
+                "INSERT OR IGNORE INTO segments VALUES (?, ?, ?, ?)",
+                (
+                    (str(a), str(b), str(route_id), encode(coords))
+                    for a, b, route_id, coords in segments
+                ),
+            )
+        return cursor.rowcount
+
+    def __len__(self):
+        conn = self._connection()
+        if conn is None:
+            return 0
+        return conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+
+
+def read_rail_routes(
+    routes_path=DATA_PATH / "routes.txt", route_types=RAIL_ROUTE_TYPES
+):
+    """Route ids of the rail routes in a GTFS routes.txt."""
+    return {
+        row["route_id"]
+        for row in gtfs.rows(routes_path)
+        if row.get("route_type", "").isdigit() and int(row["route_type"]) in route_types
+    }
+
+
+def cut_shape(shape, stations):
+    """Split a shape into one polyline per consecutive pair of `stations` (lat, lon).
+
+    Each station is matched to its nearest shape point at or after the
+    previous station's, so loops and out-and-back shapes are cut in order.
+    """
+    x, y = to_sweref99tm(shape[:, 0], shape[:, 1])
+    sx, sy = to_sweref99tm(*np.asarray(stations, dtype=float).T)
+    start = 0
+    cuts = []
+    for px, py in zip(sx, sy):
+        start += nearest(x[start:], y[start:], px, py)
+        cuts.append(start)
+    pieces = []
+    for (a, b), origin, destination in zip(
+        zip(cuts[:-1], cuts[1:]), stations[:-1], stations[1:]
+    ):
+        if b > a:
+            pieces.append([tuple(point) for point in shape[a : b + 1]])  # noqa: E203
+        else:
+            pieces.append([tuple(origin), tuple(destination)])
+    return pieces
+
+
+class OsmRailRouter:
+    """Shortest paths on a local OSM rail extract (any file geopandas can read).
+
+    Uses the same metre-weighted FeatureGraph and path engine as the train
+    legs drawn from live OSM data.
+    """
+
+    def __init__(self, extract_path):
+        import geopandas as gpd
+
+        self.graph = FeatureGraph.from_features(gpd.read_file(extract_path))
+        self.engine = path_engine.create(self.graph)
+        self.tree = spatial.cKDTree(np.column_stack([self.graph.x, self.graph.y]))
+        logger.info(
+            "🛤️ Rail extract: %d nodes, %d edges", len(self.graph), len(self.graph.src)
+        )
+
+    def snap(self, lat, lon):
+        """Node closest to (lat, lon)."""
+        x, y = to_sweref99tm([lat], [lon])
+        return int(self.tree.query([x[0], y[0]])[1])
+
+    def route(self, origin, destination):
+        """[(lat, lon), ...] between two stations, or None without a rail path."""
+        path = self.engine.shortest_path(self.snap(*origin), self.snap(*destination))
+        if path is None:
+            return None
+        return self.graph.path_coords(path)
+
+
+def build_store(feed, store, routes_path=DATA_PATH / "routes.txt", osm_extract=None):
+    """Fill `store` with one polyline per consecutive station pair of every rail route.
+
+    Station sequences come from the GTFS feed in directory `feed` (trips.txt,
+    stop_times.txt and stops.txt). Segments are cut from the feed's shapes.txt;
+    trips without a shape are routed on `osm_extract` if given. Returns the
+    number of segments written.
+    """
+    route_ids = read_rail_routes(routes_path)
+    patterns = gtfs.read_trip_patterns(feed, route_ids)
+    sequences = gtfs.read_stop_sequences(feed, set(patterns))
+    shapes = gtfs.read_shapes(feed, {shape for _, shape in patterns.values() if shape})
+    stations = gtfs.read_stations(feed)
+    router = OsmRailRouter(osm_extract) if osm_extract else None
+    logger.info(
+        "🚆 %d rail routes, %d trip patterns, %d shapes",
+        len(route_ids),
+        len(patterns),
+        len(shapes),
+    )
+
+    segments = {}
+    for trip_id, stops in sequences.items():
+        route_id, shape_id = patterns[trip_id]
+        ids = [stations[stop][0] for stop in stops]
+        coords = [stations[stop][1:] for stop in stops]
+        if shape_id in shapes:
+            pieces = cut_shape(shapes[shape_id], coords)
+        elif router is not None:
+            pieces = [router.route(a, b) for a, b in zip(coords[:-1], coords[1:])]
+        else:
+            continue
+        for a, b, piece in zip(ids[:-1], ids[1:], pieces):
+            if piece and a != b and (b, a) not in segments:
+                segments.setdefault((a, b), (route_id, piece))
+    return store.put_many(
+        (a, b, route_id, piece) for (a, b), (route_id, piece) in segments.items()
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Precompute rail polylines between consecutive stations from a "
+        "local GTFS feed, so train legs are drawn without querying OSM."
+    )
+    parser.add_argument("feed", help="directory with an unpacked GTFS feed")
+    parser.add_argument("--routes", default=str(DATA_PATH / "routes.txt"))
+    parser.add_argument(
+        "--osm-extract", help="rail LineStrings (e.g. GeoJSON) for trips without shapes"
+    )
+    parser.add_argument("--store", default=str(RAIL_SHAPES_PATH))
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    written = build_store(
+        args.feed, RailShapeStore(args.store), args.routes, args.osm_extract
+    )
+    print(f"💾 {written} segments written to {args.store}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import closing
+
+# ResRobot "Brons" level: 45 calls per minute and 30 000 calls per month.
+DEFAULT_RATE_PER_MINUTE = 45
+DEFAULT_BURST = 10
+LEDGER_RETENTION_SECONDS = 31 * 24 * 3600
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call would exceed the rate limit and the caller chose fast-fail."""
+
+    def __init__(self, key_name, endpoint, retry_after):
+        super().__init__(
+            f"Rate limit for {key_name}/{endpoint} exceeded, retry in {retry_after:.2f}s"
+        )
+        self.key_name = key_name
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate` tokens per second up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens=1):
+        """Take `tokens` if available. Returns 0 on success, else seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def refund(self, tokens=1):
+        """Give back `tokens` taken for a call that was not made."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def drain(self, seconds):
+        """Empty the bucket so that no token is available for `seconds` (e.g. Retry-After)."""
+        with self._lock:
+            self._tokens = -seconds * self.rate
+            self._updated = time.monotonic()
+
+
+class SQLiteTokenBucket:
+    """Token bucket whose state lives in a SQLite file shared between processes."""
+
+    def __init__(self, path, name, rate, capacity):
+        self.path = str(path)
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets "
+                "(name TEXT PRIMARY KEY, tokens REAL, updated REAL)"
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO buckets VALUES (?, ?, ?)",
+                (name, float(capacity), time.time()),
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def try_acquire(self, tokens=1):
+        """Take `tokens` if available. Returns 0 on success, else seconds to wait."""
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE takes the write lock so read-modify-write is atomic
+            # across processes.
+            conn.execute("BEGIN IMMEDIATE")
+            stored, updated = conn.execute(
+                "SELECT tokens, updated FROM buckets WHERE name = ?", (self.name,)
+            ).fetchone()
+            now = time.time()
+            available = min(self.capacity, stored + (now - updated) * self.rate)
+            wait = 0.0
+            if available >= tokens:
+                available -= tokens
+            else:
+                wait = (tokens - available) / self.rate
+            conn.execute(
+                "UPDATE buckets SET tokens = ?, updated = ? WHERE name = ?",
+                (available, now, self.name),
+            )
+            conn.execute("COMMIT")
+            return wait
+        finally:
+            conn.close()
+
+    def refund(self, tokens=1):
+        """Give back `tokens` taken for a call that was not made."""
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE buckets SET tokens = MIN(?, tokens + ?) WHERE name = ?",
+                (float(self.capacity), tokens, self.name),
+            )
+
+    def drain(self, seconds):
+        """Empty the bucket so that no token is available for `seconds` (e.g. Retry-After)."""
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE buckets SET tokens = ?, updated = ? WHERE name = ?",
+                (-seconds * self.rate, time.time(), self.name),
+            )
+
+
+class QuotaLedger:
+    """Rolling record of API calls per key and endpoint.
+
+    Only the key *name* (e.g. "API_KEY") is stored, never the key itself.
+    """
+
+    def __init__(self, retention=LEDGER_RETENTION_SECONDS):
+        self.retention = retention
+        self._calls = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    def record(self, key_name, endpoint, status=None, timestamp=None):
+        """Record one call. `status` is the HTTP status code, or None on network error."""
+        now = time.time() if timestamp is None else timestamp
+        with self._lock:
+            calls = self._calls[(key_name, endpoint)]
+            calls.append((now, status))
+            while calls and calls[0][0] < now - self.retention:
+                calls.popleft()
+
+    def count(self, key_name=None, endpoint=None, window=60, status=None):
+        """Number of calls in the last `window` seconds, optionally filtered."""
+        since = time.time() - window
+        with self._lock:
+            return sum(
+                1
+                for (key, ep), calls in self._calls.items()
+                if key_name in (None, key) and endpoint in (None, ep)
+                for ts, code in calls
+                if ts >= since and status in (None, code)
+            )
+
+    def summary(self, window=60):
+        """Per (key name, endpoint) call and throttled (HTTP 429) counts in `window` seconds."""
+        since = time.time() - window
+        with self._lock:
+            snapshot = {pair: list(calls) for pair, calls in self._calls.items()}
+        result = {}
+        for (key_name, endpoint), calls in snapshot.items():
+            recent = [code for ts, code in calls if ts >= since]
+            if recent:
+                result[(key_name, endpoint)] = {
+                    "calls": len(recent),
+                    "throttled": sum(1 for code in recent if code == 429),
+                    "errors": sum(1 for code in recent if code is None or code >= 400),
+                }
+        return result
+
+
+class SQLiteQuotaLedger(QuotaLedger):
+    """QuotaLedger kept in a SQLite file, so every process sharing it is counted."""
+
+    def __init__(self, path, retention=LEDGER_RETENTION_SECONDS):
+        self.path = str(path)
+        self.retention = retention
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS calls "
+                "(ts REAL, key_name TEXT, endpoint TEXT, status INTEGER)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS calls_ts ON calls (ts)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def record(self, key_name, endpoint, status=None, timestamp=None):
+        """Record one call. `status` is the HTTP status code, or None on network error."""
+        now = time.time() if timestamp is None else timestamp
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO calls VALUES (?, ?, ?, ?)",
+                    (now, key_name, endpoint, status),
+                )
+                conn.execute("DELETE FROM calls WHERE ts < ?", (now - self.retention,))
+        finally:
+            conn.close()
+
+    def _since(self, window):
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT key_name, endpoint, status FROM calls WHERE ts >= ?",
+                (time.time() - window,),
+            ).fetchall()
+        finally:
+            conn.close()
+
+    def count(self, key_name=None, endpoint=None, window=60, status=None):
+        """Number of calls in the last `window` seconds, optionally filtered."""
+        return sum(
+            1
+            for key, ep, code in self._since(window)
+            if key_name in (None, key)
+            and endpoint in (None, ep)
+            and status in (None, code)
+        )
+
+    def summary(self, window=60):
+        """Per (key name, endpoint) call and throttled (HTTP 429) counts in `window` seconds."""
+        result = {}
+        for key_name, endpoint, code in self._since(window):
+            counts = result.setdefault(
+                (key_name, endpoint), {"calls": 0, "throttled": 0, "errors": 0}
+            )
+            counts["calls"] += 1
+            counts["throttled"] += code == 429
+            counts["errors"] += code is None or code >= 400
+        return result
+
+
+class RateLimiter:
+    """Token-bucket rate limiting per API key, plus a quota ledger.
+
+    ResRobot counts its quota per key, so all endpoints of a key draw from one
+    bucket. An endpoint listed in `limits` additionally gets its own bucket.
+
+    Parameters:
+      rate_per_minute: Default refill rate of every key's bucket.
+      burst:           Default bucket capacity.
+      limits:          Optional {(key_name, endpoint): (rate_per_minute, burst)}
+                       overrides. Endpoint None sets the key's own bucket; a
+                       named endpoint adds a tighter bucket for that endpoint.
+      store_path:      Optional SQLite file. When given, buckets and the quota
+                       ledger are shared by every process that uses the file.
+      block:           Default behaviour when no token is available: wait (True)
+                       or raise RateLimitExceeded (False).
+    """
+
+    def __init__(
+        self,
+        rate_per_minute=DEFAULT_RATE_PER_MINUTE,
+        burst=DEFAULT_BURST,
+        limits=None,
+        store_path=None,
+        block=True,
+    ):
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self.limits = dict(limits or {})
+        self.store_path = store_path
+        self.block = block
+        self.ledger = SQLiteQuotaLedger(store_path) if store_path else QuotaLedger()
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, key_name, endpoint=None):
+        """Return (creating on first use) the bucket of a key, or of one of its
+        endpoints if that has its own limit in `limits`.
+        """
+        if (key_name, endpoint) not in self.limits:
+            endpoint = None
+        with self._lock:
+            bucket = self._buckets.get((key_name, endpoint))
+            if bucket is None:
+                rate_per_minute, burst = self.limits.get(
+                    (key_name, endpoint), (self.rate_per_minute, self.burst)
+                )
+                if self.store_path:
+                    bucket = SQLiteTokenBucket(
+                        self.store_path,
+                        f"{key_name}/{endpoint}",
+                        rate_per_minute / 60,
+                        burst,
+                    )
+                else:
+                    bucket = TokenBucket(rate_per_minute / 60, burst)
+                self._buckets[(key_name, endpoint)] = bucket
+            return bucket
+
+    def acquire(self, key_name, endpoint, block=None, timeout=None):
+        """Take one token for `key_name`/`endpoint`.
+
+        With `block` (defaults to the limiter's setting) the call waits until a
+        token is free, or until `timeout` seconds have passed. Otherwise, and on
+        timeout, RateLimitExceeded is raised.
+        """
+        block = self.block if block is None else block
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # A call needs a token from every bucket; if a later one refuses, the
+        # tokens already taken are given back so the refused call costs nothing.
+        taken = []
+        try:
+            for bucket in self._buckets_for(key_name, endpoint):
+                while True:
+                    wait = bucket.try_acquire()
+                    if wait <= 0:
+                        taken.append(bucket)
+                        break
+                    if not block or (
+                        deadline is not None and time.monotonic() + wait > deadline
+                    ):
+                        raise RateLimitExceeded(key_name, endpoint, wait)
+                    time.sleep(wait)
+        except RateLimitExceeded:
+            for bucket in taken:
+                bucket.refund()
+            raise
+
+    def _buckets_for(self, key_name, endpoint):
+        buckets = [self.bucket(key_name)]
+        if endpoint is not None and (key_name, endpoint) in self.limits:
+            buckets.insert(0, self.bucket(key_name, endpoint))
+        return buckets
+
+    def record(self, key_name, endpoint, status=None, retry_after=None):
+        """Record the outcome of a call; a 429 response empties the bucket."""
+        self.ledger.record(key_name, endpoint, status)
+        if status == 429:
+            for bucket in self._buckets_for(key_name, endpoint):
+                bucket.drain(float(retry_after or 60))
@@ -0,0 +1,64 @@
+import threading
+
+
+class _Call:
+    """A single in-flight call that other callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls that share the same key.
+
+    The first caller for a key runs the function; callers arriving while it is
+    still running wait for it and receive the very same result object (or the
+    same exception). Once the call finishes the key is forgotten, so this is
+    request coalescing and not a cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._metrics = {"calls": 0, "executed": 0, "coalesced": 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run `fn(*args, **kwargs)` once per concurrent `key` and share the result."""
+        with self._lock:
+            self._metrics["calls"] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._metrics["executed"] += 1
+            else:
+                self._metrics["coalesced"] += 1
+
+        if leader:
+            try:
+                call.result = fn(*args, **kwargs)
+            except BaseException as err:
+                call.error = err
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def in_flight(self):
+        """Number of keys that currently have a running call."""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        """Snapshot of the counters: total calls, upstream executions and coalesced calls."""
+        with self._lock:
+            return dict(self._metrics)
@@ -0,0 +1,84 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StaleWhileRevalidateCache:
+    """Serve cached values at once and refresh them in the background.
+
+    Parameters:
+      fetch:         Callable taking the key and returning a fresh value. Can
+                     also be given per call to `get`.
+      refresh_after: Seconds after which a value is considered stale. Stale
+                     values are still served, but trigger a background refresh.
+      max_staleness: Seconds after which a value is too old to be served and
+                     the caller blocks on a fresh fetch instead.
+    """
+
+    def __init__(self, fetch=None, refresh_after=30, max_staleness=300):
+        self.fetch = fetch
+        self.refresh_after = refresh_after
+        self.max_staleness = max_staleness
+        self._entries = {}  # key -> (value, fetched_at)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get(self, key, max_staleness=None, fetch=None):
+        """Return `(value, age_seconds)` for `key`.
+
+        `max_staleness` and `fetch` override the cache defaults for this call.
+        """
+        fetch = fetch or self.fetch
+        max_staleness = self.max_staleness if max_staleness is None else max_staleness
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            value, fetched_at = entry
+            age = time.time() - fetched_at
+            if age <= max_staleness:
+                if age > self.refresh_after:
+                    self._refresh_in_background(key, fetch)
+                return value, age
+        return self._refresh(key, fetch), 0.0
+
+    def peek(self, key):
+        """Return `(value, age_seconds)` without fetching, or None if nothing is cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return entry[0], time.time() - entry[1]
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when `key` is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def _refresh(self, key, fetch):
+        value = fetch(key)
+        if value is not None:
+            with self._lock:
+                self._entries[key] = (value, time.time())
+        return value
+
+    def _refresh_in_background(self, key, fetch):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self._refresh(key, fetch)
+            except Exception as err:
+                logger.warning("Background refresh of %s failed: %s", key, err)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
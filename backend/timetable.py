@@ -0,0 +1,265 @@
+import argparse
+import logging
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from backend import gtfs
+from backend.walking import straight_seconds
+from utils.constants import TIMETABLE_PATH
+from utils.lazy_import import LazyModule
+from utils.log import configure_logging
+from utils.projection import to_sweref99tm
+
+logger = logging.getLogger(__name__)
+
+pd = LazyModule("pandas")
+spatial = LazyModule("scipy.spatial")
+
+# Stations this close are linked by a footpath, timed like `walking.straight_walk`.
+TRANSFER_RADIUS_M = 400
+
+
+class Timetable:
+    """One service day of a GTFS feed as flat arrays, laid out for RAPTOR.
+
+      stop_ids, lats, lons:   stations (GTFS stop_id strings); platforms are
+                              merged into their parent.
+      pattern_stops:          station index per stop of every pattern, back to
+                              back; pattern p is pattern_stops[pattern_offsets[p]:pattern_offsets[p + 1]].
+      arrivals, departures:   int32 seconds after midnight; pattern p's trips
+                              form a (trips, stops) block starting at time_offsets[p].
+      stop_patterns:          patterns serving each station, station s is
+                              stop_patterns[stop_pattern_offsets[s]:stop_pattern_offsets[s + 1]].
+      transfer_stops, transfer_seconds: footpaths from station s, likewise by
+                              transfer_offsets.
+
+    A pattern is a sequence of stations plus the trips running it, sorted by
+    departure; trips that overtake each other are put in separate patterns,
+    so every column of a pattern's times is sorted too.
+    """
+
+    FIELDS = (
+        "stop_ids",
+        "lats",
+        "lons",
+        "pattern_stops",
+        "pattern_offsets",
+        "time_offsets",
+        "arrivals",
+        "departures",
+        "stop_patterns",
+        "stop_pattern_offsets",
+        "transfer_stops",
+        "transfer_seconds",
+        "transfer_offsets",
+    )
+
+    def __init__(self, **arrays):
+        for field in self.FIELDS:
+            setattr(self, field, arrays[field])
+        self._id_order = np.argsort(self.stop_ids, kind="stable")
+
+    def save(self, directory):
+        """Write the arrays as .npy files into `directory`."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for field in self.FIELDS:
+            np.save(directory / f"{field}.npy", np.asarray(getattr(self, field)))
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Load a saved timetable, memory-mapped read-only unless `mmap` is False."""
+        directory = Path(directory)
+        mode = "r" if mmap else None
+        return cls(
+            **{
+                field: np.load(directory / f"{field}.npy", mmap_mode=mode)
+                for field in cls.FIELDS
+            }
+        )
+
+    @classmethod
+    def for_date(cls, day, directory=TIMETABLE_PATH):
+        """The saved timetable of `day` (date or YYYYMMDD), or None if not built."""
+        path = Path(directory) / gtfs.day_key(day)
+        if not (path / "stop_ids.npy").exists():
+            return None
+        return cls.load(path)
+
+    def __len__(self):
+        return len(self.stop_ids)
+
+    @property
+    def pattern_count(self):
+        return len(self.pattern_offsets) - 1
+
+    def find_stop(self, stop_id):
+        """Station index of `stop_id` (str or int); raises KeyError if it has no
+        departures.
+        """
+        stop_id = str(stop_id)
+        pos = np.searchsorted(self.stop_ids, stop_id, sorter=self._id_order)
+        if pos < len(self) and self.stop_ids[self._id_order[pos]] == stop_id:
+            return int(self._id_order[pos])
+        raise KeyError(stop_id)
+
+    def pattern(self, p):
+        """(stations, arrivals, departures) of pattern `p`; times are (trips, stops)."""
+        first, last = self.pattern_offsets[p], self.pattern_offsets[p + 1]
+        stops = self.pattern_stops[first:last]
+        start, end = self.time_offsets[p], self.time_offsets[p + 1]
+        shape = (-1, len(stops))
+        return (
+            stops,
+            self.arrivals[start:end].reshape(shape),
+            self.departures[start:end].reshape(shape),
+        )
+
+
+def _fifo_groups(arrivals, departures):
+    """Split trips (rows, sorted by first departure) into groups that never overtake."""
+    groups = []
+    for trip in range(len(departures)):
+        for group in groups:
+            last = group[-1]
+            if np.all(departures[last] <= departures[trip]) and np.all(
+                arrivals[last] <= arrivals[trip]
+            ):
+                group.append(trip)
+                break
+        else:
+            groups.append([trip])
+    return groups
+
+
+def build_timetable(feed, day):
+    """Timetable of the trips running on `day` in the GTFS feed in directory `feed`.
+
+    Trips running past midnight from the day before are not included.
+    """
+    feed = Path(feed)
+    services = gtfs.active_services(feed, day)
+    trips = pd.read_csv(
+        feed / "trips.txt", usecols=["trip_id", "service_id"], dtype=str
+    )
+    trip_ids = set(trips.loc[trips["service_id"].isin(services), "trip_id"])
+    stop_times = gtfs.read_stop_times(feed, trip_ids)
+    stations = gtfs.read_stations(feed)
+
+    station_of = stop_times["stop_id"].map(lambda stop: stations[stop][0])
+    station_codes, station_ids = pd.factorize(station_of)
+    trip_codes, _ = pd.factorize(stop_times["trip_id"])
+    arrivals = gtfs.seconds(stop_times["arrival_time"])
+    departures = gtfs.seconds(stop_times["departure_time"])
+
+    # Consecutive stops at the same station (a platform change) are one stop.
+    keep = np.ones(len(stop_times), dtype=bool)
+    keep[1:] = (trip_codes[1:] != trip_codes[:-1]) | (
+        station_codes[1:] != station_codes[:-1]
+    )
+    trip_codes, station_codes = trip_codes[keep], station_codes[keep]
+    arrivals, departures = arrivals[keep], departures[keep]
+
+    bounds = np.flatnonzero(np.diff(trip_codes, prepend=-1, append=-1))
+    sequences = {}
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if end - start > 1:
+            key = tuple(station_codes[start:end].tolist())
+            sequences.setdefault(key, []).append(start)
+
+    pattern_stops, pattern_offsets = [], [0]
+    time_blocks, time_offsets = [[], []], [0]
+    for key, starts in sequences.items():
+        index = np.add.outer(np.asarray(starts), np.arange(len(key)))
+        arr, dep = arrivals[index], departures[index]
+        order = np.argsort(dep[:, 0], kind="stable")
+        arr, dep = arr[order], dep[order]
+        for group in _fifo_groups(arr, dep):
+            pattern_stops.extend(key)
+            pattern_offsets.append(len(pattern_stops))
+            time_blocks[0].append(arr[group].ravel())
+            time_blocks[1].append(dep[group].ravel())
+            time_offsets.append(time_offsets[-1] + len(group) * len(key))
+
+    pattern_stops = np.asarray(pattern_stops, dtype=np.int64)
+    pattern_offsets = np.asarray(pattern_offsets, dtype=np.int64)
+    pattern_of = np.repeat(
+        np.arange(len(pattern_offsets) - 1), np.diff(pattern_offsets)
+    )
+    stop_patterns, stop_pattern_offsets = _csr(
+        pattern_stops, pattern_of, len(station_ids)
+    )
+
+    coords = {stations[stop][0]: stations[stop][1:] for stop in stations}
+    lats = np.array([coords[s][0] for s in station_ids])
+    lons = np.array([coords[s][1] for s in station_ids])
+    transfer_stops, transfer_seconds, transfer_offsets = _footpaths(lats, lons)
+
+    return Timetable(
+        stop_ids=np.asarray(station_ids, dtype=str),
+        lats=lats,
+        lons=lons,
+        pattern_stops=pattern_stops,
+        pattern_offsets=pattern_offsets,
+        time_offsets=np.asarray(time_offsets, dtype=np.int64),
+        arrivals=np.concatenate(time_blocks[0]).astype(np.int32),
+        departures=np.concatenate(time_blocks[1]).astype(np.int32),
+        stop_patterns=stop_patterns,
+        stop_pattern_offsets=stop_pattern_offsets,
+        transfer_stops=transfer_stops,
+        transfer_seconds=transfer_seconds,
+        transfer_offsets=transfer_offsets,
+    )
+
+
+def _csr(rows, values, n):
+    """Group `values` by `rows` (0..n-1): (values, offsets), duplicates dropped."""
+    pairs = np.unique(np.column_stack([rows, values]), axis=0)
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(pairs[:, 0], minlength=n), out=offsets[1:])
+    return pairs[:, 1], offsets
+
+
+def _footpaths(lats, lons):
+    """Footpaths between stations within TRANSFER_RADIUS_M, both directions."""
+    x, y = to_sweref99tm(lats, lons)
+    pairs = spatial.cKDTree(np.column_stack([x, y])).query_pairs(
+        TRANSFER_RADIUS_M, output_type="ndarray"
+    )
+    pairs = np.concatenate([pairs, pairs[:, ::-1]])
+    metres = np.hypot(x[pairs[:, 0]] - x[pairs[:, 1]], y[pairs[:, 0]] - y[pairs[:, 1]])
+    order = np.lexsort((pairs[:, 1], pairs[:, 0]))
+    pairs, metres = pairs[order], metres[order]
+    offsets = np.zeros(len(lats) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(pairs[:, 0], minlength=len(lats)), out=offsets[1:])
+    seconds = np.ceil(straight_seconds(metres)).astype(np.int32)
+    return pairs[:, 1].astype(np.int64), seconds, offsets
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build the local timetable of one service day from a GTFS feed, "
+        "for reachability searches without ResRobot calls."
+    )
+    parser.add_argument("feed", help="directory with an unpacked GTFS feed")
+    parser.add_argument("--date", default=date.today().strftime("%Y%m%d"))
+    parser.add_argument("--days", type=int, default=1, help="consecutive days to build")
+    parser.add_argument("--output", default=str(TIMETABLE_PATH))
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    first = datetime.strptime(gtfs.day_key(args.date), "%Y%m%d")
+    for offset in range(args.days):
+        day = (first + timedelta(days=offset)).strftime("%Y%m%d")
+        timetable = build_timetable(args.feed, day)
+        timetable.save(Path(args.output) / day)
+        print(
+            f"💾 {day}: {len(timetable)} stations, {timetable.pattern_count} patterns, "
+            f"{len(timetable.departures)} stop times"
+        )
+
+
+if __name__ == "__main__":
+    main()
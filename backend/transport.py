@@ -0,0 +1,44 @@
+from collections import namedtuple
+
+# How a leg is shown and routed on the map. `strategy` picks the TripPlanner
+# plotting method: "train", "road", "tram", "subway" or "walk" (from the end
+# of the previous leg); None is not drawn.
+TransportMode = namedtuple("TransportMode", ["code", "mode", "icon", "strategy"])
+
+WALK = TransportMode("unknown", "Promenad", "🚶", "walk")
+
+# ResRobot catCode -> mode. Product class ("cls") is the bit 2**catCode.
+MODES = {
+    "1": TransportMode("1", "Snabbtåg", "🚄", "train"),
+    "2": TransportMode("2", "Långfärdsbuss", "🚍", "road"),
+    "3": TransportMode("3", "Tåg", "🚆", "train"),
+    "4": TransportMode("4", "Tåg", "🚆", "train"),
+    "5": TransportMode("5", "Tunnelbana", "🚇", "subway"),
+    "6": TransportMode("6", "Spårväg", "🚊", "tram"),
+    "7": TransportMode("7", "Buss", "🚍", "road"),
+    "8": TransportMode("8", "Färja", "⛴️", None),
+    "unknown": WALK,
+}
+UNKNOWN = TransportMode("?", "Okänt", "❓", None)
+
+_MODES_BY_CLASS = {
+    str(2 ** int(code)): mode for code, mode in MODES.items() if code.isdigit()
+}
+
+
+def classify_product(product):
+    """TransportMode of a ResRobot Product / ProductAtStop dict."""
+    if not product:
+        return WALK
+    mode = MODES.get(str(product.get("catCode")))
+    if mode is None:
+        mode = _MODES_BY_CLASS.get(str(product.get("cls")), UNKNOWN)
+    return mode
+
+
+def classify_leg(leg):
+    """TransportMode of a trip leg; legs without a product (WALK, TRSF) are walks."""
+    products = leg.get("Product")
+    if isinstance(products, list):
+        products = products[0] if products else None
+    return classify_product(products)
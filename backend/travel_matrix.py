@@ -0,0 +1,435 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from backend import isochrone
+from backend.connect_to_api import TRIP_CACHE_PATH, TRIP_CACHE_TTL, ResRobot
+from backend.disk_cache import DiskCache
+from backend.timetable import Timetable
+from utils import tracing
+from utils.constants import TIMETABLE_PATH
+from utils.log import configure_logging
+from utils.time_utils import parse_datetimes
+
+logger = logging.getLogger(__name__)
+
+# Trips longer than this count as unreachable.
+MAX_MINUTES = 240
+# How each cell summarizes the travel times of the departures in the window.
+STATISTICS = {"min": np.nanmin, "median": np.nanmedian}
+ENGINES = ("local", "resrobot")
+# Seconds between checkpoint writes while a matrix is filled.
+CHECKPOINT_SECONDS = 30
+RESROBOT_CONCURRENCY = 4
+
+# Timetable of the worker process (or thread) running `_local_row`.
+_worker = {}
+
+
+def departure_times(start, end=None, step_minutes=10):
+    """Departures sampled every `step_minutes` from `start` to `end` inclusive."""
+    end = end or start
+    if end < start:
+        raise ValueError(f"Departure window ends before it starts: {start} > {end}")
+    step = timedelta(minutes=step_minutes)
+    count = int((end - start) / step) + 1
+    return [start + k * step for k in range(count)]
+
+
+def _reduce(times, statistic):
+    """Summarize (departures, cells) travel times per cell.
+
+    np.inf marks departures that cannot reach the cell, NaN departures with no
+    answer (ResRobot only lists a few trips); either becomes NaN in the result.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        reduced = STATISTICS[statistic](times, axis=0)
+    reduced[np.isinf(reduced)] = np.nan
+    return reduced
+
+
+def _init_local(day, directory):
+    _worker["timetable"] = Timetable.for_date(day, directory)
+
+
+def _local_row(origin, targets, departures, max_seconds, statistic):
+    """Travel times from station `origin` to stations `targets` (RAPTOR)."""
+    timetable = _worker["timetable"]
+    times = np.full((len(departures), len(targets)), np.inf)
+    for k, departure in enumerate(departures):
+        arrivals, _ = isochrone.earliest_arrivals(
+            timetable, origin, departure, max_seconds
+        )
+        reached = arrivals[targets]
+        times[k] = np.where(reached < isochrone.NEVER, reached - departure, np.inf)
+    return _reduce(times, statistic)
+
+
+def _station_indices(timetable, stop_ids):
+    """Station index per stop id, -1 where the timetable has no such stop."""
+    indices = np.full(len(stop_ids), -1, dtype=np.int64)
+    for i, stop_id in enumerate(stop_ids):
+        try:
+            indices[i] = timetable.find_stop(stop_id)
+        except KeyError:
+            pass
+    return indices
+
+
+def _resrobot_cell(resrobot, origin, destination, departures, max_seconds, statistic):
+    """Travel time between two stops from one ResRobot search, or None on failure.
+
+    The search starts at the first departure; each sampled departure takes the
+    earliest arrival among the listed trips leaving at or after it.
+    """
+    if str(origin) == str(destination):
+        return np.zeros(1)
+    start = departures[0]
+    try:
+        result = resrobot.trips(
+            origin,
+            destination,
+            date=start.strftime("%Y-%m-%d"),
+            time=start.strftime("%H:%M"),
+        )
+    except Exception as err:
+        logger.warning("🧮 %s → %s failed: %s", origin, destination, err)
+        return None
+    if result is None:
+        return None
+
+    firsts, lasts = [], []
+    for trip in result.get("Trip", []):
+        legs = trip["LegList"].get("Leg", [])
+        if isinstance(legs, dict):
+            legs = [legs]
+        firsts.append(legs[0]["Origin"])
+        lasts.append(legs[-1]["Destination"])
+    times = np.full((len(departures), 1), np.inf)
+    if firsts:
+        leave = parse_datetimes(
+            [s["date"] for s in firsts], [s["time"] for s in firsts]
+        )
+        arrive = parse_datetimes([s["date"] for s in lasts], [s["time"] for s in lasts])
+        order = np.argsort(leave)
+        leave = leave[order]
+        # Earliest arrival among the trips from each one on.
+        arrive = np.minimum.accumulate(arrive[order][::-1])[::-1]
+        samples = np.array(departures, dtype="datetime64[s]")
+        first = np.searchsorted(leave, samples)
+        listed = first < len(leave)
+        seconds = (arrive[first[listed]] - samples[listed]).astype(float)
+        times[~listed, 0] = np.nan
+        times[listed, 0] = np.where(seconds <= max_seconds, seconds, np.inf)
+    return _reduce(times, statistic)
+
+
+class _Checkpoint:
+    """Partial matrix in an .npz file, rewritten atomically while filling."""
+
+    def __init__(self, path, origins, destinations, settings):
+        self.path = Path(path)
+        self.origins = np.asarray(origins, dtype=str)
+        self.destinations = np.asarray(destinations, dtype=str)
+        self.settings = json.dumps(settings, sort_keys=True)
+
+    def load(self):
+        """(matrix, done) saved earlier, or None if there is no checkpoint yet."""
+        if not self.path.exists():
+            return None
+        with np.load(self.path) as saved:
+            same = (
+                str(saved["settings"]) == self.settings
+                and np.array_equal(saved["origins"], self.origins)
+                and np.array_equal(saved["destinations"], self.destinations)
+            )
+            if not same:
+                raise ValueError(
+                    f"Checkpoint {self.path} belongs to another matrix; remove it "
+                    "or pick another path"
+                )
+            return saved["matrix"], saved["done"]
+
+    def save(self, matrix, done):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        partial = self.path.with_name(self.path.name + ".partial")
+        with open(partial, "wb") as file:
+            np.savez(
+                file,
+                matrix=matrix,
+                done=done,
+                origins=self.origins,
+                destinations=self.destinations,
+                settings=np.array(self.settings),
+            )
+        os.replace(partial, self.path)
+
+
+def travel_time_matrix(
+    origins,
+    destinations,
+    start,
+    end=None,
+    step_minutes=10,
+    statistic="min",
+    engine="local",
+    max_minutes=MAX_MINUTES,
+    workers=None,
+    checkpoint=None,
+    progress=None,
+    resrobot=None,
+    directory=TIMETABLE_PATH,
+):
+    """Travel times in seconds between every origin and destination stop id.
+
+    Each departure from `start` to `end` every `step_minutes` is searched, and
+    a cell holds the `statistic` ("min" or "median") of their travel times,
+    waiting at the origin included. Returns a dense (origins, destinations)
+    float array, NaN where the destination is not reached within
+    `max_minutes`. The local engine needs the window on one service day and
+    raises ValueError for one that crosses midnight.
+
+    engine:     "local" runs RAPTOR on the timetable built in `directory`
+                (see backend/timetable.py) in `workers` processes, one origin
+                per task, and costs no API calls. "resrobot" sends one trip
+                search per cell from `workers` threads through `resrobot`
+                (default: a headless client); with a trip cache set
+                (--trip-cache) repeated runs reuse its results.
+    checkpoint: .npz path the partial matrix is saved to every
+                CHECKPOINT_SECONDS and on interruption; a run with the same
+                arguments continues from it. Failed ResRobot cells are left
+                out and retried by the next run.
+    progress:   called as progress(done_cells, total_cells) as cells finish.
+    """
+    if statistic not in STATISTICS:
+        raise ValueError(
+            f"Unknown statistic {statistic!r}, use one of {sorted(STATISTICS)}"
+        )
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown matrix engine {engine!r}, use one of {ENGINES}")
+    origins, destinations = list(origins), list(destinations)
+    departures = departure_times(start, end, step_minutes)
+    if engine == "local" and departures[-1].date() != departures[0].date():
+        # One timetable holds one service day; later samples would wrap around
+        # to the early morning of the same day.
+        raise ValueError(
+            f"Departure window {start} - {end} spans two service days; split it "
+            "at midnight for the local engine"
+        )
+    max_seconds = max_minutes * 60
+
+    shape = (len(origins), len(destinations))
+    matrix, done = np.full(shape, np.nan), np.zeros(shape, dtype=bool)
+    saver = None
+    if checkpoint is not None:
+        settings = {
+            "engine": engine,
+            "departures": [d.isoformat() for d in departures],
+            "statistic": statistic,
+            "max_minutes": max_minutes,
+        }
+        saver = _Checkpoint(checkpoint, origins, destinations, settings)
+        saved = saver.load()
+        if saved is not None:
+            matrix, done = saved
+            logger.info(
+                "🧮 Resuming %s: %d of %d cells done", checkpoint, done.sum(), done.size
+            )
+
+    if engine == "local":
+        executor, tasks = _local_tasks(
+            origins,
+            destinations,
+            departures,
+            max_seconds,
+            statistic,
+            done,
+            workers,
+            directory,
+        )
+    else:
+        executor, tasks = _resrobot_tasks(
+            origins,
+            destinations,
+            departures,
+            max_seconds,
+            statistic,
+            done,
+            workers,
+            resrobot,
+        )
+    with tracing.span("matrix.fill", engine=engine, cells=done.size) as span:
+        filled = _fill(executor, tasks, matrix, done, saver, progress)
+        span.set(filled=filled)
+    return matrix
+
+
+def _local_tasks(
+    origins, destinations, departures, max_seconds, statistic, done, workers, directory
+):
+    day = departures[0].strftime("%Y%m%d")
+    timetable = Timetable.for_date(day, directory)
+    if timetable is None:
+        raise FileNotFoundError(
+            f"No local timetable for {day} in {directory}; build it with "
+            "python -m backend.timetable"
+        )
+    sources = _station_indices(timetable, origins)
+    targets = _station_indices(timetable, destinations)
+    # Stops without service stay NaN.
+    done[sources < 0, :] = True
+    done[:, targets < 0] = True
+    seconds = [d.hour * 3600 + d.minute * 60 + d.second for d in departures]
+
+    tasks = []
+    for row in np.flatnonzero(~done.all(axis=1)):
+        cols = np.flatnonzero(~done[row])
+        args = (sources[row], targets[cols], seconds, max_seconds, statistic)
+        tasks.append((row, cols, _local_row, args))
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        # In process: no fork, and the memory-mapped arrays are shared anyway.
+        executor = ThreadPoolExecutor(
+            1, initializer=_init_local, initargs=(day, directory)
+        )
+    else:
+        executor = ProcessPoolExecutor(
+            workers, initializer=_init_local, initargs=(day, directory)
+        )
+    return executor, tasks
+
+
+def _resrobot_tasks(
+    origins, destinations, departures, max_seconds, statistic, done, workers, resrobot
+):
+    resrobot = resrobot or ResRobot.headless()
+    tasks = []
+    for row, origin in enumerate(origins):
+        for col, destination in enumerate(destinations):
+            if done[row, col]:
+                continue
+            args = (resrobot, origin, destination, departures, max_seconds, statistic)
+            tasks.append((row, [col], _resrobot_cell, args))
+    executor = ThreadPoolExecutor(workers or RESROBOT_CONCURRENCY)
+    return executor, tasks
+
+
+def _fill(executor, tasks, matrix, done, saver, progress):
+    """Run `tasks` on `executor` into `matrix`; returns the number of cells filled."""
+    count, total = int(done.sum()), done.size
+    filled = failed = 0
+    last_save = time.monotonic()
+    try:
+        futures = {
+            executor.submit(fn, *args): (row, cols) for row, cols, fn, args in tasks
+        }
+        for future in as_completed(futures):
+            row, cols = futures[future]
+            values = future.result()
+            if values is None:
+                failed += len(cols)
+                continue
+            matrix[row, cols] = values
+            done[row, cols] = True
+            filled += len(cols)
+            if progress is not None:
+                progress(count + filled, total)
+            if saver is not None and time.monotonic() - last_save > CHECKPOINT_SECONDS:
+                saver.save(matrix, done)
+                last_save = time.monotonic()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        if saver is not None:
+            saver.save(matrix, done)
+    if failed:
+        logger.warning("🧮 %d cells failed and are left for the next run", failed)
+    return filled
+
+
+def read_stop_ids(file_path):
+    """Stop ids from a text file, one per line; blank lines and # comments skipped."""
+    with open(file_path, encoding="utf-8") as file:
+        lines = (line.split("#", 1)[0].strip() for line in file)
+        return [line for line in lines if line]
+
+
+def _print_progress(done, total):
+    print(f"\r🧮 {done}/{total} cells", end="", file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Travel times between every origin and destination stop, "
+        "saved as a NumPy matrix in seconds (NaN where not reached)."
+    )
+    parser.add_argument("origins", help="text file with one origin stop id per line")
+    parser.add_argument("destinations", help="text file with one stop id per line")
+    parser.add_argument(
+        "--start", required=True, help="first departure, YYYY-MM-DD HH:MM"
+    )
+    parser.add_argument("--end", help="last departure (default: --start)")
+    parser.add_argument(
+        "--step", type=int, default=10, help="minutes between departures"
+    )
+    parser.add_argument("--statistic", choices=sorted(STATISTICS), default="min")
+    parser.add_argument("--engine", choices=ENGINES, default="local")
+    parser.add_argument("--max-minutes", type=int, default=MAX_MINUTES)
+    parser.add_argument(
+        "--workers", type=int, help="processes (local) or threads (resrobot)"
+    )
+    parser.add_argument(
+        "--checkpoint", help=".npz file to resume an interrupted run from"
+    )
+    parser.add_argument("--timetables", default=str(TIMETABLE_PATH))
+    parser.add_argument(
+        "--trip-cache",
+        nargs="?",
+        const=str(TRIP_CACHE_PATH),
+        help="SQLite file reusing ResRobot trip results between runs",
+    )
+    parser.add_argument("--output", default="travel_times.npy")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    if args.trip_cache:
+        ResRobot.trip_cache = DiskCache(args.trip_cache, ttl=TRIP_CACHE_TTL)
+
+    def parse(value):
+        return datetime.strptime(value, "%Y-%m-%d %H:%M")
+
+    started = time.perf_counter()
+    matrix = travel_time_matrix(
+        read_stop_ids(args.origins),
+        read_stop_ids(args.destinations),
+        parse(args.start),
+        parse(args.end) if args.end else None,
+        step_minutes=args.step,
+        statistic=args.statistic,
+        engine=args.engine,
+        max_minutes=args.max_minutes,
+        workers=args.workers,
+        checkpoint=args.checkpoint,
+        progress=_print_progress,
+        directory=args.timetables,
+    )
+    print(file=sys.stderr)
+    np.save(args.output, matrix)
+    print(
+        f"💾 {matrix.shape[0]}x{matrix.shape[1]} matrix, "
+        f"{np.count_nonzero(~np.isnan(matrix))} cells reached, "
+        f"in {time.perf_counter() - started:.1f}s → {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,60 +1,91 @@
-import folium
-import networkx as nx
-import osmnx as ox
+import logging
+
 import requests
 from polyline import decode
-from shapely.geometry import LineString, Point
 
+from backend import corridor, path_engine, walking
 from backend.connect_to_api import ResRobot
+from backend.disk_cache import DiskCache
+from backend.osm_graph import FeatureGraph
+from backend.rail_shapes import RailShapeStore
+from backend.transport import classify_leg
+from utils import config, tracing
+from utils.constants import CACHE_PATH, RAIL_SHAPES_PATH
+from utils.lazy_import import LazyModule
+
+logger = logging.getLogger(__name__)
+
+OSRM_BASE_URL = "http://router.project-osrm.org"
+# Road geometry between two stops rarely changes, keep OSRM answers a week.
+osrm_cache = DiskCache(CACHE_PATH / "osrm.sqlite", ttl=7 * 24 * 3600)
+# Precomputed rail polylines between stations; train hops found here skip the
+# Overpass query. None disables the lookup.
+rail_shapes = RailShapeStore(RAIL_SHAPES_PATH)
+
+
+def _configure_osmnx(module):
+    """Keep Overpass responses in a persistent cache shared with batch jobs."""
+    module.settings.use_cache = True
+    module.settings.cache_folder = str(CACHE_PATH / "osmnx")
+    module.settings.overpass_url = config.get_setting(
+        "OVERPASS_URL", module.settings.overpass_url
+    )
+
+
+# The geo stack takes about a second to import, so it is only loaded once a
+# map or route geometry is actually requested.
+folium = LazyModule("folium")
+ox = LazyModule("osmnx", on_load=_configure_osmnx)
+geometry = LazyModule("shapely.geometry")
 
 
 class TripPlanner:
-    def __init__(self, origin_id: str, destination_id: str):
-        self.resrobot = ResRobot()
+    # Plotting method per TransportMode.strategy (walks are handled in plot_legs).
+    PLOTTERS = {
+        "train": "plot_train_routes",
+        "road": "plot_road_routes",
+        "tram": "plot_tram_routes",
+        "subway": "plot_subway_routes",
+    }
+
+    def __init__(
+        self,
+        origin_id: str,
+        destination_id: str,
+        resrobot=None,
+        date=None,
+        time=None,
+        searchForArrival=0,
+        trip_data=None,
+    ):
+        """Plan the geometry of a trip between two stops.
+
+        Trips are fetched from ResRobot unless `trip_data`, an already fetched
+        /trip response, is given.
+        """
+        self.resrobot = resrobot or ResRobot()
         self.origin_id = origin_id
         self.destination_id = destination_id
-        self.trip_data = self.resrobot.trips(origin_id, destination_id)
+        if trip_data is None:
+            trip_data = self.resrobot.trips(
+                origin_id, destination_id, date, time, searchForArrival
+            )
+        self.trip_data = trip_data
         self.route_legs = []
         self.map_route = None
 
     def extract_route_with_transfers(self):
         if "Trip" in self.trip_data and self.trip_data["Trip"]:
-            first_trip = self.trip_data["Trip"][0]
-            legs = first_trip["LegList"].get("Leg", [])
-            if isinstance(legs, dict):
-                legs = [legs]
-            for leg in legs:
-                transport_type = leg.get("Product", [{}])[0].get("catCode", "unknown")
-                origin = leg["Origin"]
-                destination = leg["Destination"]
-                stops = leg.get("Stops", {}).get("Stop", [])
-                if isinstance(stops, dict):
-                    stops = [stops]
-                segment_stations = (
-                    [(origin["extId"], origin["lat"], origin["lon"], origin["name"])]
-                    + [
-                        (stop["extId"], stop["lat"], stop["lon"], stop["name"])
-                        for stop in stops
-                    ]
-                    + [
-                        (
-                            destination["extId"],
-                            destination["lat"],
-                            destination["lon"],
-                            destination["name"],
-                        )
-                    ]
-                )
-                self.route_legs.append((transport_type, segment_stations))
+            self.pick_route_with_transfers(self.trip_data["Trip"][0])
         return self.route_legs
 
     def pick_route_with_transfers(self, trip):
+        """Append the legs of `trip` to `route_legs` as (TransportMode, stations)."""
         if "Trip" in self.trip_data and self.trip_data["Trip"]:
             legs = trip["LegList"].get("Leg", [])
             if isinstance(legs, dict):
                 legs = [legs]
             for leg in legs:
-                transport_type = leg.get("Product", [{}])[0].get("catCode", "unknown")
                 origin = leg["Origin"]
                 destination = leg["Destination"]
                 stops = leg.get("Stops", {}).get("Stop", [])
@@ -75,7 +106,7 @@ class TripPlanner:
                         )
                     ]
                 )
-                self.route_legs.append((transport_type, segment_stations))
+                self.route_legs.append((classify_leg(leg), segment_stations))
         return self.route_legs
 
     def initialize_map(self):
@@ -88,7 +119,7 @@ class TripPlanner:
         """Visualizes the OSMNX query area on the map for debugging."""
 
         # ✅ Create the buffer corridor
-        polyline = LineString([(start_lon, start_lat), (end_lon, end_lat)])
+        polyline = geometry.LineString([(start_lon, start_lat), (end_lon, end_lat)])
         buffered_polyline = polyline.buffer(buffer_size)
 
         # ✅ Add the buffer zone to the map (Yellow transparent overlay)
@@ -116,49 +147,73 @@ class TripPlanner:
             icon=folium.Icon(color="green"),
         ).add_to(map_obj)
 
-        print(
-            f"🛠 Debug: Plotted query buffer for segment {segment_index} (buffer={buffer_size:.4f})"
+        logger.debug(
+            "🛠 Debug: Plotted query buffer for segment %s (buffer=%.4f)",
+            segment_index,
+            buffer_size,
         )
 
+    def find_rail_path(self, start_lat, start_lon, end_lat, end_lon):
+        """Rail path [(lat, lon), ...] between two stations from OSM, or None."""
+        query = corridor.fetch(
+            "rail",
+            (start_lat, start_lon),
+            (end_lat, end_lon),
+            {"railway": "rail"},
+            ox.features_from_polygon,
+        )
+        railways = query.features
+        if railways is None or railways.empty:
+            logger.warning("🚨 No railways found around the train segment")
+            query.record()
+            return None
+        logger.debug("🚆 Rail corridor half-width: %.0f m", query.half_width)
+
+        with tracing.span("graph.build", mode="rail"):
+            graph = FeatureGraph.from_features(railways)
+            engine = path_engine.create(graph)
+
+        with tracing.span("graph.snap", mode="rail"):
+            start_node = graph.nearest(start_lat, start_lon)
+            end_node = graph.nearest(end_lat, end_lon)
+
+        with tracing.span("graph.shortest_path", mode="rail") as span:
+            path = engine.shortest_path(start_node, end_node)
+            span.set(engine=engine.name, expanded=engine.expanded)
+        if path is None:
+            logger.warning(
+                "🚨 No railway path found between (%s, %s) and (%s, %s)",
+                start_lat,
+                start_lon,
+                end_lat,
+                end_lon,
+            )
+            query.record()
+            return None
+        route = graph.path_coords(path)
+        query.record(route)
+        return route
+
+    @tracing.traced("map.train")
     def plot_train_routes(self, map_obj, train_stations):
-        """Plots train routes using railway data from OSM."""
+        """Plots train routes from precomputed rail shapes, else from OSM railway data."""
         stations = {stop[0]: (stop[1], stop[2], stop[3]) for stop in train_stations}
 
         for i in range(len(train_stations) - 1):
             start_lat, start_lon, _ = stations[train_stations[i][0]]
             end_lat, end_lon, _ = stations[train_stations[i + 1][0]]
 
-            polyline = LineString([(start_lon, start_lat), (end_lon, end_lat)])
-            buffered_polyline = polyline.buffer(0.40)
-
-            print(f"🚆 Buffered Area for Train Segment: {buffered_polyline}")
-
-            railways = ox.features_from_polygon(
-                buffered_polyline, tags={"railway": "rail"}
-            )
-            G = nx.Graph()
-
-            for _, row in railways.iterrows():
-                if row.geometry.geom_type == "LineString":
-                    coords = list(row.geometry.coords)
-                    for j in range(len(coords) - 1):
-                        lat1, lon1 = coords[j][1], coords[j][0]
-                        lat2, lon2 = coords[j + 1][1], coords[j + 1][0]
-                        dist = Point(lat1, lon1).distance(Point(lat2, lon2))
-                        G.add_edge((lat1, lon1), (lat2, lon2), weight=dist)
-
-            try:
-                start_node = min(
-                    G.nodes,
-                    key=lambda node: Point(node).distance(Point(start_lat, start_lon)),
-                )
-                end_node = min(
-                    G.nodes,
-                    key=lambda node: Point(node).distance(Point(end_lat, end_lon)),
+            route_coords = None
+            if rail_shapes is not None:
+                with tracing.span("shape.lookup", mode="rail"):
+                    route_coords = rail_shapes.get(
+                        train_stations[i][0], train_stations[i + 1][0]
+                    )
+            if route_coords is None:
+                route_coords = self.find_rail_path(
+                    start_lat, start_lon, end_lat, end_lon
                 )
-
-                route = nx.shortest_path(G, start_node, end_node, weight="weight")
-                route_coords = list(route)
+            if route_coords is not None:
                 folium.PolyLine(
                     route_coords,
                     color="blue",
@@ -167,11 +222,6 @@ class TripPlanner:
                     tooltip="Train Route",
                 ).add_to(map_obj)
 
-            except nx.NetworkXNoPath:
-                print(
-                    f"🚨 No railway path found between ({start_lat}, {start_lon}) and ({end_lat}, {end_lon})"
-                )
-
             folium.Marker(
                 [start_lat, start_lon],
                 popup=f"Stop {i}",
@@ -181,6 +231,7 @@ class TripPlanner:
                 [end_lat, end_lon], popup=f"Stop {i+1}", icon=folium.Icon(color="red")
             ).add_to(map_obj)
 
+    @tracing.traced("map.road")
     def plot_road_routes(self, map_obj, road_stations):
         """Plots road routes using OSRM instead of OSMNx querying."""
 
@@ -194,17 +245,24 @@ class TripPlanner:
             )
 
             # ✅ OSRM Routing API URL
-            osrm_url = f"http://router.project-osrm.org/route/v1/driving/{start[1]},{start[0]};{end[1]},{end[0]}?overview=full"  # noqa: E501
-
-            print(f"📡 Requesting OSRM route: {start} → {end}")
-            response = requests.get(osrm_url)
-
-            # ✅ Check if request was successful
-            if response.status_code != 200:
-                print(f"❌ OSRM Request Failed! HTTP {response.status_code}")
-                continue  # Skip this segment if the request fails
+            osrm_base = config.get_setting("OSRM_BASE_URL", OSRM_BASE_URL)
+            osrm_url = f"{osrm_base}/route/v1/driving/{start[1]},{start[0]};{end[1]},{end[0]}?overview=full"  # noqa: E501
+
+            data = osrm_cache.get(osrm_url)
+            if data is None:
+                logger.debug("📡 Requesting OSRM route: %s → %s", start, end)
+                with tracing.span("osrm.route"):
+                    response = requests.get(osrm_url)
+
+                # ✅ Check if request was successful
+                if response.status_code != 200:
+                    logger.warning(
+                        "❌ OSRM Request Failed! HTTP %s", response.status_code
+                    )
+                    continue  # Skip this segment if the request fails
 
-            data = response.json()
+                data = response.json()
+                osrm_cache.set(osrm_url, data)
 
             # ✅ Extract and decode the Polyline
             try:
@@ -213,12 +271,16 @@ class TripPlanner:
                     route_coords = decode(
                         encoded_polyline
                     )  # Decode Polyline into (lat, lon) points
-                    print(f"✅ Found OSRM route with {len(route_coords)} points!")
+                    logger.debug(
+                        "✅ Found OSRM route with %s points!", len(route_coords)
+                    )
                 else:
-                    print(f"❌ No valid route found by OSRM for segment {i}")
+                    logger.warning("❌ No valid route found by OSRM for segment %s", i)
                     continue  # Skip to the next segment if no route is found
             except KeyError:
-                print(f"❌ Unexpected OSRM response format! Skipping segment {i}")
+                logger.warning(
+                    "❌ Unexpected OSRM response format! Skipping segment %s", i
+                )
                 continue
 
             # ✅ Plot Start & End Markers
@@ -238,8 +300,9 @@ class TripPlanner:
                 tooltip=f"Road Route {i}-{i+1}",
             ).add_to(map_obj)
 
-            print(f"✅ Successfully plotted segment {i} on the map!\n")
+            logger.debug("✅ Successfully plotted segment %s on the map!", i)
 
+    @tracing.traced("map.tram")
     def plot_tram_routes(self, map_obj, tram_stations):
         """Plots tram routes using OSM tramway data with better path accuracy."""
 
@@ -249,85 +312,59 @@ class TripPlanner:
             start_lat, start_lon, _ = stations[tram_stations[i][0]]
             end_lat, end_lon, _ = stations[tram_stations[i + 1][0]]
 
-            buffer_size = 0.05  # Approx 500m buffer
-
-            polyline = LineString([(start_lon, start_lat), (end_lon, end_lat)])
-            buffered_polyline = polyline.buffer(buffer_size)
-
-            print(f"🚋 Querying tram paths with buffer {buffer_size:.4f} degrees.")
-
             try:
-                tram_data = ox.features_from_polygon(
-                    buffered_polyline, tags={"railway": "tram"}
+                query = corridor.fetch(
+                    "tram",
+                    (start_lat, start_lon),
+                    (end_lat, end_lon),
+                    {"railway": "tram"},
+                    ox.features_from_polygon,
                 )
             except Exception as e:
-                print(f"⚠️ Error fetching tramway data: {e}")
+                logger.warning("⚠️ Error fetching tramway data: %s", e)
                 continue
 
-            if tram_data.empty:
-                print(
-                    f"❌ No tram paths found for tram segment {i}. Trying fallback expansion..."
-                )
-                buffer_size *= 2
-                buffered_polyline = polyline.buffer(buffer_size)
-                try:
-                    tram_data = ox.features_from_polygon(
-                        buffered_polyline, tags={"railway": "tram"}
-                    )
-                except:  # noqa: E722
-                    continue
+            tram_data = query.features
+            if tram_data is None or tram_data.empty:
+                logger.warning("❌ No tram paths found for segment %s. Skipping.", i)
+                query.record()
+                continue
 
-                if tram_data.empty:
-                    print(
-                        f"❌ No tram paths found even after expansion. Skipping segment {i}."
-                    )
-                    continue
-
-            G = nx.Graph()
-            for _, row in tram_data.iterrows():
-                if row.geometry.geom_type == "LineString":
-                    coords = list(row.geometry.coords)
-                    for j in range(len(coords) - 1):
-                        lon1, lat1 = coords[j]
-                        lon2, lat2 = coords[j + 1]
-                        dist = Point(lon1, lat1).distance(Point(lon2, lat2))
-                        G.add_edge((lon1, lat1), (lon2, lat2), weight=dist)
-
-            if G.number_of_nodes() == 0:
-                print(f"🚨 No connected tramways found for segment {i}.")
+            with tracing.span("graph.build", mode="tram"):
+                graph = FeatureGraph.from_features(tram_data)
+                engine = path_engine.create(graph)
+
+            if len(graph.src) == 0:
+                query.record()
+                logger.warning("🚨 No connected tramways found for segment %s.", i)
                 continue
 
-            largest_cc = max(nx.connected_components(G), key=len)
-            G = G.subgraph(largest_cc).copy()
+            with tracing.span("graph.components", mode="tram"):
+                candidates = engine.largest_component()
 
-            try:
-                start_node = min(
-                    G.nodes,
-                    key=lambda node: Point(node).distance(Point(start_lon, start_lat)),
-                )
-                end_node = min(
-                    G.nodes,
-                    key=lambda node: Point(node).distance(Point(end_lon, end_lat)),
-                )
+            with tracing.span("graph.snap", mode="tram"):
+                start_node = graph.nearest(start_lat, start_lon, candidates)
+                end_node = graph.nearest(end_lat, end_lon, candidates)
 
-                if nx.has_path(G, start_node, end_node):
-                    route = nx.shortest_path(G, start_node, end_node, weight="weight")
-                    route_coords = [(lat, lon) for lon, lat in route]
-
-                    folium.PolyLine(
-                        route_coords,
-                        color="purple",
-                        weight=5,
-                        opacity=0.8,
-                        tooltip="Tram Route",
-                    ).add_to(map_obj)
-                    print(f"✅ Successfully plotted tram segment {i}")
-                else:
-                    print(f"🚨 No connected tramway path found! Skipping segment {i}")
+            with tracing.span("graph.shortest_path", mode="tram") as span:
+                path = engine.shortest_path(start_node, end_node)
+                span.set(engine=engine.name, expanded=engine.expanded)
 
-            except nx.NetworkXNoPath:
-                print(
-                    f"🚨 No tramway path found between ({start_lat}, {start_lon}) and ({end_lat}, {end_lon})"
+            if path is not None:
+                route_coords = graph.path_coords(path)
+                query.record(route_coords)
+                folium.PolyLine(
+                    route_coords,
+                    color="purple",
+                    weight=5,
+                    opacity=0.8,
+                    tooltip="Tram Route",
+                ).add_to(map_obj)
+                logger.debug("✅ Successfully plotted tram segment %s", i)
+            else:
+                query.record()
+                logger.warning(
+                    "🚨 No connected tramway path found! Skipping segment %s", i
                 )
 
             folium.Marker(
@@ -339,8 +376,9 @@ class TripPlanner:
                 [end_lat, end_lon], popup=f"Stop {i+1}", icon=folium.Icon(color="red")
             ).add_to(map_obj)
 
-        print("✅ Tram routes plotted successfully!")
+        logger.debug("✅ Tram routes plotted successfully!")
 
+    @tracing.traced("map.subway")
     def plot_subway_routes(self, map_obj, subway_stations):
         """Plots subway (metro) routes using OSM data with optimal pathing."""
 
@@ -350,91 +388,61 @@ class TripPlanner:
             start_lat, start_lon, _ = stations[subway_stations[i][0]]
             end_lat, end_lon, _ = stations[subway_stations[i + 1][0]]
 
-            # ✅ Dynamic buffer size (to ensure underground rail coverage)
-            buffer_size = 0.02  # Approx 800m buffer (since subways curve underground)
-
-            polyline = LineString([(start_lon, start_lat), (end_lon, end_lat)])
-            buffered_polyline = polyline.buffer(buffer_size)
-
-            print(f"🚇 Querying subway paths with buffer {buffer_size:.4f} degrees.")
-
             try:
-                subway_data = ox.features_from_polygon(
-                    buffered_polyline, tags={"railway": "subway"}
+                query = corridor.fetch(
+                    "subway",
+                    (start_lat, start_lon),
+                    (end_lat, end_lon),
+                    {"railway": "subway"},
+                    ox.features_from_polygon,
                 )
             except Exception as e:
-                print(f"⚠️ Error fetching subway data: {e}")
+                logger.warning("⚠️ Error fetching subway data: %s", e)
                 continue
 
-            # ✅ Ensure subway paths exist
-            if subway_data.empty:
-                print(f"❌ No subway paths found for segment {i}. Expanding buffer...")
-                buffer_size *= 2  # Increase buffer size for underground paths
-                buffered_polyline = polyline.buffer(buffer_size)
-
-                try:
-                    subway_data = ox.features_from_polygon(
-                        buffered_polyline, tags={"railway": "subway"}
-                    )
-                except:  # noqa: E722
-                    continue
-
-                if subway_data.empty:
-                    print(
-                        f"❌ No subway paths found after expansion. Skipping segment {i}."
-                    )
-                    continue
-
-            # ✅ Build a NetworkX graph for subway paths
-            G = nx.Graph()
-            for _, row in subway_data.iterrows():
-                if row.geometry.geom_type == "LineString":
-                    coords = list(row.geometry.coords)
-                    for j in range(len(coords) - 1):
-                        lon1, lat1 = coords[j]
-                        lon2, lat2 = coords[j + 1]
-                        dist = Point(lon1, lat1).distance(Point(lon2, lat2))
-                        G.add_edge((lon1, lat1), (lon2, lat2), weight=dist)
-
-            if G.number_of_nodes() == 0:
-                print(f"🚨 No connected subway tracks found for segment {i}.")
+            subway_data = query.features
+            if subway_data is None or subway_data.empty:
+                logger.warning("❌ No subway paths found for segment %s. Skipping.", i)
+                query.record()
                 continue
 
-            # ✅ Extract the largest connected subway network
-            largest_cc = max(nx.connected_components(G), key=len)
-            G = G.subgraph(largest_cc).copy()
+            with tracing.span("graph.build", mode="subway"):
+                graph = FeatureGraph.from_features(subway_data)
+                engine = path_engine.create(graph)
 
-            try:
-                # ✅ Find the closest nodes for subway travel
-                start_node = min(
-                    G.nodes,
-                    key=lambda node: Point(node).distance(Point(start_lon, start_lat)),
-                )
-                end_node = min(
-                    G.nodes,
-                    key=lambda node: Point(node).distance(Point(end_lon, end_lat)),
-                )
+            if len(graph.src) == 0:
+                query.record()
+                logger.warning("🚨 No connected subway tracks found for segment %s.", i)
+                continue
 
-                if nx.has_path(G, start_node, end_node):
-                    route = nx.shortest_path(G, start_node, end_node, weight="weight")
-                    route_coords = [(lat, lon) for lon, lat in route]
+            # ✅ Route within the largest connected subway network
+            with tracing.span("graph.components", mode="subway"):
+                candidates = engine.largest_component()
 
-                    # ✅ Plot subway route in **Dark Blue**
-                    folium.PolyLine(
-                        route_coords,
-                        color="darkblue",
-                        weight=5,
-                        opacity=0.8,
-                        tooltip="Subway Route",
-                    ).add_to(map_obj)
-                    print(f"✅ Successfully plotted subway segment {i}")
+            with tracing.span("graph.snap", mode="subway"):
+                start_node = graph.nearest(start_lat, start_lon, candidates)
+                end_node = graph.nearest(end_lat, end_lon, candidates)
 
-                else:
-                    print(f"🚨 No connected subway path found! Skipping segment {i}")
+            with tracing.span("graph.shortest_path", mode="subway") as span:
+                path = engine.shortest_path(start_node, end_node)
+                span.set(engine=engine.name, expanded=engine.expanded)
 
-            except nx.NetworkXNoPath:
-                print(
-                    f"🚨 No subway path found between ({start_lat}, {start_lon}) and ({end_lat}, {end_lon})"
+            if path is not None:
+                route_coords = graph.path_coords(path)
+                query.record(route_coords)
+                # ✅ Plot subway route in **Dark Blue**
+                folium.PolyLine(
+                    route_coords,
+                    color="darkblue",
+                    weight=5,
+                    opacity=0.8,
+                    tooltip="Subway Route",
+                ).add_to(map_obj)
+                logger.debug("✅ Successfully plotted subway segment %s", i)
+            else:
+                query.record()
+                logger.warning(
+                    "🚨 No connected subway path found! Skipping segment %s", i
                 )
 
             # ✅ Plot Subway Stations
@@ -449,21 +457,53 @@ class TripPlanner:
                 icon=folium.Icon(color="darkblue"),
             ).add_to(map_obj)
 
-        print("✅ Subway routes plotted successfully!")
+        logger.debug("✅ Subway routes plotted successfully!")
 
+    @tracing.traced("map.walk")
     def plot_walking_route(self, map_obj, start, end):
-        """Plots the shortest walking path using a combined OSM pedestrian network."""
+        """Plots a walk from the stored pedestrian tiles, else from OSM data.
+
+        Without any path a straight dashed line is drawn, so a transfer is
+        never silently missing from the map.
+        """
+        start = (float(start[0]), float(start[1]))
+        end = (float(end[0]), float(end[1]))
         if start == end:
-            print(
-                f"🚶 Skipping walking path: Start and end locations are the same {start}"
+            logger.debug(
+                "🚶 Skipping walking path: Start and end locations are the same %s",
+                start,
             )
             return
 
-        polyline = LineString([(start[1], start[0]), (end[1], end[0])])
-        buffered_polyline = polyline.buffer(0.005)
+        logger.debug("🚶 Walking from %s to %s", start, end)
+
+        route = None
+        if walking.network is not None:
+            with tracing.span("walk.tiles") as span:
+                route = walking.network.route(start, end)
+                span.set(found=route is not None)
+        if route is None:
+            coords = self.find_walking_path(start, end)
+            route = (
+                walking.path_route(coords, "osm")
+                if coords
+                else walking.straight_walk(start, end)
+            )
 
-        print(f"🚶 Walking from {start} to {end}")
+        folium.PolyLine(
+            route.coords,
+            color="green",
+            weight=5,
+            opacity=1,
+            tooltip=f"Walking Route ({max(1, round(route.seconds / 60))} min)",
+            dash_array="8" if route.source == "straight" else None,
+        ).add_to(map_obj)
+        logger.debug(
+            "✅ Walking path plotted from %s to %s (%s)", start, end, route.source
+        )
 
+    def find_walking_path(self, start, end):
+        """Walking path [(lat, lon), ...] on OSM pedestrian data, or None."""
         # Fetch pedestrian paths with multiple relevant tags
         pedestrian_tags = {
             "highway": ["footway", "pedestrian", "path", "track"],
@@ -472,57 +512,56 @@ class TripPlanner:
         }
 
         try:
-            walking_features = ox.features_from_polygon(
-                buffered_polyline, tags=pedestrian_tags
+            query = corridor.fetch(
+                "walk", start, end, pedestrian_tags, ox.features_from_polygon
             )
+            walking_features = query.features
 
             if walking_features is None or len(walking_features) == 0:
-                print(f"🚨 No pedestrian paths found between {start} and {end}")
-                return
+                logger.warning(
+                    "🚨 No pedestrian paths found between %s and %s", start, end
+                )
+                query.record()
+                return None
 
-            print(
-                f"✅ Found {len(walking_features)} pedestrian paths. Combining networks..."
+            logger.debug(
+                "✅ Found %s pedestrian paths. Combining networks...",
+                len(walking_features),
             )
 
             # Convert pedestrian paths into a graph
-            G = nx.Graph()
-            for _, row in walking_features.iterrows():
-                if row.geometry.geom_type == "LineString":
-                    coords = list(row.geometry.coords)
-                    for i in range(len(coords) - 1):
-                        lat1, lon1 = coords[i][1], coords[i][0]
-                        lat2, lon2 = coords[i + 1][1], coords[i + 1][0]
-                        dist = LineString([coords[i], coords[i + 1]]).length
-                        G.add_edge((lat1, lon1), (lat2, lon2), weight=dist)
+            with tracing.span("graph.build", mode="walk"):
+                graph = FeatureGraph.from_features(walking_features)
+                engine = path_engine.create(graph)
 
             # Find nearest nodes in the combined pedestrian network
-            start_node = min(G.nodes, key=lambda node: LineString([node, start]).length)
-            end_node = min(G.nodes, key=lambda node: LineString([node, end]).length)
+            with tracing.span("graph.snap", mode="walk"):
+                start_node = graph.nearest(*start)
+                end_node = graph.nearest(*end)
 
             if start_node == end_node:
-                print(
-                    f"🚶 Skipping walking path: Nearest nodes are the same {start_node}"
+                logger.debug(
+                    "🚶 Nearest nodes are the same %s",
+                    graph.path_coords([start_node])[0],
                 )
-                return
-
-            print(f"🔎 Found nearest nodes: {start_node} -> {end_node}")
+                query.record()
+                return None
 
             # Compute the shortest path
-            route = nx.shortest_path(G, start_node, end_node, weight="weight")
-            route_coords = [(node[0], node[1]) for node in route]
-
-            # Plot the walking route
-            folium.PolyLine(
-                route_coords,
-                color="green",
-                weight=5,
-                opacity=1,
-                tooltip="Walking Route",
-            ).add_to(map_obj)
-            print(f"✅ Walking path plotted from {start} to {end}")
+            with tracing.span("graph.shortest_path", mode="walk") as span:
+                path = engine.shortest_path(start_node, end_node)
+                span.set(engine=engine.name, expanded=engine.expanded)
+            if path is None:
+                logger.warning("🚨 No walking path found between %s and %s", start, end)
+                query.record()
+                return None
+            route_coords = graph.path_coords(path)
+            query.record(route_coords)
+            return [start, *route_coords, end]
 
         except Exception as e:
-            print(f"🚨 Error processing walking path: {e}")
+            logger.warning("🚨 Error processing walking path: %s", e)
+            return None
 
     def add_buffer_visualization(self, map_obj, buffer_geom, color="yellow"):
         """Ensures the visual buffer correctly represents the queried area."""
@@ -536,27 +575,31 @@ class TripPlanner:
             },
         ).add_to(map_obj)
 
+    def plot_legs(self):
+        """Draw every leg of `route_legs` the way its transport mode is routed."""
+        for i, (mode, stations) in enumerate(self.route_legs):
+            if mode.strategy == "walk":
+                if i > 0:
+                    start = self.route_legs[i - 1][1][-1][1:3]  # End of previous leg
+                    end = stations[-1][1:3]
+                    logger.debug("🚶 Walking route: %s → %s", start, end)
+                    self.plot_walking_route(self.map_route, start, end)
+            elif mode.strategy is not None:
+                plot = getattr(self, self.PLOTTERS[mode.strategy])
+                plot(self.map_route, stations)
+
+    @tracing.traced("map.build")
     def plot_trip(self):
         self.initialize_map()
-        for transport_type, stations in self.route_legs:
-            if transport_type in ["1", "3", "4"]:
-                self.plot_train_routes(stations)
-            elif transport_type in ["2", "7"]:
-                self.plot_road_routes(stations)
-            elif transport_type == "6":
-                self.plot_tram_routes(stations)
-            elif transport_type == "5":
-                self.plot_subway_routes(stations)
-            elif transport_type == "unknown" and len(self.route_legs) > 1:
-                start = self.route_legs[-1][1][-1][1:3]
-                end = stations[-1][1:3]
-                self.plot_walking_route(start, end)
+        self.plot_legs()
 
         # ✅ Add station markers separately to ensure they are always plotted
         for _, stations in self.route_legs:
             for stop in stations:
                 if stop[1] is not None and stop[2] is not None:
-                    print(f"📍 Adding marker: {stop[3]} at {stop[1]}, {stop[2]}")
+                    logger.debug(
+                        "📍 Adding marker: %s at %s, %s", stop[3], stop[1], stop[2]
+                    )
                     folium.Marker(
                         location=[float(stop[1]), float(stop[2])],
                         popup=stop[3],
@@ -0,0 +1,324 @@
+import argparse
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict, namedtuple
+from pathlib import Path
+
+import numpy as np
+
+from backend import path_engine
+from backend.osm_graph import FeatureGraph
+from utils.constants import WALK_TILES_PATH
+from utils.lazy_import import LazyModule
+from utils.log import configure_logging
+from utils.projection import segment_lengths, to_sweref99tm
+
+logger = logging.getLogger(__name__)
+
+spatial = LazyModule("scipy.spatial")
+
+# Pedestrian edges are stored in square tiles of the SWEREF99 TM grid. A walk
+# loads the tiles under its bounding box grown by MARGIN_M, so detours around
+# blocks and tracks are still found.
+TILE_M = 2000
+MARGIN_M = 400
+# Stops further than this from the stored network are not routed on it.
+MAX_SNAP_M = 250
+# Longer walks are not routed on the tiles (too many to load); they get the
+# straight-line estimate.
+MAX_WALK_M = 10_000
+WALK_SPEED_M_S = 1.3  # about 4.7 km/h
+# Straight-line distance is scaled by this where no network is stored.
+DETOUR_FACTOR = 1.3
+
+# (south, west, north, east) of the areas `build_tiles` covers by default.
+METRO_AREAS = {
+    "stockholm": (59.15, 17.60, 59.55, 18.35),
+    "goteborg": (57.58, 11.75, 57.85, 12.15),
+    "malmo": (55.48, 12.90, 55.65, 13.15),
+}
+# OSM tags that make a way walkable; other highways count only with a sidewalk.
+PEDESTRIAN_HIGHWAYS = {
+    "footway",
+    "pedestrian",
+    "path",
+    "track",
+    "steps",
+    "living_street",
+    "corridor",
+    "platform",
+}
+SIDEWALK_VALUES = {"yes", "both", "left", "right", "separate"}
+FOOT_VALUES = {"yes", "designated", "permissive"}
+
+WalkRoute = namedtuple("WalkRoute", ["coords", "metres", "seconds", "source"])
+
+
+def tile_of(x, y):
+    """Grid tile (column, row) of SWEREF99 TM coordinates."""
+    column = np.floor_divide(x, TILE_M).astype(int)
+    row = np.floor_divide(y, TILE_M).astype(int)
+    return column, row
+
+
+class WalkTileStore:
+    """Pedestrian network edges per tile, in SQLite.
+
+    Each tile holds the (lat1, lon1, lat2, lon2) of the edges whose midpoint
+    lies in it. A missing file simply has no tiles, so walks fall back to
+    querying OSM.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._local = threading.local()
+
+    def _connection(self, create=False):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if not create and not self.path.exists():
+                return None
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tiles (tx INTEGER, ty INTEGER, "
+                "area TEXT, edges BLOB, PRIMARY KEY (tx, ty))"
+            )
+            self._local.conn = conn
+        return conn
+
+    def edges(self, tiles):
+        """(n, 4) array of the edges stored in the tiles of `tiles`, a
+        (first column, last column, first row, last row) range.
+        """
+        conn = self._connection()
+        if conn is None:
+            return np.empty((0, 4))
+        rows = conn.execute(
+            "SELECT edges FROM tiles WHERE tx BETWEEN ? AND ? AND ty BETWEEN ? AND ?",
+            [int(v) for v in tiles],
+        ).fetchall()
+        if not rows:
+            return np.empty((0, 4))
+        return np.concatenate(
+            [np.frombuffer(blob, dtype=np.float64).reshape(-1, 4) for blob, in rows]
+        )
+
+    def put_many(self, tiles):
+        """Store `((tx, ty), area, edges)` rows, replacing existing tiles."""
+        conn = self._connection(create=True)
+        with conn:
+            cursor = conn.executemany(
+                "INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)",
+                (
+                    (int(tx), int(ty), area, np.ascontiguousarray(edges).tobytes())
+                    for (tx, ty), area, edges in tiles
+                ),
+            )
+        return cursor.rowcount
+
+    def __len__(self):
+        conn = self._connection()
+        if conn is None:
+            return 0
+        return conn.execute("SELECT COUNT(*) FROM tiles").fetchone()[0]
+
+
+class _TileGraph:
+    """A FeatureGraph over some tiles, with its path engine and a k-d tree."""
+
+    def __init__(self, edges):
+        self.graph = FeatureGraph.from_segments(*edges.T)
+        self.engine = path_engine.create(self.graph)
+        self.tree = spatial.cKDTree(np.column_stack([self.graph.x, self.graph.y]))
+
+
+class WalkingNetwork:
+    """Walking routes on the stored tiles, cached per stop pair."""
+
+    def __init__(self, store, route_cache_size=4096, graph_cache_size=8):
+        self.store = store
+        self.route_cache_size = route_cache_size
+        self.graph_cache_size = graph_cache_size
+        self._routes = OrderedDict()
+        self._graphs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def route(self, start, end):
+        """WalkRoute from `start` to `end` (lat, lon) on the network, or None
+        when the area has no tiles, the walk is longer than MAX_WALK_M or
+        either end is too far from a path.
+        """
+        key = (
+            round(start[0], 5),
+            round(start[1], 5),
+            round(end[0], 5),
+            round(end[1], 5),
+        )
+        with self._lock:
+            if key in self._routes:
+                self._routes.move_to_end(key)
+                return self._routes[key]
+        route = self._route(start, end)
+        with self._lock:
+            self._routes[key] = route
+            while len(self._routes) > self.route_cache_size:
+                self._routes.popitem(last=False)
+        return route
+
+    def _route(self, start, end):
+        x, y = to_sweref99tm([start[0], end[0]], [start[1], end[1]])
+        if max(abs(x[1] - x[0]), abs(y[1] - y[0])) > MAX_WALK_M:
+            return None
+        tiles = self._tiles_around(x, y)
+        tile_graph = self._tile_graph(tiles)
+        if tile_graph is None:
+            return None
+        snaps, (a, b) = tile_graph.tree.query(np.column_stack([x, y]))
+        if snaps.max() > MAX_SNAP_M:
+            logger.debug(
+                "🚶 %s or %s is %.0f m off the walk network", start, end, snaps.max()
+            )
+            return None
+        path = tile_graph.engine.shortest_path(int(a), int(b))
+        if path is None:
+            return None
+        graph = tile_graph.graph
+        metres = float(np.hypot(np.diff(graph.x[path]), np.diff(graph.y[path])).sum())
+        metres += float(snaps.sum())
+        coords = [tuple(start), *graph.path_coords(path), tuple(end)]
+        return WalkRoute(coords, metres, metres / WALK_SPEED_M_S, "network")
+
+    def _tiles_around(self, x, y):
+        (x0, x1), (y0, y1) = tile_of(
+            np.array([min(x) - MARGIN_M, max(x) + MARGIN_M]),
+            np.array([min(y) - MARGIN_M, max(y) + MARGIN_M]),
+        )
+        return (int(x0), int(x1), int(y0), int(y1))
+
+    def _tile_graph(self, tiles):
+        with self._lock:
+            if tiles in self._graphs:
+                self._graphs.move_to_end(tiles)
+                return self._graphs[tiles]
+        edges = self.store.edges(tiles)
+        tile_graph = _TileGraph(edges) if len(edges) else None
+        with self._lock:
+            self._graphs[tiles] = tile_graph
+            while len(self._graphs) > self.graph_cache_size:
+                self._graphs.popitem(last=False)
+        return tile_graph
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+            self._graphs.clear()
+
+
+# Walks within the metro areas are routed on these tiles instead of Overpass.
+# None disables them.
+network = WalkingNetwork(WalkTileStore(WALK_TILES_PATH))
+
+
+def straight_walk(start, end):
+    """WalkRoute along the straight line, its length scaled by DETOUR_FACTOR."""
+    x, y = to_sweref99tm([start[0], end[0]], [start[1], end[1]])
+    metres = float(np.hypot(x[1] - x[0], y[1] - y[0])) * DETOUR_FACTOR
+    return WalkRoute(
+        [tuple(start), tuple(end)], metres, metres / WALK_SPEED_M_S, "straight"
+    )
+
+
+def straight_seconds(metres):
+    """Walking seconds for straight-line `metres`, as `straight_walk` times them."""
+    return np.asarray(metres) * DETOUR_FACTOR / WALK_SPEED_M_S
+
+
+def path_route(coords, source):
+    """WalkRoute along `coords` [(lat, lon), ...], found by `source`."""
+    lats, lons = np.asarray(coords, dtype=float).T
+    metres = float(segment_lengths(*to_sweref99tm(lats, lons)).sum())
+    return WalkRoute(list(coords), metres, metres / WALK_SPEED_M_S, source)
+
+
+def walkable(features):
+    """Rows of an OSM extract that pedestrians can use."""
+    mask = np.zeros(len(features), dtype=bool)
+    if "highway" in features:
+        mask |= features["highway"].isin(PEDESTRIAN_HIGHWAYS).to_numpy()
+    if "sidewalk" in features:
+        mask |= features["sidewalk"].isin(SIDEWALK_VALUES).to_numpy()
+    if "foot" in features:
+        mask |= features["foot"].isin(FOOT_VALUES).to_numpy()
+    if "access" in features:
+        mask &= ~features["access"].isin({"no", "private"}).to_numpy()
+    return features[mask]
+
+
+def build_tiles(extract_path, store, areas=METRO_AREAS):
+    """Fill `store` with the walkable ways of `extract_path` within `areas`.
+
+    `extract_path` is any file geopandas can read with OSM tags as columns
+    (e.g. an osmium GeoJSON export). Returns the number of tiles written.
+    """
+    import geopandas as gpd
+
+    written = 0
+    for area, (south, west, north, east) in areas.items():
+        features = walkable(
+            gpd.read_file(extract_path, bbox=(west, south, east, north))
+        )
+        graph = FeatureGraph.from_features(features)
+        if not len(graph.src):
+            logger.warning("🚶 No walkable ways in %s", area)
+            continue
+        src, dst = graph.src, graph.dst
+        edges = np.column_stack(
+            [graph.lats[src], graph.lons[src], graph.lats[dst], graph.lons[dst]]
+        )
+        tx, ty = tile_of(
+            (graph.x[src] + graph.x[dst]) / 2, (graph.y[src] + graph.y[dst]) / 2
+        )
+        tiles, tile = np.unique(np.column_stack([tx, ty]), axis=0, return_inverse=True)
+        tile = tile.ravel()
+        order = np.argsort(tile, kind="stable")
+        parts = np.split(
+            edges[order], np.searchsorted(tile[order], np.arange(1, len(tiles)))
+        )
+        written += store.put_many(
+            (tuple(key), area, part) for key, part in zip(tiles, parts)
+        )
+        logger.info(
+            "🚶 %s: %d nodes, %d edges in %d tiles",
+            area,
+            len(graph),
+            len(src),
+            len(tiles),
+        )
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Store the pedestrian network of the metro areas in tiles, so "
+        "walks between stops are routed without querying OSM."
+    )
+    parser.add_argument("extract", help="local OSM extract with walkable ways")
+    parser.add_argument(
+        "--area",
+        action="append",
+        choices=sorted(METRO_AREAS),
+        help="metro area to build (repeatable, default: all)",
+    )
+    parser.add_argument("--store", default=str(WALK_TILES_PATH))
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    areas = {name: METRO_AREAS[name] for name in args.area or METRO_AREAS}
+    written = build_tiles(args.extract, WalkTileStore(args.store), areas)
+    print(f"💾 {written} tiles written to {args.store}")
+
+
+if __name__ == "__main__":
+    main()
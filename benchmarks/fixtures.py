@@ -0,0 +1,403 @@
+import json
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import polyline
+
+FIXTURE_PATH = Path(__file__).resolve().parent / "fixtures"
+
+# The benchmark trip: T-bana Fridhemsplan → T-Centralen, a short walk to
+# Stockholm C, regional train to Uppsala C and a bus to Akademiska sjukhuset.
+# Stop ids and coordinates are taken from data/stops.txt.
+SUBWAY_STOPS = [
+    ("740021661", "Fridhemsplan T-bana", 59.332199, 18.029188, "08:02"),
+    ("740021660", "Rådhuset T-bana", 59.330300, 18.042068, "08:04"),
+    ("740020749", "T-Centralen T-bana", 59.330947, 18.059263, "08:06"),
+]
+TRAIN_STOPS = [
+    ("740000001", "Stockholm Centralstation", 59.330140, 18.058155, "08:18"),
+    ("740000758", "Sollentuna station", 59.428849, 17.948037, "08:29"),
+    ("740000027", "Märsta station", 59.628181, 17.861620, "08:44"),
+    ("740000556", "Arlanda Centralstation", 59.649471, 17.929198, "08:50"),
+    ("740000559", "Knivsta station", 59.725703, 17.786688, "08:58"),
+    ("740000005", "Uppsala Centralstation", 59.858534, 17.646086, "09:09"),
+]
+BUS_STOPS = [
+    ("740000005", "Uppsala Centralstation", 59.858534, 17.646086, "09:15"),
+    ("740007378", "Uppsala Akademiska sjukhuset södra", 59.846477, 17.639604, "09:21"),
+    ("740007637", "Uppsala Akademiska sjukhuset", 59.850508, 17.642841, "09:24"),
+]
+TRIP_DATE = "2025-03-03"
+
+
+def _stop(stop, kind):
+    ext_id, name, lat, lon, time = stop
+    return {
+        "name": name,
+        "extId": ext_id,
+        "lat": lat,
+        "lon": lon,
+        f"{kind}Time": f"{time}:00",
+        f"{kind}Date": TRIP_DATE,
+        "time": f"{time}:00",
+        "date": TRIP_DATE,
+    }
+
+
+def _leg(stops, product=None, leg_type="JNY"):
+    leg = {
+        "Origin": _stop(stops[0], "dep"),
+        "Destination": _stop(stops[-1], "arr"),
+        "type": leg_type,
+        "Stops": {
+            "Stop": [
+                {**_stop(stop, "arr"), **_stop(stop, "dep")} for stop in stops[1:-1]
+            ]
+        },
+    }
+    if product is not None:
+        leg["Product"] = [product]
+        leg["name"] = product["name"]
+    return leg
+
+
+def synthetic_trip():
+    """A ResRobot /trip response with three alternatives, shaped like v2.1."""
+    subway = _leg(
+        SUBWAY_STOPS,
+        {"name": "Länstrafik - Tunnelbana 17", "num": "17", "catCode": "5"},
+    )
+    walk = _leg([SUBWAY_STOPS[-1], TRAIN_STOPS[0]], leg_type="WALK")
+    train = _leg(TRAIN_STOPS, {"name": "Regional Tåg 40", "num": "40", "catCode": "4"})
+    bus = _leg(BUS_STOPS, {"name": "Länstrafik - Buss 3", "num": "3", "catCode": "7"})
+    return {
+        "Trip": [
+            {"idx": 0, "tripId": "C-0", "LegList": {"Leg": [subway, walk, train, bus]}},
+            {"idx": 1, "tripId": "C-1", "LegList": {"Leg": [train, bus]}},
+            {"idx": 2, "tripId": "C-2", "LegList": {"Leg": train}},
+        ]
+    }
+
+
+def synthetic_departure_board(location_id="740000001", count=60):
+    """A ResRobot /departureBoard response with `count` departures."""
+    rng = np.random.default_rng(int(location_id) % 1000)
+    departures = []
+    for i in range(count):
+        minutes = 8 * 60 + i * 2 + int(rng.integers(0, 2))
+        line = int(rng.integers(1, 60))
+        passlist = [
+            {
+                "name": f"Hållplats {line}:{stop}",
+                "extId": f"74000{line:02d}{stop:02d}",
+                "depTime": f"{(minutes + 2 * stop) // 60 % 24:02d}:"
+                f"{(minutes + 2 * stop) % 60:02d}:00",
+            }
+            for stop in range(8)
+        ]
+        departures.append(
+            {
+                "name": f"Länstrafik - Buss {line}",
+                "stop": "Stockholm Centralstation",
+                "stopExtId": str(location_id),
+                "direction": f"Destination {line}",
+                "time": f"{minutes // 60 % 24:02d}:{minutes % 60:02d}:00",
+                "date": TRIP_DATE,
+                "JourneyDetailRef": {"ref": f"1|{i}|0|1|3032025"},
+                "ProductAtStop": {
+                    "name": f"Buss {line}",
+                    "num": str(line),
+                    "catCode": "7",
+                },
+                "Stops": {"Stop": passlist},
+            }
+        )
+    return {"Departure": departures}
+
+
+def _wiggle(points, spacing, amplitude, rng):
+    """Densify a (lon, lat) polyline to about `spacing` degrees and bend it."""
+    out = [points[0]]
+    for start, end in zip(points[:-1], points[1:]):
+        steps = max(2, int(np.hypot(*(np.subtract(end, start))) / spacing))
+        t = np.linspace(0, 1, steps + 1)[1:]
+        bend = amplitude * np.sin(np.pi * t) * rng.uniform(-1, 1)
+        normal = np.array([start[1] - end[1], end[0] - start[0]])
+        normal /= np.linalg.norm(normal) or 1
+        seg = np.outer(1 - t, start) + np.outer(t, end) + np.outer(bend, normal)
+        out.extend(map(tuple, seg))
+    return out
+
+
+def _ways(coords, vertices_per_way=30):
+    """Split a long polyline into OSM-like ways that share their end nodes."""
+    return [
+        coords[i : i + vertices_per_way + 1]  # noqa: E203
+        for i in range(0, len(coords) - 1, vertices_per_way)
+    ]
+
+
+def _line_network(stops, spacing, rng, branches=0, distractors=0, track_offset=0.0):
+    """Ways along `stops`, optionally with a second track, sidings and other lines."""
+    main = _wiggle([(lon, lat) for _, _, lat, lon, _ in stops], spacing, 0.002, rng)
+    ways = _ways(main)
+    if track_offset:
+        ways += _ways([(lon + track_offset, lat + track_offset) for lon, lat in main])
+    for _ in range(branches):
+        lon, lat = main[int(rng.integers(0, len(main)))]
+        end = (lon + rng.uniform(-0.05, 0.05), lat + rng.uniform(-0.05, 0.05))
+        ways += _ways(_wiggle([(lon, lat), end], spacing, 0.002, rng))
+    center = np.mean([(lon, lat) for _, _, lat, lon, _ in stops], axis=0)
+    for _ in range(distractors):
+        angle = rng.uniform(0, 2 * np.pi)
+        reach = rng.uniform(0.2, 0.6)
+        end = tuple(center + reach * np.array([np.cos(angle), np.sin(angle)]))
+        ways += _ways(_wiggle([tuple(center), end], spacing, 0.01, rng))
+    return ways
+
+
+@lru_cache(maxsize=None)
+def synthetic_network(name):
+    """A GeoDataFrame of LineStrings standing in for an Overpass answer."""
+    import geopandas as gpd
+    from shapely.geometry import LineString, MultiLineString
+
+    rng = np.random.default_rng(sum(map(ord, name)))
+    if name == "rail":
+        ways = _line_network(
+            TRAIN_STOPS, 0.0008, rng, branches=60, distractors=8, track_offset=0.00005
+        )
+    elif name == "rail_corridor":
+        # A wide corridor around the whole line, as fetched for a long hop.
+        ways = _line_network(
+            TRAIN_STOPS, 0.0002, rng, branches=600, distractors=60, track_offset=0.00005
+        )
+    elif name == "subway":
+        ways = _line_network(SUBWAY_STOPS, 0.0003, rng, branches=6, distractors=3)
+    elif name == "walk":
+        # A footway grid around the T-Centralen / Stockholm C transfer.
+        lons = np.arange(18.050, 18.068, 0.0006)
+        lats = np.arange(59.326, 59.336, 0.0004)
+        ways = [[(lon, lat) for lat in lats] for lon in lons]
+        ways += [[(lon, lat) for lon in lons] for lat in lats]
+    else:
+        ways = []
+    lines = [LineString(way) for way in ways]
+    if name == "rail_corridor":
+        # Overpass returns ways that belong to route relations as MultiLineStrings.
+        lines = lines[::2] + [
+            MultiLineString([a, b]) for a, b in zip(lines[1::4], lines[3::4])
+        ]
+    return gpd.GeoDataFrame(
+        {"railway" if name != "walk" else "highway": [name] * len(lines)},
+        geometry=lines,
+        crs="EPSG:4326",
+    )
+
+
+def synthetic_gtfs_feed(directory):
+    """Write a one-route GTFS feed with a shape along TRAIN_STOPS into `directory`."""
+    import csv
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(42)
+    shape = _wiggle(
+        [(lon, lat) for _, _, lat, lon, _ in TRAIN_STOPS], 0.0008, 0.002, rng
+    )
+    tables = {
+        "routes.txt": [
+            {
+                "route_id": "R40",
+                "agency_id": "1",
+                "route_short_name": "40",
+                "route_long_name": "Regional Tåg 40",
+                "route_type": "102",
+            }
+        ],
+        "trips.txt": [
+            {"route_id": "R40", "service_id": "1", "trip_id": "T1", "shape_id": "S1"}
+        ],
+        "stops.txt": [
+            {
+                "stop_id": ext_id,
+                "stop_name": name,
+                "stop_lat": lat,
+                "stop_lon": lon,
+                "parent_station": "",
+            }
+            for ext_id, name, lat, lon, _ in TRAIN_STOPS
+        ],
+        "stop_times.txt": [
+            {
+                "trip_id": "T1",
+                "arrival_time": f"{time}:00",
+                "departure_time": f"{time}:00",
+                "stop_id": ext_id,
+                "stop_sequence": seq,
+            }
+            for seq, (ext_id, _, _, _, time) in enumerate(TRAIN_STOPS, start=1)
+        ],
+        "shapes.txt": [
+            {
+                "shape_id": "S1",
+                "shape_pt_lat": lat,
+                "shape_pt_lon": lon,
+                "shape_pt_sequence": seq,
+            }
+            for seq, (lon, lat) in enumerate(shape, start=1)
+        ],
+    }
+    for name, rows in tables.items():
+        with open(directory / name, "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    return directory
+
+
+def synthetic_transit_feed(directory, size=25, headway_s=600):
+    """Write a GTFS feed of a `size` x `size` station grid around Stockholm C.
+
+    Every grid row and column is a line run in both directions every
+    `headway_s` seconds from 05:00 to midnight, on every day of 2025.
+    """
+    import pandas as pd
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    _, _, lat0, lon0, _ = TRAIN_STOPS[0]
+    rows, cols = np.divmod(np.arange(size * size), size)
+    stops = pd.DataFrame(
+        {
+            "stop_id": 9000000 + np.arange(size * size),
+            "stop_name": [f"Hållplats {r}-{c}" for r, c in zip(rows, cols)],
+            "stop_lat": lat0 + (rows - size // 2) * 0.0032,
+            "stop_lon": lon0 + (cols - size // 2) * 0.0062,
+            "parent_station": "",
+        }
+    )
+    grid = np.arange(size * size).reshape(size, size)
+    lines = [grid[i] for i in range(size)] + [grid[:, i] for i in range(size)]
+    lines += [line[::-1] for line in lines]
+
+    starts = np.arange(5 * 3600, 24 * 3600, headway_s)
+    trip_ids = np.arange(len(lines) * len(starts))
+    stop_index = np.concatenate([np.tile(line, len(starts)) for line in lines])
+    sequence = np.tile(np.arange(size), len(trip_ids))
+    trip_of = np.repeat(trip_ids, size)
+    arrival = np.repeat(np.tile(starts, len(lines)), size) + sequence * 120
+    departure = arrival + 30
+
+    def clock(seconds):
+        h, rest = np.divmod(seconds, 3600)
+        m, sec = np.divmod(rest, 60)
+        return [f"{a}:{b:02d}:{c:02d}" for a, b, c in zip(h, m, sec)]
+
+    tables = {
+        "trips.txt": pd.DataFrame(
+            {
+                "route_id": np.repeat(np.arange(len(lines)), len(starts)),
+                "service_id": "1",
+                "trip_id": trip_ids,
+            }
+        ),
+        "stops.txt": stops,
+        "stop_times.txt": pd.DataFrame(
+            {
+                "trip_id": trip_of,
+                "arrival_time": clock(arrival),
+                "departure_time": clock(departure),
+                "stop_id": 9000000 + stop_index,
+                "stop_sequence": sequence + 1,
+            }
+        ),
+        "calendar.txt": pd.DataFrame(
+            {
+                "service_id": ["1"],
+                **{day: ["1"] for day in ("monday", "tuesday", "wednesday")},
+                **{day: ["1"] for day in ("thursday", "friday", "saturday", "sunday")},
+                "start_date": ["20250101"],
+                "end_date": ["20251231"],
+            }
+        ),
+    }
+    for name, table in tables.items():
+        table.to_csv(directory / name, index=False)
+    return directory
+
+
+def network_for_tags(tags):
+    """Name of the fixture network answering an Overpass query for `tags`."""
+    return tags.get("railway", "walk")
+
+
+@lru_cache(maxsize=None)
+def load_network(name):
+    """Recorded Overpass features for `name`, or the synthetic stand-in."""
+    recorded = FIXTURE_PATH / f"overpass_{name}.geojson"
+    if recorded.exists():
+        import geopandas as gpd
+
+        return gpd.read_file(recorded)
+    return synthetic_network(name)
+
+
+def features_from_polygon(polygon, tags):
+    """Offline replacement for osmnx.features_from_polygon."""
+    network = load_network(network_for_tags(tags))
+    return network[network.intersects(polygon)]
+
+
+def synthetic_osrm_route(start, end):
+    """An OSRM /route response following a bent line from start to end (lat, lon)."""
+    rng = np.random.default_rng(int(abs(start[0] * 1e5 + end[1] * 1e5)))
+    coords = _wiggle([start[::-1], end[::-1]], 0.0002, 0.001, rng)
+    return {
+        "code": "Ok",
+        "routes": [
+            {
+                "geometry": polyline.encode([(lat, lon) for lon, lat in coords]),
+                "distance": 0,
+                "duration": 0,
+            }
+        ],
+    }
+
+
+def _load_json(name, factory, *args):
+    recorded = FIXTURE_PATH / name
+    if recorded.exists():
+        return json.loads(recorded.read_text(encoding="utf-8"))
+    return factory(*args)
+
+
+def respond(url, params=None):
+    """Status and JSON body for a ResRobot or OSRM request URL.
+
+    Recorded responses in benchmarks/fixtures/ win over the synthetic ones;
+    record them with `python -m benchmarks.record`.
+    """
+    parts = urlsplit(url)
+    query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+    query.update(params or {})
+    if "/route/v1/" in parts.path:
+        lonlat = parts.path.rsplit("/", 1)[-1]
+        recorded = _load_json("osrm_routes.json", dict)
+        if lonlat in recorded:
+            return 200, recorded[lonlat]
+        start, end = [
+            tuple(map(float, pair.split(",")))[::-1] for pair in lonlat.split(";")
+        ]
+        return 200, synthetic_osrm_route(start, end)
+    if parts.path.endswith("/trip"):
+        return 200, _load_json("resrobot_trip.json", synthetic_trip)
+    if parts.path.endswith("/departureBoard"):
+        return 200, _load_json(
+            "resrobot_departure_board.json",
+            synthetic_departure_board,
+            query.get("id", "740000001"),
+        )
+    return 404, {"errorCode": "API_NOT_FOUND", "errorText": parts.path}
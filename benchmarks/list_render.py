@@ -0,0 +1,79 @@
+import argparse
+import time
+
+DEFAULT_SIZES = (20, 60, 200)
+
+
+def _departure_script(mode, count):
+    from benchmarks import fixtures
+    from frontend import timetable_sidebar
+
+    departures = fixtures.synthetic_departure_board(
+        fixtures.SUBWAY_STOPS[0][0], count=count
+    )["Departure"]
+    if mode == "rows":
+        timetable_sidebar.show_departure_rows(departures)
+    else:
+        timetable_sidebar.show_departure_list(departures)
+
+
+def _trip_script(mode, count):
+    from benchmarks import fixtures
+    from frontend import dashboard
+
+    trips = fixtures.synthetic_trip()["Trip"]
+    trips = (trips * (count // len(trips) + 1))[:count]
+    if mode == "rows":
+        summaries = dashboard.trip_summaries(trips)
+        dashboard.show_trip_rows(trips, summaries, fixtures.BUS_STOPS[-1][1])
+    else:
+        dashboard.show_trip_list({"Trip": trips}, fixtures.BUS_STOPS[-1][1])
+
+
+SCRIPTS = {"departures": _departure_script, "trips": _trip_script}
+
+
+def count_elements(node):
+    """Number of elements and blocks below an AppTest node."""
+    children = getattr(node, "children", None)
+    if not children:
+        return 1
+    return 1 + sum(count_elements(child) for child in children.values())
+
+
+def measure(name, mode, count, repeat=3):
+    """Best wall time of a full script run, and the number of elements drawn."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_function(SCRIPTS[name], args=(mode, count), default_timeout=120)
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        at.run()
+        best = min(best, time.perf_counter() - start)
+    return best, count_elements(at._tree)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare rerun time of the per-row and batched list layouts."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'list':<12}{'rows':>6}{'mode':>9}{'rerun ms':>11}{'elements':>10}")
+    for name in SCRIPTS:
+        for count in args.sizes:
+            for mode in ("rows", "batched"):
+                seconds, elements = measure(name, mode, count, args.repeat)
+                print(
+                    f"{name:<12}{count:>6}{mode:>9}{seconds * 1000:>11.1f}{elements:>10}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,436 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from itertools import cycle
+
+from benchmarks import fixtures
+from benchmarks.stub_server import serve, stub_settings
+from utils.constants import FRONTEND_PATH, ROOT_PATH
+
+# The user flow, one script rerun per stage.
+STAGES = ("open", "pick_start", "search", "map")
+# Stop pairs from the fixture trip, so every search finds trips and a map.
+DEFAULT_QUERIES = [
+    (origin[1], destination[1])
+    for origin in fixtures.SUBWAY_STOPS + fixtures.TRAIN_STOPS[:2]
+    for destination in fixtures.TRAIN_STOPS[3:] + fixtures.BUS_STOPS[1:]
+]
+WIDGET_TYPES = (
+    "selectbox",
+    "button",
+    "checkbox",
+    "date_input",
+    "slider",
+    "arrow_data_frame",
+)
+
+
+class DashboardSession:
+    """One simulated browser tab, talking to a Streamlit worker over its websocket.
+
+    Only the parts of the protocol the dashboard needs: rerun the script with
+    widget values and wait until the run has finished.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.widgets = {}  # user key -> widget proto of the last rerun
+        self.fragments = {}  # user key -> id of the fragment holding the widget
+        self.connection = None
+
+    async def connect(self):
+        from tornado.websocket import websocket_connect
+
+        self.connection = await websocket_connect(
+            self.url, subprotocols=["streamlit"], max_message_size=64 * 2**20
+        )
+
+    async def rerun(self, widget_states=(), fragment_id="", timeout=300):
+        """Rerun the script, or only the fragment `fragment_id`.
+
+        Returns (seconds, error messages shown by the app).
+        """
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.widget_states.widgets.extend(widget_states)
+        msg.rerun_script.fragment_id = fragment_id
+        errors = []
+        start = time.perf_counter()
+        await self.connection.write_message(msg.SerializeToString(), binary=True)
+        while True:
+            payload = await asyncio.wait_for(self.connection.read_message(), timeout)
+            if payload is None:
+                raise ConnectionError("Streamlit closed the websocket")
+            forward = ForwardMsg()
+            forward.ParseFromString(payload)
+            kind = forward.WhichOneof("type")
+            if kind == "delta":
+                errors.extend(self._read_delta(forward.delta))
+            elif kind == "script_finished" and forward.script_finished in (
+                ForwardMsg.FINISHED_SUCCESSFULLY,
+                ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY,
+                ForwardMsg.FINISHED_WITH_COMPILE_ERROR,
+            ):
+                return time.perf_counter() - start, errors
+
+    def _read_delta(self, delta):
+        if delta.WhichOneof("type") != "new_element":
+            return []
+        element = delta.new_element
+        kind = element.WhichOneof("type")
+        if kind in WIDGET_TYPES:
+            widget = getattr(element, kind)
+            # Widget ids look like "$$ID-<hash>-<user key>".
+            key = widget.id.split("-", 2)[-1]
+            self.widgets[key] = widget
+            self.fragments[key] = delta.fragment_id
+        elif kind == "exception":
+            return [element.exception.message]
+        elif kind == "alert" and element.alert.format == 1:  # Alert.ERROR
+            return [element.alert.body]
+        return []
+
+    def select(self, key, option):
+        """WidgetState choosing `option` in the selectbox with `key`."""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        widget = self.widgets[key]
+        return WidgetState(id=widget.id, int_value=list(widget.options).index(option))
+
+    def select_rows(self, key, rows):
+        """WidgetState selecting `rows` in the dataframe with `key`."""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        selection = {"selection": {"rows": list(rows), "columns": []}}
+        return WidgetState(id=self.widgets[key].id, string_value=json.dumps(selection))
+
+    def click(self, key):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        return WidgetState(id=self.widgets[key].id, trigger_value=True)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+async def run_session(url, start_name, end_name, think=0.0):
+    """Walk one user through open → pick start → search → select trip and map."""
+    record = {"worker": url, "start": start_name, "end": end_name, "stages": {}}
+    session = DashboardSession(url)
+    try:
+        await session.connect()
+
+        def stops():
+            return [
+                session.select("start_station", start_name),
+                session.select("end_station", end_name),
+            ]
+
+        def pick_trip():
+            # The batched trip list shows "Välj resa" once a row is selected.
+            if "trip_list" not in session.widgets:
+                return stops()
+            return stops() + [session.select_rows("trip_list", [0])]
+
+        # Per stage the reruns it takes, as (widget values, key of the widget
+        # whose fragment reruns); a rerun for a missing widget is skipped.
+        stages = [
+            ("open", [(lambda: [], None)]),
+            ("pick_start", [(lambda: stops()[:1], None)]),
+            ("search", [(stops, None)]),
+            (
+                "map",
+                [
+                    (pick_trip, "trip_list"),
+                    (lambda: pick_trip() + [session.click("0")], "0"),
+                ],
+            ),
+        ]
+        for stage, reruns in stages:
+            seconds, errors = 0.0, []
+            for widget_states, trigger in reruns:
+                if trigger is not None and trigger not in session.widgets:
+                    continue
+                took, shown = await session.rerun(
+                    widget_states(), fragment_id=session.fragments.get(trigger, "")
+                )
+                seconds += took
+                errors += shown
+            record["stages"][stage] = {"seconds": seconds, "errors": errors}
+            if think:
+                await asyncio.sleep(think)
+        record["status"] = (
+            "ok"
+            if not any(stage["errors"] for stage in record["stages"].values())
+            else "app_error"
+        )
+    except Exception as err:
+        record["status"] = "error"
+        record["error"] = f"{type(err).__name__}: {err}"
+    finally:
+        session.close()
+    return record
+
+
+async def drive(urls, queries, sessions, concurrency, think=0.0):
+    """Run `sessions` sessions, at most `concurrency` at once, spread over `urls`."""
+    semaphore = asyncio.Semaphore(concurrency)
+    targets = cycle(urls)
+    pairs = cycle(queries)
+
+    async def one(url, pair):
+        async with semaphore:
+            return await run_session(url, *pair, think=think)
+
+    return await asyncio.gather(
+        *(one(next(targets), next(pairs)) for _ in range(sessions))
+    )
+
+
+def start_worker(port, env):
+    """Start one headless Streamlit server running the dashboard."""
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "streamlit",
+            "run",
+            str(FRONTEND_PATH / "dashboard.py"),
+            "--server.headless=true",
+            f"--server.port={port}",
+            "--server.fileWatcherType=none",
+            "--browser.gatherUsageStats=false",
+        ],
+        cwd=ROOT_PATH,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_until_healthy(port, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Streamlit worker on port {port} exited")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health"):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"Streamlit worker on port {port} did not start")
+
+
+class MemorySampler:
+    """Samples the resident memory of each worker process in the background."""
+
+    def __init__(self, pids, interval=0.2):
+        import psutil
+
+        self.processes = {pid: psutil.Process(pid) for pid in pids}
+        self.interval = interval
+        self.samples = {pid: [] for pid in pids}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.interval)
+
+    def sample(self):
+        for pid, process in self.processes.items():
+            try:
+                self.samples[pid].append(process.memory_info().rss / 1e6)
+            except Exception:
+                pass
+
+    def __enter__(self):
+        self.sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+    def summary(self):
+        return {
+            str(pid): {
+                "start_mb": round(samples[0], 1),
+                "peak_mb": round(max(samples), 1),
+                "end_mb": round(samples[-1], 1),
+            }
+            for pid, samples in self.samples.items()
+            if samples
+        }
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def summarize(records, wall_seconds, memory):
+    """Throughput, latency percentiles per stage and memory per worker."""
+    summary = {
+        "sessions": len(records),
+        "wall_seconds": round(wall_seconds, 2),
+        "sessions_per_second": round(len(records) / wall_seconds, 3),
+        "reruns_per_second": round(
+            sum(len(record["stages"]) for record in records) / wall_seconds, 3
+        ),
+        "status": {},
+        "stages": {},
+        "workers": memory,
+    }
+    for record in records:
+        summary["status"][record["status"]] = (
+            summary["status"].get(record["status"], 0) + 1
+        )
+    for stage in STAGES:
+        seconds = [
+            record["stages"][stage]["seconds"]
+            for record in records
+            if stage in record["stages"]
+        ]
+        if not seconds:
+            continue
+        summary["stages"][stage] = {
+            "count": len(seconds),
+            "errors": sum(
+                bool(record["stages"][stage]["errors"])
+                for record in records
+                if stage in record["stages"]
+            ),
+            "mean_ms": round(statistics.mean(seconds) * 1000, 1),
+            **{
+                f"p{pct}_ms": round(percentile(seconds, pct) * 1000, 1)
+                for pct in (50, 95, 99)
+            },
+        }
+    return summary
+
+
+def print_summary(summary):
+    print(
+        f"\n{summary['sessions']} sessions in {summary['wall_seconds']}s: "
+        f"{summary['sessions_per_second']} sessions/s, "
+        f"{summary['reruns_per_second']} reruns/s, status {summary['status']}"
+    )
+    print(f"{'stage':<12}{'n':>6}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, stats in summary["stages"].items():
+        print(
+            f"{stage:<12}{stats['count']:>6}{stats['errors']:>6}"
+            f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}"
+        )
+    for pid, memory in summary["workers"].items():
+        print(
+            f"worker {pid}: {memory['start_mb']} MB idle, "
+            f"{memory['peak_mb']} MB peak, {memory['end_mb']} MB after"
+        )
+
+
+def run_load_test(
+    workers=2,
+    sessions=20,
+    concurrency=10,
+    think=0.0,
+    latency=0.05,
+    cache_dir=None,
+    base_port=8601,
+    queries=DEFAULT_QUERIES,
+):
+    """Start a stub server and `workers` Streamlit servers, then drive sessions.
+
+    Returns (summary, per-session records). With `cache_dir` None every run
+    starts from empty trip, OSRM and Overpass caches.
+    """
+    stub = serve(latency=latency)
+    env = dict(os.environ)
+    env.update(stub_settings(stub))
+    env["TRAVEL_PLANNER_CACHE_DIR"] = cache_dir or tempfile.mkdtemp(
+        prefix="load_test_cache_"
+    )
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(ROOT_PATH), env.get("PYTHONPATH")])
+    )
+    ports = [base_port + i for i in range(workers)]
+    processes = [start_worker(port, env) for port in ports]
+    try:
+        for port, process in zip(ports, processes):
+            wait_until_healthy(port, process)
+        urls = [f"ws://127.0.0.1:{port}/_stcore/stream" for port in ports]
+        with MemorySampler([process.pid for process in processes]) as memory:
+            start = time.perf_counter()
+            records = asyncio.run(
+                drive(urls, queries, sessions, concurrency, think=think)
+            )
+            wall = time.perf_counter() - start
+        return summarize(records, wall, memory.summary()), records
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=30)
+        stub.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Simulate concurrent dashboard sessions against local stubs "
+        "for ResRobot, OSRM and Overpass."
+    )
+    parser.add_argument("--workers", type=int, default=2, help="Streamlit servers")
+    parser.add_argument("--sessions", type=int, default=20, help="sessions in total")
+    parser.add_argument(
+        "--concurrency", type=int, default=10, help="sessions running at once"
+    )
+    parser.add_argument(
+        "--think", type=float, default=0.0, help="seconds between user actions"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="stub API latency in seconds"
+    )
+    parser.add_argument(
+        "--cache-dir", help="share this cache directory (default: a cold, empty one)"
+    )
+    parser.add_argument("--base-port", type=int, default=8601)
+    parser.add_argument("--report", help="write summary and sessions as JSON here")
+    args = parser.parse_args(argv)
+
+    summary, records = run_load_test(
+        workers=args.workers,
+        sessions=args.sessions,
+        concurrency=args.concurrency,
+        think=args.think,
+        latency=args.latency,
+        cache_dir=args.cache_dir,
+        base_port=args.base_port,
+    )
+    print_summary(summary)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as file:
+            json.dump(
+                {"summary": summary, "sessions": records},
+                file,
+                ensure_ascii=False,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import contextlib
+import io
+import logging
+import timeit
+
+from shapely.geometry import LineString
+
+from utils.log import configure_logging
+
+logger = logging.getLogger("benchmarks.logging_overhead")
+
+# A long trip: 40 stops, like a regional train with every stop listed.
+STOPS = [
+    (f"7400{i:05d}", 57.7 + i * 0.01, 11.97 + i * 0.01, f"Hållplats {i}")
+    for i in range(40)
+]
+CORRIDOR = LineString([(11.97, 57.70), (12.37, 58.10)]).buffer(0.40)
+
+
+def old_print_style():
+    """What plot_trip / plot_train_routes did before: eager f-strings and WKT."""
+    for _, lat, lon, name in STOPS:
+        print(f"📍 Adding marker: {name} at {lat}, {lon}")
+    for _ in range(len(STOPS) - 1):
+        print(f"🚆 Buffered Area for Train Segment: {CORRIDOR}")
+
+
+def new_logging_style():
+    """The same messages through logger.debug with lazy %-formatting."""
+    for _, lat, lon, name in STOPS:
+        logger.debug("📍 Adding marker: %s at %s, %s", name, lat, lon)
+    for _ in range(len(STOPS) - 1):
+        logger.debug("🚆 Buffered Area for Train Segment: %s", CORRIDOR)
+
+
+def run(number=50):
+    """Seconds per trip for both styles, with output captured in memory."""
+    configure_logging(level="INFO")
+    with contextlib.redirect_stdout(io.StringIO()):
+        old = timeit.timeit(old_print_style, number=number) / number
+    new = timeit.timeit(new_logging_style, number=number) / number
+    return {"print_ms": old * 1000, "logging_at_info_ms": new * 1000}
+
+
+if __name__ == "__main__":
+    result = run()
+    print(
+        f"print-based:      {result['print_ms']:.3f} ms per trip\n"
+        f"logging at INFO:  {result['logging_at_info_ms']:.3f} ms per trip\n"
+        f"saved:            {result['print_ms'] - result['logging_at_info_ms']:.3f} ms per trip"
+    )
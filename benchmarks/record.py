@@ -0,0 +1,93 @@
+import argparse
+import json
+from unittest import mock
+
+import requests
+
+from benchmarks import fixtures
+from benchmarks.replay import NoCache
+
+
+def record(origin_id, destination_id, date=None, time="08:00"):
+    """Query the live APIs once and save the answers as benchmark fixtures.
+
+    Needs an API key (TRAVEL_PLANNER_API_KEY or .streamlit/secrets.toml) and
+    network access to ResRobot, OSRM and Overpass. Writes:
+
+      resrobot_trip.json, resrobot_departure_board.json
+      osrm_routes.json             OSRM answers keyed by "lon,lat;lon,lat"
+      overpass_<network>.geojson   every feature fetched per network
+    """
+    import geopandas as gpd
+    import osmnx
+    import pandas as pd
+
+    from backend import trips
+    from backend.connect_to_api import ResRobot
+    from backend.trips import TripPlanner
+
+    fixtures.FIXTURE_PATH.mkdir(exist_ok=True)
+    features = {}
+    osrm_routes = {}
+    real_features = osmnx.features_from_polygon
+    real_get = requests.get
+
+    def recording_features(polygon, tags):
+        found = real_features(polygon, tags=tags)
+        features.setdefault(fixtures.network_for_tags(tags), []).append(found)
+        return found
+
+    def recording_get(url, *args, **kwargs):
+        response = real_get(url, *args, **kwargs)
+        if "/route/v1/" in url and response.status_code == 200:
+            osrm_routes[url.split("?")[0].rsplit("/", 1)[-1]] = response.json()
+        return response
+
+    with mock.patch.object(ResRobot, "trip_cache", None), mock.patch.object(
+        trips, "osrm_cache", NoCache()
+    ), mock.patch("osmnx.features_from_polygon", recording_features), mock.patch(
+        "requests.get", recording_get
+    ):
+        resrobot = ResRobot.headless()
+        planner = TripPlanner(
+            origin_id, destination_id, resrobot=resrobot, date=date, time=time
+        )
+        _write_json("resrobot_trip.json", planner.trip_data)
+        _write_json(
+            "resrobot_departure_board.json", resrobot.timetable_departure(origin_id)
+        )
+        planner.extract_route_with_transfers()
+        planner.plot_trip()
+
+    _write_json("osrm_routes.json", osrm_routes)
+    for name, frames in features.items():
+        frame = gpd.GeoDataFrame(pd.concat(frames), crs="EPSG:4326")
+        frame = frame[frame.geometry.geom_type == "LineString"]
+        frame = frame[~frame.geometry.to_wkb().duplicated()]
+        frame[["geometry"]].to_file(
+            fixtures.FIXTURE_PATH / f"overpass_{name}.geojson", driver="GeoJSON"
+        )
+        print(f"💾 overpass_{name}.geojson: {len(frame)} features")
+
+
+def _write_json(name, payload):
+    path = fixtures.FIXTURE_PATH / name
+    path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    print(f"💾 {path.name}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Record live ResRobot, OSRM and Overpass answers as fixtures "
+        "for the offline benchmark suite."
+    )
+    parser.add_argument("--origin", default=fixtures.SUBWAY_STOPS[0][0])
+    parser.add_argument("--destination", default=fixtures.BUS_STOPS[-1][0])
+    parser.add_argument("--date", help="YYYY-MM-DD, defaults to today")
+    parser.add_argument("--time", default="08:00")
+    args = parser.parse_args(argv)
+    record(args.origin, args.destination, args.date, args.time)
+
+
+if __name__ == "__main__":
+    main()
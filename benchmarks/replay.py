@@ -0,0 +1,75 @@
+import json
+from contextlib import ExitStack, contextmanager
+from unittest import mock
+
+from benchmarks import fixtures
+
+
+class FakeResponse:
+    """The parts of requests.Response the backend uses."""
+
+    def __init__(self, url, status_code, payload):
+        self.url = url
+        self.status_code = status_code
+        self._payload = payload
+        self.headers = {"Content-Type": "application/json"}
+
+    @property
+    def text(self):
+        return json.dumps(self._payload, ensure_ascii=False)
+
+    def json(self):
+        # A fresh copy per call, like parsing a real response body would give.
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+
+            raise requests.exceptions.HTTPError(
+                f"{self.status_code} for {self.url}", response=self
+            )
+
+
+class NoCache:
+    """Cache stand-in that never hits."""
+
+    def get(self, key, default=None):
+        return default
+
+    def set(self, key, value):
+        pass
+
+
+def fake_get(url, params=None, **kwargs):
+    status, payload = fixtures.respond(url, params)
+    return FakeResponse(url, status, payload)
+
+
+@contextmanager
+def replay():
+    """Serve ResRobot, OSRM and Overpass from benchmarks/fixtures, offline.
+
+    Persistent caches, precomputed rail shapes and walk tiles and the client-side rate limit
+    are switched off so every call exercises the full code path. Yields a
+    ResRobot client.
+    """
+    from backend import trips, walking
+    from backend.connect_to_api import ResRobot
+    from backend.rate_limit import RateLimiter
+
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch("requests.get", fake_get))
+        stack.enter_context(
+            mock.patch("osmnx.features_from_polygon", fixtures.features_from_polygon)
+        )
+        stack.enter_context(mock.patch.object(ResRobot, "trip_cache", None))
+        stack.enter_context(
+            mock.patch.object(
+                ResRobot, "rate_limiter", RateLimiter(rate_per_minute=1e9, burst=1e9)
+            )
+        )
+        stack.enter_context(mock.patch.object(trips, "osrm_cache", NoCache()))
+        stack.enter_context(mock.patch.object(trips, "rail_shapes", None))
+        stack.enter_context(mock.patch.object(walking, "network", None))
+        yield ResRobot.headless(api_key="replay", base_url="http://replay/v2.1")
@@ -0,0 +1,140 @@
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote_plus, urlsplit
+
+from benchmarks import fixtures
+
+# Overpass QL as sent by osmnx: way["railway"="rail"](poly:"lat lon lat lon ...")
+_TAG_RE = re.compile(r"""way\[['"]([^'"]+)['"](?:=['"]([^'"]+)['"])?\]""")
+_POLY_RE = re.compile(r"""poly:['"]([-0-9. ]+)['"]""")
+OVERPASS_STATUS = (
+    "Connected as: 0\nCurrent time: 2025-01-01T00:00:00Z\n"
+    "Announced endpoint: none\nRate limit: 0\n2 slots available now.\n"
+    "Currently running queries (pid, space limit, time limit, start time):\n"
+)
+
+
+def overpass_response(query):
+    """Overpass JSON with the fixture ways inside the query polygon."""
+    from shapely.geometry import Polygon
+
+    poly = _POLY_RE.search(query)
+    tags = dict(_TAG_RE.findall(query))
+    if poly is None:
+        return {"version": 0.6, "elements": []}
+    values = list(map(float, poly.group(1).split()))
+    polygon = Polygon(zip(values[1::2], values[0::2]))
+    network = fixtures.features_from_polygon(polygon, tags)
+
+    node_ids = {}
+    nodes, ways = [], []
+    tag_key, tag_value = next(iter(tags.items()), ("highway", "footway"))
+    for way_id, line in enumerate(network.geometry, start=1):
+        refs = []
+        for lon, lat in line.coords:
+            if (lon, lat) not in node_ids:
+                node_ids[(lon, lat)] = len(node_ids) + 1
+                nodes.append(
+                    {"type": "node", "id": node_ids[(lon, lat)], "lat": lat, "lon": lon}
+                )
+            refs.append(node_ids[(lon, lat)])
+        ways.append(
+            {
+                "type": "way",
+                "id": way_id,
+                "nodes": refs,
+                "tags": {tag_key: tag_value or "yes"},
+            }
+        )
+    return {"version": 0.6, "elements": nodes + ways}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers ResRobot, OSRM and Overpass requests from benchmarks.fixtures."""
+
+    latency = 0.0
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status, body, content_type="application/json"):
+        if self.latency:
+            time.sleep(self.latency)
+        payload = body if isinstance(body, bytes) else body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path.endswith("/status"):
+            self._send(200, OVERPASS_STATUS, "text/plain")
+            return
+        if path.endswith("/interpreter"):
+            query = parse_qs(urlsplit(self.path).query).get("data", [""])[0]
+            self._send(200, json.dumps(overpass_response(query)))
+            return
+        status, payload = fixtures.respond(self.path)
+        self._send(status, json.dumps(payload, ensure_ascii=False))
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode("utf-8")
+        query = unquote_plus(body.partition("data=")[2])
+        self._send(200, json.dumps(overpass_response(query)))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host="127.0.0.1", port=0, latency=0.0):
+    """Start the stub server in a daemon thread; returns the server.
+
+    `latency` seconds are added to every response to mimic the real APIs.
+    The base URL is `f"http://{host}:{server.server_port}"`; point the app at
+    it with the RESROBOT_BASE_URL (…/v2.1), OSRM_BASE_URL and OVERPASS_URL
+    (…/api) settings.
+    """
+    handler = type("Handler", (StubHandler,), {"latency": latency})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stub_settings(server):
+    """Environment variables pointing the app at a running stub server."""
+    base = f"http://{server.server_address[0]}:{server.server_port}"
+    return {
+        "TRAVEL_PLANNER_RESROBOT_BASE_URL": f"{base}/v2.1",
+        "TRAVEL_PLANNER_OSRM_BASE_URL": base,
+        "TRAVEL_PLANNER_OVERPASS_URL": f"{base}/api",
+        "TRAVEL_PLANNER_API_KEY": "stub",
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Local stand-in for ResRobot, OSRM and Overpass."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds added per response"
+    )
+    args = parser.parse_args(argv)
+    server = serve(args.host, args.port, args.latency)
+    for name, value in stub_settings(server).items():
+        print(f"{name}={value}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,598 @@
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks import fixtures
+from benchmarks.replay import replay
+from utils import tracing
+
+RESULTS_PATH = Path(__file__).resolve().parent / "results" / "history.jsonl"
+# A case counts as a regression when its median is this much slower than the
+# baseline and the difference is above the noise floor.
+REGRESSION_RATIO = 1.25
+NOISE_FLOOR_MS = 0.05
+# Service day of the synthetic timetable used by the isochrone cases.
+TIMETABLE_DAY = "20250304"
+
+CASES = {}
+
+
+def case(name):
+    """Register a benchmark.
+
+    The decorated function gets the replaying ResRobot client, does the setup
+    and returns the callable that is timed.
+    """
+
+    def decorator(setup):
+        CASES[name] = setup
+        return setup
+
+    return decorator
+
+
+@case("stops.load_csv")
+def stops_load_csv(resrobot):
+    from utils.stop_table import StopTable
+
+    return StopTable.from_csv
+
+
+@case("stops.load_mmap")
+def stops_load_mmap(resrobot):
+    from utils.stop_table import StopTable
+
+    directory = tempfile.mkdtemp(prefix="stop_table_")
+    StopTable.from_csv().save(directory)
+    return lambda: StopTable.load(directory)
+
+
+@case("stops.search")
+def stops_search(resrobot):
+    from utils.stop_table import StopTable
+
+    table = StopTable.cached()
+    names = [table.name(row) for row in range(0, len(table), len(table) // 500)]
+    return lambda: [table.stop_id(name) for name in names]
+
+
+@case("geo.haversine_filter")
+def geo_haversine_filter(resrobot):
+    from utils.geo_utils import filter_stops_within_radius
+    from utils.stop_table import StopTable
+
+    stops_df = StopTable.cached().to_frame()
+    return lambda: filter_stops_within_radius(stops_df, 59.330140, 18.058155, 50)
+
+
+@case("trip.parse_json")
+def trip_parse_json(resrobot):
+    text = json.dumps(fixtures.respond("/v2.1/trip")[1], ensure_ascii=False)
+    return lambda: json.loads(text)
+
+
+@case("trip.search")
+def trip_search(resrobot):
+    from backend.trips import TripPlanner
+
+    return lambda: TripPlanner(
+        "740021661", "740007637", resrobot=resrobot, date=fixtures.TRIP_DATE
+    )
+
+
+@case("trip.extract_legs")
+def trip_extract_legs(resrobot):
+    planner = trip_search(resrobot)()
+
+    def extract():
+        planner.route_legs = []
+        return planner.extract_route_with_transfers()
+
+    return extract
+
+
+@case("map.render_html")
+def map_render_html(resrobot):
+    return _plot_trip(resrobot)._repr_html_
+
+
+@case("map.train_stored_shapes")
+def map_train_stored_shapes(resrobot):
+    from unittest import mock
+
+    from backend import trips
+    from backend.rail_shapes import RailShapeStore, build_store
+
+    directory = Path(tempfile.mkdtemp(prefix="rail_shapes_"))
+    feed = fixtures.synthetic_gtfs_feed(directory / "feed")
+    store = RailShapeStore(directory / "rail_shapes.sqlite")
+    build_store(feed, store, routes_path=feed / "routes.txt")
+    planner = trip_search(resrobot)()
+    planner.extract_route_with_transfers()
+    planner.initialize_map()
+    stations = next(
+        legs for mode, legs in planner.route_legs if mode.strategy == "train"
+    )
+
+    def plot():
+        with mock.patch.object(trips, "rail_shapes", store):
+            planner.plot_train_routes(planner.map_route, stations)
+
+    return plot
+
+
+def _walk_ends():
+    (_, _, lat1, lon1, _), (_, _, lat2, lon2, _) = (
+        fixtures.SUBWAY_STOPS[-1],
+        fixtures.TRAIN_STOPS[0],
+    )
+    return (lat1, lon1), (lat2, lon2)
+
+
+def _walk_network():
+    """WalkingNetwork on tiles built from the synthetic footway grid."""
+    from backend.walking import METRO_AREAS, WalkingNetwork, WalkTileStore, build_tiles
+
+    directory = Path(tempfile.mkdtemp(prefix="walk_tiles_"))
+    extract = fixtures.synthetic_network("walk").assign(highway="footway")
+    extract.to_file(directory / "extract.geojson")
+    store = WalkTileStore(directory / "walk_tiles.sqlite")
+    build_tiles(
+        directory / "extract.geojson", store, {"stockholm": METRO_AREAS["stockholm"]}
+    )
+    return WalkingNetwork(store)
+
+
+@case("walk.osm_route")
+def walk_osm_route(resrobot):
+    """Transfer walk through the Overpass corridor (replayed)."""
+    planner = trip_search(resrobot)()
+    start, end = _walk_ends()
+    return lambda: planner.find_walking_path(start, end)
+
+
+@case("walk.tiles_route")
+def walk_tiles_route(resrobot):
+    """Transfer walk on stored tiles, loading them and building the graph."""
+    network = _walk_network()
+    start, end = _walk_ends()
+
+    def route():
+        network.clear()
+        return network.route(start, end)
+
+    return route
+
+
+@case("walk.tiles_cached")
+def walk_tiles_cached(resrobot):
+    """Transfer walk on stored tiles for a stop pair seen before."""
+    network = _walk_network()
+    start, end = _walk_ends()
+    return lambda: network.route(start, end)
+
+
+def _rail_build_inputs():
+    rail = fixtures.synthetic_network("rail")
+    lines = [g.coords for g in rail.geometry if g.geom_type == "LineString"]
+    first, last = fixtures.TRAIN_STOPS[0], fixtures.TRAIN_STOPS[-1]
+    return lines, [(first[2], first[3]), (last[2], last[3])]
+
+
+@case("graph.build_points")
+def graph_build_points(resrobot):
+    """Former rail graph build: a Point pair per edge, degree lengths, min() snaps."""
+    import networkx as nx
+    from shapely import geometry
+
+    lines, stations = _rail_build_inputs()
+
+    def build():
+        G = nx.Graph()
+        for coords in lines:
+            coords = list(coords)
+            for j in range(len(coords) - 1):
+                lat1, lon1 = coords[j][1], coords[j][0]
+                lat2, lon2 = coords[j + 1][1], coords[j + 1][0]
+                dist = geometry.Point(lat1, lon1).distance(geometry.Point(lat2, lon2))
+                G.add_edge((lat1, lon1), (lat2, lon2), weight=dist)
+        return [
+            min(
+                G.nodes,
+                key=lambda node: geometry.Point(node).distance(geometry.Point(station)),
+            )
+            for station in stations
+        ]
+
+    return build
+
+
+@case("graph.build_projected")
+def graph_build_projected(resrobot):
+    """Rail graph build from the feature arrays, with vectorized snaps."""
+    from backend import path_engine
+    from backend.osm_graph import FeatureGraph
+
+    rail = fixtures.synthetic_network("rail")
+    _, stations = _rail_build_inputs()
+
+    def build():
+        graph = FeatureGraph.from_features(rail)
+        path_engine.create(graph, "csr")
+        return [graph.nearest(lat, lon) for lat, lon in stations]
+
+    return build
+
+
+@case("graph.corridor_iterrows")
+def graph_corridor_iterrows(resrobot):
+    """Former per-row build on a large rail corridor (MultiLineStrings skipped)."""
+    import networkx as nx
+    import numpy as np
+
+    from utils.projection import segment_lengths, to_sweref99tm
+
+    rail = fixtures.synthetic_network("rail_corridor")
+
+    def build():
+        G = nx.Graph()
+        for _, row in rail.iterrows():
+            if row.geometry.geom_type == "LineString":
+                coords = np.asarray(row.geometry.coords)
+                x, y = to_sweref99tm(coords[:, 1], coords[:, 0])
+                nodes = list(map(tuple, coords[:, ::-1].tolist()))
+                G.add_weighted_edges_from(
+                    zip(nodes[:-1], nodes[1:], segment_lengths(x, y).tolist())
+                )
+        return G
+
+    return build
+
+
+@case("graph.corridor_arrays")
+def graph_corridor_arrays(resrobot):
+    """Node and edge arrays of a large rail corridor, Multi* parts included."""
+    from backend.osm_graph import FeatureGraph
+
+    rail = fixtures.synthetic_network("rail_corridor")
+    return lambda: FeatureGraph.from_features(rail)
+
+
+def _corridor_route(engine_name):
+    """Largest component, snaps and shortest path end to end on the rail corridor."""
+    from backend import path_engine
+    from backend.osm_graph import FeatureGraph
+
+    graph = FeatureGraph.from_features(fixtures.synthetic_network("rail_corridor"))
+    _, stations = _rail_build_inputs()
+
+    def route():
+        engine = path_engine.create(graph, engine_name)
+        candidates = engine.largest_component()
+        start, end = (graph.nearest(lat, lon, candidates) for lat, lon in stations)
+        return graph, engine.shortest_path(start, end)
+
+    return route
+
+
+def _path_length(graph, path):
+    return float(np.hypot(np.diff(graph.x[path]), np.diff(graph.y[path])).sum())
+
+
+@case("path.corridor_csr")
+def path_corridor_csr(resrobot):
+    """CSR engine on the rail corridor, checked once against networkx."""
+    route = _corridor_route("csr")
+    graph, path = route()
+    _, reference = _corridor_route("networkx")()
+    assert abs(_path_length(graph, path) - _path_length(graph, reference)) < 1e-6
+    return route
+
+
+@case("path.corridor_astar")
+def path_corridor_astar(resrobot):
+    """A* engine on the rail corridor, checked once against networkx."""
+    route = _corridor_route("astar")
+    graph, path = route()
+    _, reference = _corridor_route("networkx")()
+    assert abs(_path_length(graph, path) - _path_length(graph, reference)) < 1e-6
+    return route
+
+
+@case("path.corridor_networkx")
+def path_corridor_networkx(resrobot):
+    """Reference networkx engine on the rail corridor."""
+    return _corridor_route("networkx")
+
+
+@lru_cache(maxsize=None)
+def _timetable_directory():
+    """Directory with the saved timetable of the synthetic station grid."""
+    from backend.timetable import build_timetable
+
+    directory = Path(tempfile.mkdtemp(prefix="timetable_"))
+    feed = fixtures.synthetic_transit_feed(directory / "feed")
+    build_timetable(feed, TIMETABLE_DAY).save(directory / TIMETABLE_DAY)
+    return directory
+
+
+@lru_cache(maxsize=None)
+def _transit_timetable():
+    """Timetable of the synthetic station grid, memory-mapped as in the app."""
+    from backend.timetable import Timetable
+
+    return Timetable.for_date(TIMETABLE_DAY, _timetable_directory())
+
+
+def _isochrone_inputs():
+    timetable = _transit_timetable()
+    centre = len(timetable) // 2
+    origin = (float(timetable.lats[centre]), float(timetable.lons[centre]))
+    return (
+        timetable,
+        str(timetable.stop_ids[centre]),
+        origin,
+        datetime(2025, 3, 4, 8, 3),
+    )
+
+
+@case("isochrone.raptor_30min")
+def isochrone_raptor(resrobot):
+    """Stations reachable within 30 minutes on a 625-station, 11k-trip grid."""
+    from backend import isochrone
+
+    timetable, stop_id, _, departure = _isochrone_inputs()
+    return lambda: isochrone.reachable(timetable, stop_id, departure, 30)
+
+
+@case("isochrone.heat_map")
+def isochrone_heat_map(resrobot):
+    """As isochrone.raptor_30min, rendered to map HTML with the heat layer."""
+    from backend import isochrone
+
+    timetable, stop_id, origin, departure = _isochrone_inputs()
+
+    def render():
+        reach = isochrone.reachable(timetable, stop_id, departure, 30)
+        return isochrone.isochrone_map(reach, origin, departure, 30)._repr_html_()
+
+    return render
+
+
+@case("matrix.local_10x625")
+def matrix_local(resrobot):
+    """Travel times from 10 stations to all 625 of the grid, 4 departures in 08:00-08:30."""
+    from backend.travel_matrix import travel_time_matrix
+
+    stop_ids = [str(stop_id) for stop_id in _transit_timetable().stop_ids]
+    return lambda: travel_time_matrix(
+        stop_ids[::63],
+        stop_ids,
+        datetime(2025, 3, 4, 8, 0),
+        datetime(2025, 3, 4, 8, 30),
+        max_minutes=60,
+        workers=1,
+        directory=_timetable_directory(),
+    )
+
+
+@case("matrix.resrobot_8x8")
+def matrix_resrobot(resrobot):
+    """64 replayed ResRobot searches fanned out over 4 threads."""
+    from backend.travel_matrix import travel_time_matrix
+
+    stop_ids = [f"74000{n:04d}" for n in range(8)]
+    return lambda: travel_time_matrix(
+        stop_ids,
+        stop_ids[::-1],
+        datetime(2025, 3, 3, 8, 0),
+        datetime(2025, 3, 3, 8, 20),
+        engine="resrobot",
+        workers=4,
+        resrobot=resrobot,
+    )
+
+
+def _plot_trip(resrobot):
+    planner = trip_search(resrobot)()
+    planner.extract_route_with_transfers()
+    return planner.plot_trip()
+
+
+def map_stages(resrobot, repeat):
+    """Per-stage timings of plot_trip (graph build, snap, shortest path, ...).
+
+    Taken from the tracing spans, summed per stage and mode within a run.
+    Shortest-path stages also report the nodes their searches expanded.
+    """
+    runs = []
+    expansions = []
+    for _ in range(repeat):
+        with tracing.capture() as sink:
+            _plot_trip(resrobot)
+        totals = {}
+        expanded = {}
+        for record in sink.records:
+            name = record["name"]
+            if "mode" in record:
+                name = f"{name}[{record['mode']}]"
+            totals[f"stage.{name}"] = (
+                totals.get(f"stage.{name}", 0.0) + record["duration_ms"]
+            )
+            if "expanded" in record:
+                expanded[f"stage.{name}"] = (
+                    expanded.get(f"stage.{name}", 0) + record["expanded"]
+                )
+        runs.append(totals)
+        expansions.append(expanded)
+    names = sorted(set().union(*runs))
+    stats = {name: _stats([run.get(name, 0.0) for run in runs]) for name in names}
+    for name in set().union(*expansions):
+        stats[name]["expanded"] = int(
+            statistics.median(run.get(name, 0) for run in expansions)
+        )
+    return stats
+
+
+def _stats(samples_ms):
+    return {
+        "median_ms": round(statistics.median(samples_ms), 4),
+        "min_ms": round(min(samples_ms), 4),
+        "runs": len(samples_ms),
+    }
+
+
+def measure(func, repeat):
+    """Median and minimum milliseconds per call over `repeat` samples.
+
+    Fast functions are looped so that one sample takes at least 0.2 seconds.
+    """
+    func()  # warm up imports and caches
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    samples = timer.repeat(repeat=repeat, number=number)
+    return _stats([sample / number * 1000 for sample in samples])
+
+
+def run(pattern=None, repeat=5):
+    """Run every case whose name contains `pattern`; returns stats per case."""
+    results = {}
+    with replay() as resrobot:
+        for name, setup in CASES.items():
+            if pattern and pattern not in name:
+                continue
+            results[name] = measure(setup(resrobot), repeat)
+            print(f"{name:<40} {results[name]['median_ms']:>10.3f} ms")
+        if not pattern or pattern.startswith("stage"):
+            for name, stats in map_stages(resrobot, repeat).items():
+                results[name] = stats
+                expanded = (
+                    f" {stats['expanded']:>8} expanded" if "expanded" in stats else ""
+                )
+                print(f"{name:<40} {stats['median_ms']:>10.3f} ms{expanded}")
+    return results
+
+
+def git_revision():
+    """Short commit hash of HEAD and whether the work tree has changes."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = bool(
+            subprocess.run(
+                ["git", "status", "--porcelain", "--untracked-files=no"],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", True
+    return commit, dirty
+
+
+def load_history(path=RESULTS_PATH):
+    if not Path(path).exists():
+        return []
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def save_run(results, path=RESULTS_PATH):
+    commit, dirty = git_revision()
+    entry = {
+        "commit": commit,
+        "dirty": dirty,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.node(),
+        "results": results,
+    }
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as file:
+        file.write(json.dumps(entry) + "\n")
+    return entry
+
+
+def find_baseline(history, commit=None, current=None):
+    """The newest saved run for `commit`, or for the newest other commit."""
+    for entry in reversed(history):
+        if commit is not None:
+            if entry["commit"].startswith(commit):
+                return entry
+        elif entry["commit"] != current:
+            return entry
+    return None
+
+
+def compare(results, baseline, ratio=REGRESSION_RATIO):
+    """Print the change per case against `baseline`; return the regressed names."""
+    regressions = []
+    print(f"\nCompared with {baseline['commit']} ({baseline['time']}):")
+    for name, stats in results.items():
+        old = baseline["results"].get(name)
+        if old is None:
+            print(f"  {name:<38} new")
+            continue
+        new_ms, old_ms = stats["median_ms"], old["median_ms"]
+        change = new_ms / old_ms if old_ms else float("inf")
+        flag = ""
+        if change > ratio and new_ms - old_ms > NOISE_FLOOR_MS:
+            regressions.append(name)
+            flag = "  ⚠️ regression"
+        if "expanded" in stats and old.get("expanded"):
+            # Searching more of the graph is a regression even while it is fast.
+            if stats["expanded"] > old["expanded"] * ratio and not flag:
+                regressions.append(name)
+                flag = "  ⚠️ regression"
+            flag = f" [{old['expanded']} → {stats['expanded']} expanded]{flag}"
+        print(
+            f"  {name:<38} {old_ms:>10.3f} → {new_ms:>10.3f} ms ({change:.2f}x){flag}"
+        )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Offline benchmarks of the trip planner hot paths.",
+        epilog="ResRobot, OSRM and Overpass are replayed from benchmarks/fixtures. "
+        "Runs are appended to benchmarks/results/history.jsonl.",
+    )
+    parser.add_argument("-k", dest="pattern", help="only run cases containing this")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", help="commit to compare with (default: last)")
+    parser.add_argument("--ratio", type=float, default=REGRESSION_RATIO)
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument(
+        "--check", action="store_true", help="exit with status 1 on a regression"
+    )
+    args = parser.parse_args(argv)
+
+    history = load_history()
+    results = run(args.pattern, args.repeat)
+    commit, _ = git_revision()
+    baseline = find_baseline(history, args.baseline, current=commit)
+    regressions = compare(results, baseline, args.ratio) if baseline else []
+    if not args.no_save:
+        save_run(results)
+    if args.check and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import streamlit as st
+
+from utils import config
+
+# "batched" draws a list as one virtualized table, "rows" as the old layout
+# with a container, columns and a popover per row.
+RENDER_MODES = ("batched", "rows")
+ROW_HEIGHT = 35
+
+
+def render_mode():
+    """List rendering mode from the LIST_RENDER_MODE setting (default "batched")."""
+    mode = config.get_setting("LIST_RENDER_MODE", "batched")
+    return mode if mode in RENDER_MODES else "batched"
+
+
+def show_batched_list(rows, details, key, height=520, column_config=None):
+    """Render `rows` (a list of dicts, one per line) as a single table.
+
+    The table is virtualized in the browser, so only visible rows are drawn.
+    `details(index)` is called for the selected row only, so detail texts are
+    built on demand instead of for every row on every rerun.
+    """
+    if not rows:
+        return
+    event = st.dataframe(
+        rows,
+        key=key,
+        hide_index=True,
+        use_container_width=True,
+        height=min(height, ROW_HEIGHT * (len(rows) + 1) + 3),
+        on_select="rerun",
+        selection_mode="single-row",
+        column_config=column_config,
+    )
+    selected = event.selection.rows
+    if selected:
+        details(selected[0])
+    else:
+        st.caption("Välj en rad för detaljer.")
@@ -1,15 +1,25 @@
+import logging
 from datetime import datetime
 from pathlib import Path
 
-import pandas as pd
 import streamlit as st
 
 from backend.connect_to_api import ResRobot
+from backend.transport import classify_leg
 from backend.trips import TripPlanner  # Assumes TripPlanner uses ResRobot.trips()
 
 # Import the new search container.
+from frontend.batched_list import render_mode, show_batched_list
+from frontend.reachability import show_reachability
 from frontend.search_container import get_full_search_parameters
-from frontend.timetable_sidebar import show_departure_timetable
+from frontend.timetable_sidebar import route_details, show_departure_timetable
+from utils import config, tracing
+from utils.constants import STOPS_PATH
+from utils.log import configure_logging
+from utils.stop_table import StopTable
+from utils.time_utils import countdowns, durations, parse_datetimes
+
+logger = logging.getLogger(__name__)
 
 # Initialize ResRobot
 resrobot = ResRobot()
@@ -18,12 +28,71 @@ IMAGE_PATH = "frontend/images"
 light_logo = f"{IMAGE_PATH}/Resekollen_logo_700.png"
 dark_logo = f"{IMAGE_PATH}/Resekollen_logo_700_dark.png"
 
+# Seconds a trip search is reused across reruns before ResRobot is asked again.
+TRIP_LIST_TTL = 300
+# Rendered trip maps kept in memory, shared by all sessions.
+MAP_CACHE_ENTRIES = 64
+
+
+@st.cache_resource
+def load_stops(file_path=STOPS_PATH):
+    """Load stop data as a memory-mapped StopTable shared by all sessions."""
+    return StopTable.cached(file_path)
+
+
+@st.cache_resource
+def load_stop_names(file_path=STOPS_PATH):
+    """Stop names for the search selectboxes, built once per process."""
+    return load_stops(file_path).names()
+
+
+@st.cache_resource
+def setup_logging():
+    """Configure logging from the LOG_* settings (once per process)."""
+    configure_logging()
+
 
-@st.cache_data
-def load_stops(file_path="data/stops.txt"):
-    """Load stop data from a local file."""
-    columns = ["stop_id", "stop_name", "stop_lat", "stop_lon", "location_type"]
-    return pd.read_csv(file_path, names=columns, header=0)
+@st.cache_resource
+def install_trace_sinks():
+    """Send spans to a JSONL file and/or the log when configured (once per process)."""
+    if config.get_setting("TRACE_FILE"):
+        tracing.add_sink(tracing.JsonlSink(config.get_setting("TRACE_FILE")))
+    if config.get_setting("TRACE_LOG"):
+        tracing.add_sink(tracing.LogSink())
+
+
+def debug_enabled():
+    """The in-app timing panel is shown with ?debug=1 or the DEBUG_TRACE setting."""
+    return (
+        st.query_params.get("debug") == "1" or config.get_setting("DEBUG_TRACE") == "1"
+    )
+
+
+def show_trace_panel(spans):
+    """Render the spans recorded during this rerun."""
+    with st.expander("🛠 Tidsåtgång (debug)", icon=":material/timer:"):
+        st.dataframe(
+            [
+                {"steg": name, "antal": total["count"], "ms": round(total["total_ms"])}
+                for name, total in spans.summary().items()
+            ],
+            hide_index=True,
+        )
+        st.dataframe(
+            [
+                {
+                    "steg": "· " * record["depth"] + record["name"],
+                    "ms": record["duration_ms"],
+                    **{
+                        key: value
+                        for key, value in record.items()
+                        if key in ("mode", "endpoint", "status", "error")
+                    },
+                }
+                for record in sorted(spans.records, key=lambda r: r["start"])
+            ],
+            hide_index=True,
+        )
 
 
 # ✅ Hook 1: Fetch Trip Data and Create a `TripPlanner` Instance
@@ -33,8 +102,8 @@ def get_trip_planner(start_name, end_name):
         return None
 
     try:
-        start_id = stop_dict[start_name]
-        end_id = stop_dict[end_name]
+        start_id = stop_table.stop_id(start_name)
+        end_id = stop_table.stop_id(end_name)
         trip_planner = TripPlanner(start_id, end_id)
         trip_planner.extract_route_with_transfers()
         return trip_planner
@@ -47,31 +116,16 @@ def set_route(tp, t):
     tp.pick_route_with_transfers(t)
 
 
-def generate_and_display_map(tp):
-    if not tp:
-        st.warning("❌ No trip data available.")
-        return
+def build_map_html(tp):
+    """Plot every leg of `tp.route_legs` and return the map as HTML."""
     tp.initialize_map()
-    for i, (transport_type, stations) in enumerate(tp.route_legs):
-        if transport_type in [
-            "1",
-            "3",
-            "4",
-        ]:  # Fix: Check string, not list in # in ["1", "3", "4"]
-            tp.plot_train_routes(tp.map_route, stations)
-        elif transport_type in ["2", "7"]:  # Includes both long-distance bus and metro
-            tp.plot_road_routes(tp.map_route, stations)
-        elif transport_type == "6":
-            tp.plot_tram_routes(tp.map_route, stations)
-        elif transport_type == "5":
-            tp.plot_subway_routes(tp.map_route, stations)  # ✅ Subway plotting function
-        elif transport_type == "unknown" and i > 0:
-            # 🚨 FIX: Correctly use the last station from the previous leg as the start
-            start = tp.route_legs[i - 1][1][-1][1:3]  # Last stop of previous leg
-            end = stations[-1][1:3]  # Last stop of current leg
-            print(f"🚶 Walking route correctly assigned: Start {start} → End {end}")
-            tp.plot_walking_route(tp.map_route, start, end)
-    map_html = tp.map_route._repr_html_()
+    tp.plot_legs()
+    with tracing.span("map.html"):
+        map_html = tp.map_route._repr_html_()
+    return map_html
+
+
+def show_map_html(map_html):
     styled_html = f"""
     <div style="border: 5px solid #20265A; border-radius: 3px; ">
         {map_html}
@@ -80,15 +134,243 @@ def generate_and_display_map(tp):
     st.components.v1.html(styled_html, height=700)
 
 
-stops_df = load_stops()
-stop_dict = dict(zip(stops_df["stop_name"], stops_df["stop_id"]))
-stops_list = stops_df["stop_name"].to_list()
+def generate_and_display_map(tp):
+    if not tp:
+        st.warning("❌ No trip data available.")
+        return
+    show_map_html(build_map_html(tp))
+
+
+@st.cache_data(ttl=TRIP_LIST_TTL, show_spinner=False)
+def search_trips(start_id, end_id, date, time_val, search_for_arrival):
+    """Trip search result, shared by reruns of the same query."""
+    with tracing.span("search.trips"):
+        return resrobot.trips(
+            origin_id=start_id,
+            destination_id=end_id,
+            date=date,
+            time=time_val,
+            searchForArrival=search_for_arrival,
+        )
+
+
+@st.cache_data(max_entries=MAP_CACHE_ENTRIES, show_spinner=False)
+def trip_map_html(trip):
+    """Map HTML for one trip, built once per trip and shared by all sessions."""
+    legs = trip["LegList"]["Leg"]
+    legs = [legs] if isinstance(legs, dict) else legs
+    tp = TripPlanner(
+        legs[0]["Origin"]["extId"],
+        legs[-1]["Destination"]["extId"],
+        trip_data={"Trip": [trip]},
+    )
+    tp.pick_route_with_transfers(trip)
+    return build_map_html(tp)
+
+
+def trip_summaries(trips, now=None):
+    """What the trip list shows for each trip; the stop-by-stop route is left out.
+
+    Departure and arrival times of the whole list are parsed at once, with
+    their dates, so trips across midnight or on later days get the right wait
+    and travel times.
+    """
+    all_legs = [trip_legs(trip) for trip in trips]
+    departures = parse_datetimes(
+        [legs[0]["Origin"].get("date") for legs in all_legs],
+        [legs[0]["Origin"].get("time") for legs in all_legs],
+    )
+    arrivals = parse_datetimes(
+        [legs[-1]["Destination"].get("date") for legs in all_legs],
+        [legs[-1]["Destination"].get("time") for legs in all_legs],
+    )
+    return [
+        trip_summary(legs, wait, travel)
+        for legs, wait, travel in zip(
+            all_legs, countdowns(departures, now), durations(departures, arrivals)
+        )
+    ]
+
+
+def trip_legs(trip):
+    legs = trip["LegList"]["Leg"]
+    if isinstance(legs, dict):  # Handle single-leg trips
+        legs = [legs]
+    return legs
+
+
+def trip_summary(legs, wait, travel):
+    changes = len(legs) - 1
+    stops = []
+    for leg in legs:
+        if "Stops" in leg:
+            stops += leg["Stops"]["Stop"]
+
+    transport_name = legs[0]["Product"][0].get("name", "")
+    transport_number = legs[0]["Product"][0].get(
+        "num", legs[0]["Product"][0].get("name", "N/A")
+    )
+    transport_icon = classify_leg(legs[0]).icon
+    return {
+        "transport_name": transport_name,
+        "transport_icon": transport_icon,
+        "transport_number": transport_number,
+        "departure_time": legs[0]["Origin"]["time"],
+        "arrival_time": legs[-1]["Destination"]["time"],
+        "wait": wait,
+        "travel": travel,
+        "stops": stops,
+        "changes": changes,
+    }
+
+
+def show_trip_details(trip, summary, end_name, button_key):
+    """Popover/detail content of one trip, with the button that selects it."""
+    route_detailed = route_details(summary["stops"])
+    st.header("Resedetaljer")
+    st.write(f"{summary['transport_icon']} {summary['transport_name']} mot {end_name}")
+    st.markdown(route_detailed)
+    if st.button("Välj resa", key=f"{button_key}"):
+        st.session_state.selected_map = trip
+        st.session_state.selected_trip = {
+            key: summary[key]
+            for key in (
+                "transport_name",
+                "transport_icon",
+                "transport_number",
+                "departure_time",
+                "arrival_time",
+                "stops",
+                "changes",
+            )
+        }
+        st.session_state.selected_trip["route"] = route_detailed
+        # The card and the map live outside this fragment.
+        st.rerun()
+
+
+def show_trip_rows(trips, summaries, end_name):
+    """The per-row layout: a container, four columns and a popover per trip."""
+    sidecol1, sidecol2, sidecol3, sidecol4 = st.columns(4, vertical_alignment="top")
+    sidecol1.markdown(
+        '<div style="text-align: right; margin-bottom: 15px; margin-right: 10px">Linje</div>',
+        unsafe_allow_html=True,
+    )
+    sidecol2.markdown(
+        '<div style="text-align: right; margin-bottom: 15px; margin-right: 10px">Avgår om</div>',
+        unsafe_allow_html=True,
+    )
+    sidecol3.markdown(
+        '<div style="text-align: right; margin-bottom: 15px; margin-right: 10px">Restid</div>',
+        unsafe_allow_html=True,
+    )
+    sidecol4.markdown("<div style='height: 35px'></div>", unsafe_allow_html=True)
+    for button_key, (trip, summary) in enumerate(zip(trips, summaries)):
+        cont = st.container(border=True)
+        tempcol1, tempcol2, tempcol3, tempcol4 = cont.columns(
+            [0.3, 0.2, 0.3, 0.2], vertical_alignment="center"
+        )
+        tempcol1.markdown(
+            f'<div style="margin-bottom: 15px; overflow: hidden; text-overflow: ellipsis; white-space: nowrap; ">{summary["transport_icon"]} {summary["transport_number"]}</div>',  # noqa: E501
+            unsafe_allow_html=True,
+        )
+        tempcol2.markdown(
+            f'<div style="text-align: right; margin-bottom: 15px; margin-right: 10px">{summary["wait"]}</div>',
+            unsafe_allow_html=True,
+        )
+        tempcol3.markdown(
+            f'<div style="text-align: right; margin-bottom: 15px; margin-right: 10px">⏳ {summary["travel"]}</div>',  # noqa: E501
+            unsafe_allow_html=True,
+        )
+        with tempcol4.popover("", icon=":material/info:"):
+            show_trip_details(trip, summary, end_name, button_key)
+
+
+@st.fragment
+def show_trip_list(trip_data, end_name):
+    """Trip alternatives for the sidebar, rerun on its own.
+
+    Choosing a trip stores it in the session and reruns the app so the card
+    and map fragments pick it up; their inputs come from the caches.
+    """
+    trips = trip_data.get("Trip", [])
+    summaries = trip_summaries(trips)
+    if render_mode() == "rows":
+        show_trip_rows(trips, summaries, end_name)
+        return
+    show_batched_list(
+        [
+            {
+                "Linje": f"{summary['transport_icon']} {summary['transport_number']}",
+                "Avgår om": summary["wait"],
+                "Restid": f"⏳ {summary['travel']}",
+                "Byten": summary["changes"],
+            }
+            for summary in summaries
+        ],
+        details=lambda index: show_trip_details(
+            trips[index], summaries[index], end_name, index
+        ),
+        key="trip_list",
+    )
+
+
+@st.fragment
+def show_selected_trip(end_name):
+    """Card with the details of the chosen trip."""
+    selected = st.session_state.selected_trip
+
+    with st.container(border=True):
+        st.subheader(f"📌 {selected['transport_name']} mot {end_name}")
+
+        st.divider()  # Adds separation
+        st.write(
+            f"⏳ Avgång: {selected['departure_time']} | 🏁 Ankomst: {selected['arrival_time']}"
+        )
+
+        st.write(f"Antal stop: {len(selected['stops']) -1}")
+        st.write(f"Antal byten: {selected['changes']}")
+
+        list_of_stops = [stop["name"].split(" (")[0] for stop in selected["stops"]]
+
+        with st.popover("Visa alla stop"):
+            st.write(f"{stop}  \n" for stop in list_of_stops)
+
+    # Reset button to clear the selection
+    if st.button("❌ Avbryt vald resa"):
+        st.session_state.start_name = ""
+        st.session_state.end_name = ""
+        st.session_state.selected_trip = None
+        st.session_state.selected_map = None
+        st.rerun()
+
+
+@st.fragment
+def show_trip_map(trip):
+    """Map of the chosen trip."""
+    with tracing.span("map"):
+        show_map_html(trip_map_html(trip))
+
+
+stop_table = load_stops()
+stops_list = load_stop_names()
 
 
 img_path = Path(__file__).parent / "images"
 
 
 def main():
+    setup_logging()
+    install_trace_sinks()
+    if not debug_enabled():
+        render()
+        return
+    with tracing.capture() as spans:
+        render()
+    show_trace_panel(spans)
+
+
+def render():
 
     st.html(
         """
@@ -153,14 +435,15 @@ def main():
 
     if start_name and not end_name:
         # **Show departure timetable if only start is selected**
-        show_departure_timetable(resrobot, stops_df, start_name)
+        show_departure_timetable(resrobot, stop_table, start_name)
+        show_reachability(stop_table, start_name, date, dep_time)
     elif start_name and end_name:
         # **Hide departures and show trip details**
         st.sidebar.subheader(f"Resor från {start_name} → {end_name}")
 
         try:
-            start_id = stop_dict[start_name]
-            end_id = stop_dict[end_name]
+            start_id = stop_table.stop_id(start_name)
+            end_id = stop_table.stop_id(end_name)
 
             # Decide which time constraint to use for the API call.
             # In this example, if both are provided, we assume the user wants:
@@ -193,175 +476,22 @@ def main():
                 time_val = datetime.now().strftime("%H:%M")
                 search_for_arrival = 0
 
-            # Create a TripPlanner instance and query for trips.
-            trip_planner = TripPlanner(start_id, end_id)
-            trip_planner.trip_data = trip_planner.resrobot.trips(
-                origin_id=start_id,
-                destination_id=end_id,
-                date=date,
-                time=time_val,
-                searchForArrival=search_for_arrival,
+            trip_data = search_trips(
+                start_id, end_id, date, time_val, search_for_arrival
             )
-            # trip_planner.extract_route_with_transfers()
 
-            if trip_planner:
-                sidecol1, sidecol2, sidecol3, sidecol4 = st.sidebar.columns(
-                    4, vertical_alignment="top"
-                )
-                sidecol1.markdown(
-                    '<div style="text-align: right; margin-bottom: 15px; margin-right: 10px">Linje</div>',
-                    unsafe_allow_html=True,
-                )
-                sidecol2.markdown(
-                    '<div style="text-align: right; margin-bottom: 15px; margin-right: 10px">Avgår om</div>',
-                    unsafe_allow_html=True,
-                )
-                sidecol3.markdown(
-                    '<div style="text-align: right; margin-bottom: 15px; margin-right: 10px">Restid</div>',
-                    unsafe_allow_html=True,
-                )
-                sidecol4.markdown(
-                    "<div style='height: 35px'></div>", unsafe_allow_html=True
-                )
-                cur_time = datetime.now()
-                button_key = 0
-                for trip in trip_planner.trip_data.get("Trip", []):
-                    legs = trip["LegList"]["Leg"]
-                    changes = len(legs) - 1
-                    if isinstance(legs, dict):  # Handle single-leg trips
-                        legs = [legs]
-                    stops = []
-                    for leg in legs:
-                        if "Stops" in leg:
-                            stops += leg["Stops"]["Stop"]
-
-                    route_detailed = " ➔ ".join(
-                        [
-                            stop["name"].split(" (")[0]
-                            + ": "
-                            + stop.get("depTime", stop.get("arrTime", "N/A"))
-                            for stop in stops
-                        ]
-                    )
-
-                    # Extract trip details
-                    departure_time = legs[0]["Origin"]["time"]
-                    arrival_time = legs[-1]["Destination"]["time"]
-                    t1 = datetime.strptime(departure_time, "%H:%M:%S")
-                    t2 = datetime.strptime(arrival_time, "%H:%M:%S")
-
-                    travel_time = t2 - t1
-
-                    if t1 < cur_time:
-                        wait_time = t1 - cur_time
-
-                        hours, minutes = (
-                            wait_time.seconds // 3600,
-                            wait_time.seconds // 60 % 60,
-                        )
-                    else:
-                        hours, minutes = 0, 0
-
-                    if (hours, minutes) == (0, 0):
-                        wait = "Nu"
-                    elif hours == 0:
-                        wait = f"{minutes}m"
-                    else:
-                        wait = f"{hours}h{minutes}m"
-
-                    hours, minutes = (
-                        travel_time.seconds // 3600,
-                        travel_time.seconds // 60 % 60,
-                    )
-                    transport_name = legs[0]["Product"][0].get("name", "")
-                    transport_number = legs[0]["Product"][0].get(
-                        "num", legs[0]["Product"][0].get("name", "N/A")
-                    )
-                    transport_icon = "N/A"
-                    icons = ["🚆", "🚍", "🚊", "🚇", "🚶", "🚄", "🚄"]
-                    transport_types = [
-                        "Tåg",
-                        "Buss",
-                        "Spårväg",
-                        "Tunnelbana",
-                        "Promenad",
-                        "Snabbtåg",
-                        "Express",
-                    ]
-                    for i, t in zip(icons, transport_types):
-                        if t in transport_name:
-                            transport_icon = i
-
-                    cont = st.sidebar.container(border=True)
-                    tempcol1, tempcol2, tempcol3, tempcol4 = cont.columns(
-                        [0.3, 0.2, 0.3, 0.2], vertical_alignment="center"
-                    )
-                    tempcol1.markdown(
-                        f'<div style="margin-bottom: 15px; overflow: hidden; text-overflow: ellipsis; white-space: nowrap; ">{transport_icon} {transport_number}</div>',  # noqa: E501
-                        unsafe_allow_html=True,
-                    )
-                    tempcol2.markdown(
-                        f'<div style="text-align: right; margin-bottom: 15px; margin-right: 10px">{wait}</div>',
-                        unsafe_allow_html=True,
-                    )
-                    tempcol3.markdown(
-                        f'<div style="text-align: right; margin-bottom: 15px; margin-right: 10px">⏳ {hours}h{minutes}m</div>',  # noqa: E501
-                        unsafe_allow_html=True,
-                    )
-                    with tempcol4.popover("", icon=":material/info:"):
-                        st.header("Resedetaljer")
-                        st.write(f"{transport_icon} {transport_name} mot {end_name}")
-                        st.markdown(route_detailed)
-                        if st.button("Välj resa", key=f"{button_key}"):
-                            st.session_state.selected_map = trip
-                            # trip_planner.pick_route_with_transfers(trip)
-                            st.session_state.selected_trip = {
-                                "transport_name": transport_name,
-                                "transport_icon": transport_icon,
-                                "transport_number": transport_number,
-                                "departure_time": departure_time,
-                                "arrival_time": arrival_time,
-                                "route": route_detailed,
-                                "stops": stops,
-                                "changes": changes,
-                            }
-                    button_key += 1
+            if trip_data and trip_data.get("Trip"):
+                with st.sidebar:
+                    show_trip_list(trip_data, end_name)
             else:
                 st.sidebar.warning("No valid trips found.")
             if "selected_trip" in st.session_state and st.session_state.selected_trip:
-                trip_planner.pick_route_with_transfers(st.session_state.selected_map)
-                selected = st.session_state.selected_trip
-
-                with st.container(border=True):
-                    st.subheader(f"📌 {selected['transport_name']} mot {end_name}")
-
-                    st.divider()  # Adds separation
-                    st.write(
-                        f"⏳ Avgång: {selected['departure_time']} | 🏁 Ankomst: {selected['arrival_time']}"
-                    )
-
-                    st.write(f"Antal stop: {len(selected['stops']) -1}")
-                    st.write(f"Antal byten: {selected['changes']}")
-
-                    list_of_stops = [
-                        stop["name"].split(" (")[0] for stop in selected["stops"]
-                    ]
-
-                    with st.popover("Visa alla stop"):
-                        st.write(f"{stop}  \n" for stop in list_of_stops)
-
-                # Reset button to clear the selection
-                if st.button("❌ Avbryt vald resa"):
-                    st.session_state.start_name = ""
-                    st.session_state.end_name = ""
-                    st.session_state.selected_trip = None
-                    st.session_state.selected_map = None
-                    st.rerun()
+                show_selected_trip(end_name)
                 with st.spinner("Planerar rutt..."):
                     with st.expander(
                         "Visa på karta", icon=":material/map:", expanded=True
                     ):
-                        generate_and_display_map(trip_planner)
+                        show_trip_map(st.session_state.selected_map)
 
         except KeyError:
             st.sidebar.error("Error: Could not find stop IDs. Please check stop names.")
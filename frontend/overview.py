@@ -1,20 +1,8 @@
-from datetime import datetime
-
 import streamlit as st
 
 from backend.connect_to_api import ResRobot
-
-# **Mapping Transport catCode to Icons**
-TRANSPORT_ICONS = {
-    "1": "🚆",  # Train
-    "2": "🚍",  # Long-distance bus
-    "3": "🚆",  # Train
-    "4": "🚆",  # Train
-    "5": "🚇",  # Subway/Metro
-    "6": "🚊",  # Tram
-    "7": "🚍",  # Bus
-    "unknown": "❓",  # Default for unknown transport types
-}
+from backend.transport import classify_leg
+from utils.time_utils import durations, parse_datetimes
 
 
 def show_trip_details(
@@ -47,18 +35,17 @@ def show_trip_details(
     departure_time = trip["LegList"]["Leg"][0]["Origin"]["time"]
     arrival_time = trip["LegList"]["Leg"][-1]["Destination"]["time"]
 
-    # Convert times for calculations
-    dep_time_obj = datetime.strptime(departure_time, "%H:%M:%S")
-    arr_time_obj = datetime.strptime(arrival_time, "%H:%M:%S")
-    travel_duration = arr_time_obj - dep_time_obj
+    # Dates included, so trips across midnight get the right duration
+    legs = trip["LegList"]["Leg"]
+    times = parse_datetimes(
+        [legs[0]["Origin"].get("date"), legs[-1]["Destination"].get("date")],
+        [departure_time, arrival_time],
+    )
+    travel_duration = durations(times[:1], times[1:])[0]
 
-    # Extract transport type using catCode
     leg = trip["LegList"]["Leg"][0]  # First leg of the journey
-    transport_type = leg.get("Product", [{}])[0].get("catCode", "unknown")
     transport_number = leg.get("Product", [{}])[0].get("num", "N/A")  # Reintroduced
-
-    # **Determine Transport Icon using catCode**
-    transport_icon = TRANSPORT_ICONS.get(str(transport_type), "❓")
+    transport_icon = classify_leg(leg).icon
 
     # UI Layout
     with st.container(border=True):
@@ -0,0 +1,66 @@
+import logging
+from datetime import datetime
+
+import streamlit as st
+
+from backend import isochrone
+from backend.timetable import Timetable
+
+logger = logging.getLogger(__name__)
+
+REACH_MINUTES = (10, 15, 20, 30, 45, 60)
+# Rendered reachability maps kept in memory, shared by all sessions.
+REACH_CACHE_ENTRIES = 64
+
+
+@st.cache_resource(show_spinner=False)
+def load_timetable(day):
+    """Memory-mapped local timetable of `day` (YYYYMMDD), or None if not built."""
+    return Timetable.for_date(day)
+
+
+@st.cache_data(max_entries=REACH_CACHE_ENTRIES, show_spinner=False)
+def reach_map_html(day, stop_id, origin, departure, minutes):
+    """Heat map HTML and station count reachable from `stop_id` within `minutes`."""
+    reach = isochrone.reachable(load_timetable(day), stop_id, departure, minutes)
+    map_obj = isochrone.isochrone_map(reach, origin, departure, minutes)
+    return map_obj._repr_html_(), len(reach.stop_ids)
+
+
+def show_reachability(stop_table, start_name, date, departure_time=None):
+    """Expander with where one can get from `start_name` within a chosen time.
+
+    Computed on the local timetable (see backend/timetable.py), so it costs no
+    ResRobot calls; hidden when no timetable is built for `date`.
+    """
+    departure = departure_time or datetime.combine(
+        datetime.strptime(date, "%Y-%m-%d").date(), datetime.now().time()
+    )
+    day = departure.strftime("%Y%m%d")
+    if load_timetable(day) is None:
+        logger.debug("🗺️ No local timetable for %s", day)
+        return
+
+    with st.expander("Hur långt når jag?", icon=":material/travel_explore:"):
+        minutes = st.select_slider(
+            "Restid",
+            options=REACH_MINUTES,
+            value=30,
+            format_func=lambda m: f"{m} min",
+            key="reach_minutes",
+        )
+        stop_id = stop_table.stop_id(start_name)
+        origin = stop_table.coordinates(stop_id)
+        try:
+            map_html, count = reach_map_html(
+                day,
+                stop_id,
+                origin,
+                departure.replace(second=0, microsecond=0),
+                minutes,
+            )
+        except KeyError:
+            st.info("Hållplatsen saknas i den lokala tidtabellen.")
+            return
+        st.caption(f"{count} hållplatser inom {minutes} min från {departure:%H:%M}")
+        st.components.v1.html(map_html, height=600)
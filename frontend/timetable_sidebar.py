@@ -1,36 +1,276 @@
+import html
+import logging
 import re
 from datetime import datetime, timedelta
 
 import streamlit as st
 
+from backend.departure_board import departure_times, diff_boards, index_board
+from backend.transport import classify_product
+from frontend.batched_list import render_mode, show_batched_list
+from utils.time_utils import countdowns, epoch_seconds
+
+# Seconds an already fetched departure board may be shown while it is refreshed.
+DEPARTURE_MAX_STALENESS = 300
+# Seconds between polls of the live board. Upstream requests are still limited
+# by ResRobot.departure_boards.refresh_after, shared by all sessions.
+LIVE_BOARD_INTERVAL = 15
+LIVE_BOARD_HEIGHT = 520
+
+# Ticks the "Avgår om" cells every second and drops departed rows, so the
+# countdown moves without a rerun.
+LIVE_BOARD_SCRIPT = """
+<script>
+function tick() {
+  const now = Date.now();
+  document.querySelectorAll("tr[data-departs]").forEach((row) => {
+    const left = Math.floor((Number(row.dataset.departs) - now) / 60000);
+    if (left < 0) { row.remove(); return; }
+    const cell = row.querySelector(".countdown");
+    cell.textContent = left === 0 ? "Nu"
+      : left < 60 ? `${left}m` : `${Math.floor(left / 60)}h${left % 60}m`;
+  });
+}
+tick();
+setInterval(tick, 1000);
+</script>
+"""
+LIVE_BOARD_STYLE = """
+<style>
+table { width: 100%; border-collapse: collapse; font-family: sans-serif; font-size: 14px; }
+th, td { padding: 6px 8px; border-bottom: 1px solid #e6e6e6; text-align: left; }
+td.countdown, th.countdown { text-align: right; }
+.delayed { color: #d33; }
+</style>
+"""
+
+logger = logging.getLogger(__name__)
+
 
 def clean_location_name(location):
     """Remove unnecessary suffixes like (Uddevalla kn)."""
     return re.sub(r"\s*\(.*?\)", "", location)
 
 
-def show_departure_timetable(resrobot, stops_df, start_name, end_name=None):
+def format_board_age(age_seconds):
+    """Human readable age of a departure board, e.g. "45 s" or "3 min"."""
+    if age_seconds < 60:
+        return f"{int(age_seconds)} s"
+    return f"{int(age_seconds // 60)} min"
+
+
+def route_details(stops):
+    """Passlist as one line: "Stop: 12:05:00 ➔ Next stop: 12:09:00 ➔ ..."."""
+    return " ➔ ".join(
+        [
+            stop["name"].split(" (")[0]
+            + ": "
+            + stop.get("depTime", stop.get("arrTime", "N/A"))
+            for stop in stops
+        ]
+    )
+
+
+def departure_rows(departures, now=None):
+    """Line, destination and countdown of each departure, without passlists."""
+    waits = countdowns(departure_times(departures), now)
+    return [departure_row(dep, wait) for dep, wait in zip(departures, waits)]
+
+
+def departure_row(dep, wait):
+    transport_number = dep.get("ProductAtStop", {}).get(
+        "num", dep.get("ProductAtStop", {}).get("name", "N/A")
+    )
+    departure_time = dep.get("time", "N/A")
+    final_destination = clean_location_name(dep.get("direction", "Unknown"))
+
+    transport_icon = classify_product(dep.get("ProductAtStop")).icon
+    return {
+        "Linje": f"{transport_icon} {transport_number}",
+        "Mot": final_destination,
+        "Avgår": departure_time[:5],
+        "Avgår om": wait,
+    }
+
+
+def show_departure_details(dep, row):
+    st.markdown("**Resedetaljer**")
+    st.write(f"{row['Linje']} mot {row['Mot']}")
+    st.markdown(route_details(dep.get("Stops", {}).get("Stop", [])))
+
+
+@st.fragment
+def show_departure_list(departures):
+    """All departures as one table; the passlist is built for the selected row only."""
+    rows = departure_rows(departures)
+    show_batched_list(
+        rows,
+        details=lambda index: show_departure_details(departures[index], rows[index]),
+        key="departure_list",
+    )
+
+
+def live_row_html(dep, row, departs_at):
+    """One <tr> of the live board; the countdown cell is filled in by the browser.
+
+    `departs_at` is the expected departure as a Unix timestamp.
+    """
+    delayed = dep.get("rtTime") and dep["rtTime"] != dep.get("time")
+    expected = (dep.get("rtTime") or dep.get("time", "N/A"))[:5]
+    planned = f" <s>{dep['time'][:5]}</s>" if delayed else ""
+    return (
+        f'<tr data-departs="{int(departs_at * 1000)}">'
+        f"<td>{html.escape(row['Linje'])}</td>"
+        f"<td>{html.escape(row['Mot'])}</td>"
+        f'<td class="{"delayed" if delayed else ""}">{expected}{planned}</td>'
+        '<td class="countdown"></td></tr>'
+    )
+
+
+def update_live_board(state, board):
+    """Apply a freshly fetched board to the per-session live board `state`.
+
+    Only rows that were added or changed are rebuilt; departed ones are
+    dropped. Returns the BoardDiff.
+    """
+    new = index_board(board)
+    diff = diff_boards(state.get("board", {}), new)
+    rows = state.setdefault("rows", {})
+    for key in diff.removed:
+        rows.pop(key, None)
+    redraw = diff.added + diff.changed
+    departures = [new[key] for key in redraw]
+    departs_at = epoch_seconds(departure_times(departures))
+    for key, dep, row, at in zip(
+        redraw, departures, departure_rows(departures), departs_at.tolist()
+    ):
+        rows[key] = live_row_html(dep, row, at)
+    state["board"] = new
+    return diff
+
+
+@st.fragment(run_every=LIVE_BOARD_INTERVAL)
+def show_live_board(resrobot, start_id, max_staleness=DEPARTURE_MAX_STALENESS):
+    """Departure board that re-polls on its own and only redraws changed rows."""
+    state = st.session_state.get("live_board")
+    if state is None or state.get("stop") != start_id:
+        state = st.session_state["live_board"] = {"stop": start_id}
+    board, board_age = resrobot.cached_timetable_departure(
+        location_id=start_id, max_staleness=max_staleness
+    )
+    diff = update_live_board(state, board)
+    if any(diff):
+        logger.debug(
+            "🔄 Live board %s: %d added, %d changed, %d removed",
+            start_id,
+            len(diff.added),
+            len(diff.changed),
+            len(diff.removed),
+        )
+    if board_age >= 1:
+        st.caption(f"Uppdaterad för {format_board_age(board_age)} sedan")
+    if not state["board"]:
+        st.info("Inga fler avgångar.")
+        return
+    # Same markup as long as nothing changed, so the browser keeps the iframe
+    # and its ticking countdowns instead of reloading it.
+    table = "".join(state["rows"][key] for key in state["board"])
+    st.components.v1.html(
+        LIVE_BOARD_STYLE
+        + "<table><tr><th>Linje</th><th>Mot</th><th>Avgår</th>"
+        + '<th class="countdown">Avgår om</th></tr>'
+        + table
+        + "</table>"
+        + LIVE_BOARD_SCRIPT,
+        height=min(LIVE_BOARD_HEIGHT, 36 * (len(state["board"]) + 1) + 10),
+        scrolling=True,
+    )
+
+
+def show_departure_rows(departures):
+    """The per-row layout: a container, three columns and a popover per departure."""
+    (
+        sidecol1,
+        sidecol2,
+        sidecol3,
+    ) = st.sidebar.columns([0.2, 0.52, 0.28], vertical_alignment="top")
+    sidecol1.markdown(
+        '<div style="text-align: right; margin-bottom: 15px; margin-right: 10px">Linje</div>',
+        unsafe_allow_html=True,
+    )
+    sidecol2.markdown(
+        '<div style="text-align: right; margin-bottom: 15px; margin-right: 10px">Avgår om</div>',
+        unsafe_allow_html=True,
+    )
+    sidecol3.markdown("<div style='height: 35px'></div>", unsafe_allow_html=True)
+    table_cont = st.sidebar.container(height=520, border=False)
+    for dep, row in zip(departures, departure_rows(departures)):
+        route_detailed = route_details(dep["Stops"]["Stop"])
+        st.markdown(
+            """
+        <style>
+        .st-emotion-cache-qcpnpn {
+        margin-right: 10px;
+        </style>
+        """,
+            unsafe_allow_html=True,
+        )
+        cont = table_cont.container(border=True)
+        tempcol1, tempcol2, tempcol3 = cont.columns(
+            [0.4, 0.4, 0.2], vertical_alignment="center"
+        )
+        tempcol1.markdown(row["Linje"], unsafe_allow_html=True)
+        tempcol2.markdown(
+            f'<div style="text-align: right; margin-bottom: 15px; margin-right: 10px">{row["Avgår om"]}</div>',
+            unsafe_allow_html=True,
+        )
+        with tempcol3.popover("", icon=":material/info:"):
+            st.header("Resedetaljer")
+            st.write(f"{row['Linje']} mot {row['Mot']}")
+            st.markdown(route_detailed)
+
+
+def show_departure_timetable(
+    resrobot,
+    stop_table,
+    start_name,
+    end_name=None,
+    max_staleness=DEPARTURE_MAX_STALENESS,
+):
     """
     Display the departure timetable in the Streamlit sidebar.
 
     - If only `start_name` is provided: Show `timetable_departure()`.
     - If `end_name` is also provided: **Hide departures** and show full trip details.
+
+    The board is served stale-while-revalidate: the last board for the stop is
+    shown at once together with its age (if younger than `max_staleness`
+    seconds) while a fresh one is fetched in the background. With
+    "Uppdatera automatiskt" switched on the board polls itself every
+    LIVE_BOARD_INTERVAL seconds instead (see `show_live_board`).
     """
 
     if not start_name:
         return  # Exit if no start station is selected
 
-    # Retrieve stop_id from stops_df
-    start_row = stops_df[stops_df["stop_name"] == start_name]
-    if start_row.empty:
+    # Retrieve stop_id from the stop table
+    try:
+        start_id = stop_table.stop_id(start_name)
+    except KeyError:
         st.sidebar.error("Error: Selected start stop not found in dataset.")
         return
 
-    start_id = start_row.iloc[0]["stop_id"]  # Extract start stop_id
-
     # **CASE 1: Show departures if only the start point is selected**
     if not end_name:
-        departures_data = resrobot.timetable_departure(location_id=start_id)
+        if st.sidebar.toggle("Uppdatera automatiskt", key="live_board_enabled"):
+            st.sidebar.subheader(f"Resor från {start_name}")
+            with st.sidebar:
+                show_live_board(resrobot, start_id, max_staleness)
+            return
+
+        departures_data, board_age = resrobot.cached_timetable_departure(
+            location_id=start_id, max_staleness=max_staleness
+        )
         departures = (
             departures_data.get("Departure", [])
             if isinstance(departures_data, dict)
@@ -39,97 +279,13 @@ def show_departure_timetable(resrobot, stops_df, start_name, end_name=None):
         st.sidebar.subheader(
             f"Resor från {start_name}\n{format(datetime.now(), '%H:%M:%S')} - {format(datetime.now() + timedelta(hours=1), '%H:%M:%S')}"  # noqa: E501
         )
-        (
-            sidecol1,
-            sidecol2,
-            sidecol3,
-        ) = st.sidebar.columns([0.2, 0.52, 0.28], vertical_alignment="top")
-        sidecol1.markdown(
-            '<div style="text-align: right; margin-bottom: 15px; margin-right: 10px">Linje</div>',
-            unsafe_allow_html=True,
-        )
-        sidecol2.markdown(
-            '<div style="text-align: right; margin-bottom: 15px; margin-right: 10px">Avgår om</div>',
-            unsafe_allow_html=True,
-        )
-        sidecol3.markdown("<div style='height: 35px'></div>", unsafe_allow_html=True)
-        table_cont = st.sidebar.container(height=520, border=False)
-        for dep in departures:
-            transport_number = dep.get("ProductAtStop", {}).get(
-                "num", dep.get("ProductAtStop", {}).get("name", "N/A")
-            )
-            departure_time = dep.get("time", "N/A")
-            final_destination = clean_location_name(dep.get("direction", "Unknown"))
-            stops = dep["Stops"]["Stop"]
-
-            route_detailed = " ➔ ".join(
-                [
-                    stop["name"].split(" (")[0]
-                    + ": "
-                    + stop.get("depTime", stop.get("arrTime", "N/A"))
-                    for stop in stops
-                ]
-            )
-
-            t1 = datetime.strptime(departure_time, "%H:%M:%S")
-            cur_time = datetime.now()
-
-            if t1 < cur_time:
-                wait_time = t1 - cur_time
-
-                hours, minutes = (
-                    wait_time.seconds // 3600,
-                    wait_time.seconds // 60 % 60,
-                )
-            else:
-                hours, minutes = 0, 0
-
-            if (hours, minutes) == (0, 0) or (hours, minutes) == (23, 59):
-                wait = "Nu"
-            elif hours == 0:
-                wait = f"{minutes}m"
-            else:
-                wait = f"{hours}h{minutes}m"
-
-            transport_name = dep.get("ProductAtStop", {}).get("name", "N/A")
-            transport_icon = "N/A"
-            icons = ["🚆", "🚍", "🚊", "🚇", "🚶", "🚄", "🚄"]
-            transport_types = [
-                "Tåg",
-                "Buss",
-                "Spårväg",
-                "Tunnelbana",
-                "Promenad",
-                "Snabbtåg",
-                "Express",
-            ]
-            for i, t in zip(icons, transport_types):
-                if t in transport_name:
-                    transport_icon = i
-            st.markdown(
-                """
-            <style>
-            .st-emotion-cache-qcpnpn {
-            margin-right: 10px;
-            </style>
-            """,
-                unsafe_allow_html=True,
-            )
-            cont = table_cont.container(border=True)
-            tempcol1, tempcol2, tempcol3 = cont.columns(
-                [0.4, 0.4, 0.2], vertical_alignment="center"
-            )
-            tempcol1.markdown(
-                f"{transport_icon} {transport_number}", unsafe_allow_html=True
-            )
-            tempcol2.markdown(
-                f'<div style="text-align: right; margin-bottom: 15px; margin-right: 10px">{wait}</div>',
-                unsafe_allow_html=True,
-            )
-            with tempcol3.popover("", icon=":material/info:"):
-                st.header("Resedetaljer")
-                st.write(f"{transport_icon} {transport_number} mot {final_destination}")
-                st.markdown(route_detailed)
+        if board_age >= 1:
+            st.sidebar.caption(f"Uppdaterad för {format_board_age(board_age)} sedan")
+        if render_mode() == "rows":
+            show_departure_rows(departures)
+        else:
+            with st.sidebar:
+                show_departure_list(departures)
 
         return  # Stop execution here if no end stop selected
 
@@ -25,5 +25,10 @@ setup(
     packages=find_packages(
         include=("backend", "frontend", "utils"), exclude=("test", "explorations")
     ),
-    entry_points={"console_scripts": ["dashboard = utils.run_dashboard:run_dashboard"]},
+    entry_points={
+        "console_scripts": [
+            "dashboard = utils.run_dashboard:run_dashboard",
+            "batch-trips = backend.batch:main",
+        ]
+    },
 )
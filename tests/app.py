@@ -5,6 +5,7 @@ import streamlit as st
 
 # Import backend classes and functions.
 from backend.connect_to_api import ResRobot
+from backend.transport import MODES, WALK
 from backend.trips import TripPlanner  # Assumes TripPlanner uses ResRobot.trips()
 
 # Import the new search container.
@@ -124,19 +125,19 @@ elif start_name and end_name:
                     st.warning("❌ No trip data available.")
                     return
                 tp.initialize_map()
-                for transport_type, stations in tp.route_legs:
-                    if transport_type == "4":
-                        tp.plot_train_routes(stations)
-                    elif transport_type in ["2", "7"]:
-                        tp.plot_road_routes(stations)
-                    elif transport_type == "3":
-                        tp.plot_long_distance_train_routes(stations)
-                    elif transport_type == "6":
-                        tp.plot_tram_routes(stations)
-                    elif transport_type == "5":
-                        tp.plot_subway_routes(stations)
-                    elif transport_type == "unknown":
-                        tp.plot_walking_route(stations[0][1:3], stations[-1][1:3])
+                for mode, stations in tp.route_legs:
+                    if mode in (MODES["1"], MODES["3"], MODES["4"]):
+                        tp.plot_train_routes(tp.map_route, stations)
+                    elif mode in (MODES["2"], MODES["7"]):
+                        tp.plot_road_routes(tp.map_route, stations)
+                    elif mode == MODES["6"]:
+                        tp.plot_tram_routes(tp.map_route, stations)
+                    elif mode == MODES["5"]:
+                        tp.plot_subway_routes(tp.map_route, stations)
+                    elif mode == WALK:
+                        tp.plot_walking_route(
+                            tp.map_route, stations[0][1:3], stations[-1][1:3]
+                        )
                 st.components.v1.html(tp.map_route._repr_html_(), height=700)
 
             generate_and_display_map(trip_planner)
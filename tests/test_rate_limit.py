@@ -0,0 +1,37 @@
+import pytest
+
+from backend.rate_limit import RateLimiter, RateLimitExceeded
+
+
+def refused_key_keeps_endpoint_token(limiter):
+    limiter.acquire("API_KEY", "trip")
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire("API_KEY", "trip")
+    # The key bucket refused the second call, so its endpoint token is back.
+    assert limiter.bucket("API_KEY", "trip").try_acquire() == 0
+    assert limiter.bucket("API_KEY", "trip").try_acquire() > 0
+
+
+def make_limiter(store_path=None):
+    return RateLimiter(
+        rate_per_minute=0.01,
+        burst=1,
+        limits={("API_KEY", "trip"): (0.01, 2)},
+        store_path=store_path,
+        block=False,
+    )
+
+
+def test_refused_call_keeps_endpoint_token():
+    refused_key_keeps_endpoint_token(make_limiter())
+
+
+def test_refused_call_keeps_endpoint_token_sqlite(tmp_path):
+    refused_key_keeps_endpoint_token(make_limiter(tmp_path / "limits.sqlite"))
+
+
+def test_other_endpoints_share_the_key_bucket():
+    limiter = make_limiter()
+    limiter.acquire("API_KEY", "trip")
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire("API_KEY", "location.name")
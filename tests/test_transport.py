@@ -0,0 +1,25 @@
+from backend.transport import MODES, UNKNOWN, WALK, classify_leg
+
+
+def test_leg_by_cat_code():
+    leg = {"Product": [{"catCode": "5", "cls": "32"}]}
+    assert classify_leg(leg) is MODES["5"]
+
+
+def test_single_product_dict():
+    assert classify_leg({"Product": {"catCode": 7}}) is MODES["7"]
+
+
+def test_leg_without_product_is_walk():
+    assert classify_leg({"type": "WALK"}) is WALK
+    assert classify_leg({"type": "TRSF", "Product": []}) is WALK
+
+
+def test_product_class_fallback():
+    # No catCode: the product class 2**catCode still identifies the mode.
+    assert classify_leg({"Product": [{"cls": "64"}]}) is MODES["6"]
+    assert classify_leg({"Product": [{"catCode": "99", "cls": "16"}]}) is MODES["4"]
+
+
+def test_unrecognised_product():
+    assert classify_leg({"Product": [{"catCode": "99", "cls": "3"}]}) is UNKNOWN
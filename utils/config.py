@@ -0,0 +1,92 @@
+import os
+import threading
+
+# Secret names as they appear under [api] in .streamlit/secrets.toml.
+API_KEY_NAMES = {
+    "API_KEY": "ResRobot 2.1",
+    "API_KEY2": "Trafikverket öppet API",
+    "API_KEY3": "GTFS Sverige 2",
+    "API_KEY4": "GTFS Regional Static data",
+    "API_KEY5": "GTFS Sverige 3",
+    "API_KEY6": "Google Maps",
+}
+# Environment variables are looked up with this prefix first, e.g.
+# TRAVEL_PLANNER_API_KEY, then without it.
+ENV_PREFIX = "TRAVEL_PLANNER_"
+
+SOURCES = ("env", "streamlit")
+HEADLESS_SOURCES = ("env",)
+
+
+class ConfigError(RuntimeError):
+    """Raised when a required setting cannot be resolved from any source."""
+
+
+_resolved = {}
+_dotenv_loaded = False
+_lock = threading.Lock()
+
+
+def _load_dotenv():
+    global _dotenv_loaded
+    if not _dotenv_loaded:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _dotenv_loaded = True
+
+
+def _from_env(name):
+    _load_dotenv()
+    return os.environ.get(ENV_PREFIX + name) or os.environ.get(name)
+
+
+def _from_streamlit(name):
+    # Imported here so that headless processes never pay for Streamlit.
+    import streamlit as st
+
+    try:
+        return st.secrets["api"][name]
+    except (FileNotFoundError, KeyError):
+        return None
+
+
+_LOOKUPS = {"env": _from_env, "streamlit": _from_streamlit}
+
+
+def get_api_key(name, sources=SOURCES):
+    """Resolve an API key by secret name, e.g. "API_KEY".
+
+    Sources are tried in order: "env" (environment variables, including a
+    .env file) and "streamlit" (st.secrets["api"]). The first hit is cached
+    per name and sources for the rest of the process, so a headless lookup
+    never returns a key that only Streamlit knows.
+    """
+    key = (name, tuple(sources))
+    with _lock:
+        if key in _resolved:
+            return _resolved[key]
+    for source in sources:
+        value = _LOOKUPS[source](name)
+        if value:
+            with _lock:
+                _resolved[key] = value
+            return value
+    raise ConfigError(
+        f"{name} ({API_KEY_NAMES.get(name, 'API key')}) not found in {', '.join(sources)}. "
+        f"Set {ENV_PREFIX}{name} or add it under [api] in .streamlit/secrets.toml."
+    )
+
+
+def get_setting(name, default=None):
+    """Resolve a non-secret setting from the environment (or .env file).
+
+    Looked up as TRAVEL_PLANNER_<name>, then <name>; `default` otherwise.
+    """
+    return _from_env(name) or default
+
+
+def clear_cache():
+    """Forget resolved keys, e.g. after changing the environment in a worker."""
+    with _lock:
+        _resolved.clear()
@@ -1,10 +1,27 @@
 from enum import Enum
 from pathlib import Path
 
+from utils import config
+
 ROOT_PATH = Path(__file__).parents[1]
 
 FRONTEND_PATH = ROOT_PATH / "frontend"
 BACKEND_PATH = ROOT_PATH / "backend"
+DATA_PATH = ROOT_PATH / "data"
+# Persistent caches (trips, OSRM, Overpass, stop table); the CACHE_DIR setting
+# moves them, e.g. to give a load test a cold cache.
+CACHE_PATH = Path(config.get_setting("CACHE_DIR") or DATA_PATH / ".cache")
+STOPS_PATH = DATA_PATH / "stops.txt"
+# Rail polylines between stations, built by backend/rail_shapes.py.
+RAIL_SHAPES_PATH = Path(
+    config.get_setting("RAIL_SHAPES_PATH") or DATA_PATH / "rail_shapes.sqlite"
+)
+# Tiled pedestrian network of the metro areas, built by backend/walking.py.
+WALK_TILES_PATH = Path(
+    config.get_setting("WALK_TILES_PATH") or DATA_PATH / "walk_tiles.sqlite"
+)
+# One directory of arrays per service day, built by backend/timetable.py.
+TIMETABLE_PATH = Path(config.get_setting("TIMETABLE_PATH") or DATA_PATH / "timetable")
 
 
 class StationIds(Enum):
@@ -0,0 +1,134 @@
+import argparse
+import ast
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from utils.constants import ROOT_PATH
+from utils.lazy_import import HEAVY_MODULES
+
+DASHBOARD_PATH = ROOT_PATH / "frontend" / "dashboard.py"
+FIRST_PARTY = ("backend", "frontend", "utils")
+# Seconds the dashboard imports may take on a developer machine.
+STARTUP_BUDGET = 1.0
+
+
+def dashboard_imports(path=DASHBOARD_PATH):
+    """Project modules the dashboard imports at module level, i.e. before the
+    search container is drawn, read from its source so the list cannot drift.
+    """
+    modules = []
+    for node in ast.parse(Path(path).read_text(encoding="utf-8")).body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            if node.module in FIRST_PARTY:
+                # `from utils import config` imports the module utils.config.
+                names = [f"{node.module}.{alias.name}" for alias in node.names]
+            else:
+                names = [node.module]
+        else:
+            continue
+        for name in names:
+            if name.split(".")[0] in FIRST_PARTY and name not in modules:
+                modules.append(name)
+    return tuple(modules)
+
+
+DASHBOARD_IMPORTS = dashboard_imports()
+
+
+def profile_imports(modules=DASHBOARD_IMPORTS):
+    """Import `modules` in a fresh interpreter under `-X importtime`.
+
+    Returns a list of (self_us, cumulative_us, module) tuples, one per imported
+    module, in the order Python reports them.
+    """
+    code = "; ".join(f"import {module}" for module in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT_PATH,
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.partition(":")[2].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return rows
+
+
+def format_report(rows, top=25):
+    """Top-level imports sorted by cumulative import time."""
+    # Top-level imports are the ones printed without indentation.
+    roots = [row for row in rows if not row[2].startswith("  ")]
+    lines = [f"{'cumulative ms':>14} {'self ms':>9}  module", "-" * 60]
+    for self_us, cumulative_us, name in sorted(roots, key=lambda r: -r[1])[:top]:
+        lines.append(
+            f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name.strip()}"
+        )
+    total = sum(row[1] for row in roots)
+    lines.append("-" * 60)
+    lines.append(f"{total / 1000:>14.1f} ms total over {len(rows)} modules")
+    return "\n".join(lines)
+
+
+def measure_startup(modules=DASHBOARD_IMPORTS):
+    """Wall-clock import time of `modules` in a fresh interpreter and the heavy
+    modules they pulled in."""
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        + "".join(f"import {module}\n" for module in modules)
+        + "elapsed = time.perf_counter() - start\n"
+        + f"heavy = [m for m in {tuple(HEAVY_MODULES)!r} if m in sys.modules]\n"
+        + "print(json.dumps({'seconds': elapsed, 'heavy': heavy}))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT_PATH,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def check_startup(modules=DASHBOARD_IMPORTS, budget=STARTUP_BUDGET):
+    """Return a list of problems: heavy modules imported eagerly or budget overrun."""
+    startup = measure_startup(modules)
+    problems = []
+    if startup["heavy"]:
+        problems.append(f"heavy modules imported at startup: {startup['heavy']}")
+    if startup["seconds"] > budget:
+        problems.append(
+            f"startup imports took {startup['seconds']:.2f}s (budget {budget:.2f}s)"
+        )
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Profile the imports the dashboard needs before first paint."
+    )
+    parser.add_argument("modules", nargs="*", default=list(DASHBOARD_IMPORTS))
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="exit non-zero if heavy modules load eagerly or the budget is exceeded",
+    )
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET)
+    args = parser.parse_args()
+
+    print(format_report(profile_imports(args.modules), top=args.top))
+    if args.check:
+        problems = check_startup(args.modules, args.budget)
+        for problem in problems:
+            print(f"🚨 {problem}")
+        if problems:
+            sys.exit(1)
+        print("✅ Startup imports are lazy and within budget")
@@ -0,0 +1,46 @@
+import importlib
+import sys
+
+# Modules that must not be imported before a map or route geometry is needed.
+HEAVY_MODULES = ("osmnx", "networkx", "shapely", "geopandas", "folium", "pandas")
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    Usage:
+        nx = LazyModule("networkx")
+        nx.Graph()  # networkx is imported here
+
+    `on_load`, if given, is called with the real module right after import,
+    e.g. to apply settings.
+    """
+
+    def __init__(self, name, on_load=None):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+        self.__dict__["_on_load"] = on_load
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            module = importlib.import_module(self.__dict__["_name"])
+            self.__dict__["_module"] = module
+            if self.__dict__["_on_load"] is not None:
+                self.__dict__["_on_load"](module)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<lazy module {self.__dict__['_name']!r} ({state})>"
+
+
+def loaded_heavy_modules(modules=HEAVY_MODULES):
+    """Which of `modules` are already imported in this process."""
+    return [name for name in modules if name in sys.modules]
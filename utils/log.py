@@ -0,0 +1,101 @@
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from utils import config
+
+DEFAULT_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+# Attributes every LogRecord has; anything else was passed through `extra`.
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any fields passed via `extra`."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(
+            (key, value)
+            for key, value in vars(record).items()
+            if key not in _RECORD_FIELDS
+        )
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SampleFilter(logging.Filter):
+    """Let through the first and then every `every`-th record per call site.
+
+    Meant for messages emitted inside loops, so a long trip logs a sample of
+    its segments instead of all of them. Records at WARNING and above always
+    pass.
+    """
+
+    def __init__(self, every, name=""):
+        super().__init__(name)
+        self.every = every
+        self._seen = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not super().filter(record):
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        with self._lock:
+            count = self._seen[key]
+            self._seen[key] = count + 1
+        return count % self.every == 0
+
+
+def _parse_pairs(value):
+    """Parse "a=B, c=D" pairs into a dict."""
+    pairs = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            key, _, val = item.partition("=")
+            pairs[key.strip()] = val.strip()
+    return pairs
+
+
+def configure_logging(level=None, module_levels=None, samples=None, fmt=None):
+    """Set up logging for the app; call once per process.
+
+    Every argument falls back to a setting (see utils.config.get_setting):
+      level:         LOG_LEVEL, root level, default INFO.
+      module_levels: LOG_LEVELS, e.g. "backend.trips=DEBUG".
+      samples:       LOG_SAMPLE, keep 1 in N records per call site for a
+                     logger, e.g. "backend.trips=20".
+      fmt:           LOG_FORMAT, "text" (default) or "json".
+    """
+    level = level or config.get_setting("LOG_LEVEL", "INFO")
+    module_levels = module_levels or _parse_pairs(config.get_setting("LOG_LEVELS"))
+    samples = samples or {
+        name: int(every)
+        for name, every in _parse_pairs(config.get_setting("LOG_SAMPLE")).items()
+    }
+    fmt = fmt or config.get_setting("LOG_FORMAT", "text")
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(
+        JsonFormatter() if fmt == "json" else logging.Formatter(DEFAULT_FORMAT)
+    )
+    for name, every in samples.items():
+        handler.addFilter(SampleFilter(every, name))
+
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        if getattr(old, "_travel_planner", False):
+            root.removeHandler(old)
+    handler._travel_planner = True
+    root.addHandler(handler)
+    root.setLevel(str(level).upper())
+    for name, module_level in module_levels.items():
+        logging.getLogger(name).setLevel(str(module_level).upper())
+    return handler
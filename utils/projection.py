@@ -0,0 +1,41 @@
+from functools import lru_cache
+
+import numpy as np
+
+from utils.lazy_import import LazyModule
+
+pyproj = LazyModule("pyproj")
+
+# SWEREF99 TM, the national grid: metres, true to scale within 0.1 % over Sweden.
+SWEREF99_TM = "EPSG:3006"
+WGS84 = "EPSG:4326"
+
+
+@lru_cache(maxsize=None)
+def _transformer(source, target):
+    return pyproj.Transformer.from_crs(source, target, always_xy=True)
+
+
+def to_sweref99tm(lats, lons):
+    """Project WGS84 degrees to SWEREF99 TM; returns (easting, northing) arrays in metres."""
+    return _transformer(WGS84, SWEREF99_TM).transform(
+        np.asarray(lons, dtype=float), np.asarray(lats, dtype=float)
+    )
+
+
+def from_sweref99tm(easting, northing):
+    """Inverse of `to_sweref99tm`; returns (lats, lons)."""
+    lons, lats = _transformer(SWEREF99_TM, WGS84).transform(
+        np.asarray(easting, dtype=float), np.asarray(northing, dtype=float)
+    )
+    return lats, lons
+
+
+def segment_lengths(x, y):
+    """Lengths of the segments of a projected polyline (n points -> n - 1 lengths)."""
+    return np.hypot(np.diff(x), np.diff(y))
+
+
+def nearest(x, y, px, py):
+    """Index of the point (x[i], y[i]) closest to (px, py)."""
+    return int(np.argmin((np.asarray(x) - px) ** 2 + (np.asarray(y) - py) ** 2))
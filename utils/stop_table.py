@@ -0,0 +1,257 @@
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from utils.constants import CACHE_PATH, STOPS_PATH
+from utils.lazy_import import LazyModule
+
+# Only needed to (re)build the table from stops.txt.
+pd = LazyModule("pandas")
+
+STOP_TABLE_CACHE = CACHE_PATH / "stop_table"
+# Replaced builds older than this are deleted; readers open theirs long before.
+STALE_BUILD_SECONDS = 600
+
+
+def _current_build(cache_dir):
+    """Directory of the build `cache_dir/current` points to, or None."""
+    try:
+        name = (cache_dir / "current").read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    return cache_dir / name
+
+
+def _remove_stale_builds(cache_dir, keep):
+    current = _current_build(cache_dir)
+    cutoff = time.time() - STALE_BUILD_SECONDS
+    for build in cache_dir.glob("build-*"):
+        if build in (keep, current) or build.stat().st_mtime > cutoff:
+            continue
+        shutil.rmtree(build, ignore_errors=True)
+    # Tables of the layout before builds were versioned.
+    for old in cache_dir.glob("*.npy"):
+        old.unlink(missing_ok=True)
+
+
+class StopTable:
+    """Compact, read-only table of all stops.
+
+    Columns are stored as contiguous NumPy arrays instead of Python objects:
+
+      ids:          int64 stop ids, in file order.
+      lats, lons:   float32 coordinates.
+      name_blob:    uint8 array holding every UTF-8 encoded name back to back.
+      name_offsets: int64 array, name i is name_blob[name_offsets[i]:name_offsets[i + 1]].
+      name_order:   row indices sorted by encoded name, for name lookups.
+      id_order:     row indices sorted by id, for id lookups.
+
+    Saved tables are loaded with `mmap_mode="r"`, so every Streamlit worker on
+    the host shares the same pages from the OS page cache.
+    """
+
+    FIELDS = (
+        "ids",
+        "lats",
+        "lons",
+        "name_blob",
+        "name_offsets",
+        "name_order",
+        "id_order",
+    )
+
+    def __init__(self, ids, lats, lons, name_blob, name_offsets, name_order, id_order):
+        self.ids = ids
+        self.lats = lats
+        self.lons = lons
+        self.name_blob = name_blob
+        self.name_offsets = name_offsets
+        self.name_order = name_order
+        self.id_order = id_order
+        self._sorted_ids = ids[id_order]
+
+    @classmethod
+    def from_columns(cls, ids, names, lats, lons):
+        """Build a table from plain sequences of ids, names and coordinates."""
+        encoded = [str(name).encode("utf-8") for name in names]
+        name_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(name) for name in encoded], out=name_offsets[1:])
+        name_blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        # sorted() is stable, so duplicate names keep their file order.
+        name_order = np.array(
+            sorted(range(len(encoded)), key=encoded.__getitem__), dtype=np.int64
+        )
+        ids = np.asarray(ids, dtype=np.int64)
+        return cls(
+            ids=ids,
+            lats=np.asarray(lats, dtype=np.float32),
+            lons=np.asarray(lons, dtype=np.float32),
+            name_blob=name_blob,
+            name_offsets=name_offsets,
+            name_order=name_order,
+            id_order=np.argsort(ids, kind="stable"),
+        )
+
+    @classmethod
+    def from_csv(cls, file_path=STOPS_PATH):
+        """Build a table from a GTFS stops.txt file."""
+        df = pd.read_csv(
+            file_path,
+            usecols=["stop_id", "stop_name", "stop_lat", "stop_lon"],
+            dtype={"stop_id": "int64", "stop_lat": "float32", "stop_lon": "float32"},
+        )
+        return cls.from_columns(
+            df["stop_id"].to_numpy(),
+            df["stop_name"].to_numpy(),
+            df["stop_lat"].to_numpy(),
+            df["stop_lon"].to_numpy(),
+        )
+
+    def save(self, directory):
+        """Write the arrays as .npy files into `directory`."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for field in self.FIELDS:
+            np.save(directory / f"{field}.npy", np.asarray(getattr(self, field)))
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Load a saved table, memory-mapped read-only unless `mmap` is False."""
+        directory = Path(directory)
+        mode = "r" if mmap else None
+        return cls(
+            **{
+                field: np.load(directory / f"{field}.npy", mmap_mode=mode)
+                for field in cls.FIELDS
+            }
+        )
+
+    @classmethod
+    def cached(cls, file_path=STOPS_PATH, cache_dir=STOP_TABLE_CACHE):
+        """Memory-map the table from `cache_dir`, (re)building it if `file_path` is newer.
+
+        Every build is written to its own subdirectory and the `current` file
+        naming it is swapped in atomically, so concurrent workers never see a
+        missing or half written table. Older builds are removed once no
+        reader can still be opening them.
+        """
+        file_path, cache_dir = Path(file_path), Path(cache_dir)
+        build = _current_build(cache_dir)
+        marker = build / "ids.npy" if build else None
+        if (
+            marker is None
+            or not marker.exists()
+            or (marker.stat().st_mtime < file_path.stat().st_mtime)
+        ):
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            build = Path(tempfile.mkdtemp(prefix="build-", dir=cache_dir))
+            cls.from_csv(file_path).save(build)
+            pointer = cache_dir / f"current.{build.name}"
+            pointer.write_text(build.name, encoding="utf-8")
+            os.replace(pointer, cache_dir / "current")
+            _remove_stale_builds(cache_dir, keep=build)
+        return cls.load(build)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _name_bytes(self, row):
+        start, end = self.name_offsets[row], self.name_offsets[row + 1]
+        return self.name_blob[start:end].tobytes()
+
+    def name(self, row):
+        """Name of the stop at `row`."""
+        return self._name_bytes(row).decode("utf-8")
+
+    def names(self):
+        """All names as a list of str, in file order."""
+        raw = self.name_blob.tobytes()
+        offsets = self.name_offsets.tolist()
+        return [
+            raw[start:end].decode("utf-8")
+            for start, end in zip(offsets[:-1], offsets[1:])
+        ]
+
+    def find_name(self, name):
+        """Row of the stop called `name`, or -1.
+
+        If several stops share the name, the last one in file order is used,
+        like the `dict(zip(names, ids))` lookup this table replaces.
+        """
+        target = str(name).encode("utf-8")
+        # Binary search for the first name greater than target.
+        lo, hi = 0, len(self.name_order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._name_bytes(self.name_order[mid]) <= target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo and self._name_bytes(self.name_order[lo - 1]) == target:
+            return int(self.name_order[lo - 1])
+        return -1
+
+    def stop_id(self, name):
+        """Stop id for a stop name. Raises KeyError for unknown names."""
+        row = self.find_name(name)
+        if row < 0:
+            raise KeyError(name)
+        return int(self.ids[row])
+
+    def find_id(self, stop_id):
+        """Row of the stop with id `stop_id`, or -1."""
+        stop_id = int(stop_id)
+        pos = int(np.searchsorted(self._sorted_ids, stop_id))
+        if pos < len(self._sorted_ids) and self._sorted_ids[pos] == stop_id:
+            return int(self.id_order[pos])
+        return -1
+
+    def coordinates(self, stop_id):
+        """(lat, lon) of a stop id. Raises KeyError for unknown ids."""
+        row = self.find_id(stop_id)
+        if row < 0:
+            raise KeyError(stop_id)
+        return float(self.lats[row]), float(self.lons[row])
+
+    def to_frame(self):
+        """The table as a pandas DataFrame with the stops.txt column names."""
+        return pd.DataFrame(
+            {
+                "stop_id": self.ids,
+                "stop_name": self.names(),
+                "stop_lat": self.lats,
+                "stop_lon": self.lons,
+            }
+        )
+
+
+def _rss_mb():
+    import psutil
+
+    return psutil.Process().memory_info().rss / 1e6
+
+
+if __name__ == "__main__":
+    # Resident memory of the old DataFrame + dict + list layout versus the
+    # memory-mapped StopTable. Run each in a fresh interpreter:
+    #   python -m utils.stop_table dataframe
+    #   python -m utils.stop_table stoptable
+    import sys
+
+    mode = sys.argv[1] if len(sys.argv) > 1 else "stoptable"
+    before = _rss_mb()
+    if mode == "dataframe":
+        columns = ["stop_id", "stop_name", "stop_lat", "stop_lon", "location_type"]
+        stops_df = pd.read_csv(STOPS_PATH, names=columns, header=0)
+        stop_dict = dict(zip(stops_df["stop_name"], stops_df["stop_id"]))
+        stops_list = stops_df["stop_name"].to_list()
+    else:
+        table = StopTable.cached()
+        # Touch every page, as a worker serving lookups eventually would.
+        table.stop_id(table.name(len(table) - 1))
+        int(table.ids.sum()), float(table.lats.sum()), int(table.name_blob.sum())
+    print(f"{mode}: +{_rss_mb() - before:.1f} MB resident")
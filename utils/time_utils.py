@@ -0,0 +1,84 @@
+import time
+from datetime import datetime
+
+import numpy as np
+
+# ResRobot dates and times are local ("2025-03-03", "08:04:00"); they are kept
+# as naive datetime64 values and compared against the naive local clock.
+NAT = np.datetime64("NaT", "s")
+
+
+def parse_datetimes(dates, times):
+    """Parse parallel sequences of "YYYY-MM-DD" and "HH:MM:SS" strings at once.
+
+    Returns a datetime64[s] array; a missing or malformed date or time gives NaT.
+    """
+    stamps = [
+        f"{date}T{clock}" if date and clock else "NaT"
+        for date, clock in zip(dates, times)
+    ]
+    try:
+        return np.array(stamps, dtype="datetime64[s]")
+    except ValueError:
+        return np.array([_parse_one(stamp) for stamp in stamps], dtype="datetime64[s]")
+
+
+def _parse_one(stamp):
+    try:
+        return np.datetime64(stamp, "s")
+    except ValueError:
+        return NAT
+
+
+def now64(now=None):
+    """`now` (default: the local clock) as a datetime64[s]."""
+    return np.datetime64(now or datetime.now(), "s")
+
+
+def seconds_between(start, end):
+    """`end - start` in seconds as a float array, NaN where either side is NaT."""
+    delta = (np.asarray(end) - np.asarray(start)).astype("timedelta64[s]")
+    seconds = delta.astype(float)
+    seconds[np.isnat(delta)] = np.nan
+    return seconds
+
+
+def epoch_seconds(stamps, now=None):
+    """Unix timestamps for naive local datetime64 values, e.g. for the browser."""
+    return seconds_between(now64(now), stamps) + time.time()
+
+
+def format_durations(seconds, zero=None):
+    """Format second counts as "1h5m".
+
+    Values under a minute (including negative ones) become `zero` if given,
+    e.g. "Nu" for countdowns; NaN becomes "N/A".
+    """
+    seconds = np.asarray(seconds, dtype=float)
+    missing = np.isnan(seconds)
+    soon = ~missing & (seconds < 60) if zero is not None else np.zeros_like(missing)
+    minutes = np.where(missing | soon, 0, seconds // 60).astype(np.int64)
+    hours, minutes = np.divmod(minutes, 60)
+    labels = []
+    for h, m, gone, now in zip(
+        hours.tolist(), minutes.tolist(), missing.tolist(), soon.tolist()
+    ):
+        if gone:
+            labels.append("N/A")
+        elif now:
+            labels.append(zero)
+        elif zero is not None and h == 0:
+            labels.append(f"{m}m")
+        else:
+            labels.append(f"{h}h{m}m")
+    return labels
+
+
+def countdowns(stamps, now=None):
+    """ "Nu", "7m" or "1h5m" until each of `stamps`, with correct day rollover."""
+    return format_durations(seconds_between(now64(now), stamps), zero="Nu")
+
+
+def durations(start, end):
+    """Travel times "0h25m" between two datetime64 arrays."""
+    return format_durations(seconds_between(start, end))
@@ -0,0 +1,201 @@
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+_global_sinks = []
+_local = threading.local()
+_ids = itertools.count(1)
+_lock = threading.Lock()
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    """A timed, named section of work. Use through `span()`."""
+
+    def __init__(self, name, attrs, sinks):
+        self.name = name
+        self.attrs = attrs
+        self.sinks = sinks
+        self.span_id = next(_ids)
+        self.parent_id = None
+        self.depth = 0
+        self.start = None
+        self.duration = None
+
+    def set(self, **attrs):
+        """Attach extra attributes, e.g. result sizes, before the span ends."""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = _stack()
+        if stack:
+            self.parent_id = stack[-1].span_id
+            self.depth = len(stack)
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        _stack().pop()
+        record = {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "depth": self.depth,
+            "start": time.time() - self.duration,
+            "duration_ms": round(self.duration * 1000, 3),
+            "thread": threading.current_thread().name,
+            **self.attrs,
+        }
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        for sink in self.sinks:
+            try:
+                sink(record)
+            except Exception as err:  # a broken sink must never break a request
+                logging.getLogger(__name__).warning("Span sink failed: %s", err)
+        return False
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def span(name, **attrs):
+    """Context manager timing the enclosed block as span `name`.
+
+        with tracing.span("osm.fetch", mode="tram") as s:
+            data = ...
+            s.set(features=len(data))
+
+    Spans nest per thread and are handed to the installed sinks when they end.
+    Without any sink a shared no-op object is returned, so instrumented code
+    costs next to nothing.
+    """
+    local_sinks = getattr(_local, "sinks", None)
+    if not _global_sinks and not local_sinks:
+        return _NOOP
+    return Span(name, attrs, _global_sinks + (local_sinks or []))
+
+
+def traced(name=None):
+    """Decorator wrapping every call of a function in a span."""
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def add_sink(sink):
+    """Send spans from every thread to `sink`, a callable taking a record dict."""
+    with _lock:
+        _global_sinks.append(sink)
+    return sink
+
+
+def remove_sink(sink):
+    with _lock:
+        if sink in _global_sinks:
+            _global_sinks.remove(sink)
+
+
+@contextmanager
+def capture(sink=None):
+    """Collect spans of the current thread only (e.g. one Streamlit session).
+
+    Yields the sink, a MemorySink unless one is given.
+    """
+    sink = sink or MemorySink()
+    sinks = getattr(_local, "sinks", None)
+    if sinks is None:
+        sinks = _local.sinks = []
+    sinks.append(sink)
+    try:
+        yield sink
+    finally:
+        sinks.remove(sink)
+
+
+def enabled():
+    """True if any sink would receive spans from the current thread."""
+    return bool(_global_sinks or getattr(_local, "sinks", None))
+
+
+class MemorySink:
+    """Keeps the most recent span records in memory, e.g. for a debug panel."""
+
+    def __init__(self, maxlen=1000):
+        self.records = deque(maxlen=maxlen)
+
+    def __call__(self, record):
+        self.records.append(record)
+
+    def summary(self):
+        """Total time and count per span name, slowest first."""
+        totals = {}
+        for record in self.records:
+            total = totals.setdefault(record["name"], {"count": 0, "total_ms": 0.0})
+            total["count"] += 1
+            total["total_ms"] += record["duration_ms"]
+        return dict(sorted(totals.items(), key=lambda item: -item[1]["total_ms"]))
+
+
+class JsonlSink:
+    """Appends one JSON line per span to a file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(line + "\n")
+
+
+class LogSink:
+    """Logs every span through the `logging` module."""
+
+    def __init__(self, logger="travel_planner.trace", level=logging.INFO):
+        self.logger = logging.getLogger(logger)
+        self.level = level
+
+    def __call__(self, record):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(
+                self.level,
+                "%s%s %.1f ms",
+                "  " * record["depth"],
+                record["name"],
+                record["duration_ms"],
+            )